@@ -2,28 +2,62 @@
 Repository analysis modules
 """
 
+import asyncio
+import heapq
 import os
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, List, Any
-from collections import defaultdict
+from typing import AsyncIterator, Dict, List, Any, Mapping, Optional, Sequence, Tuple
 import math
 
-from .complexity import analyze_complexity
-from .dependencies import analyze_dependencies
-from .documentation import analyze_documentation
-from .yagni_detector import detect_yagni
+from .budget import AnalysisBudget
+from .cache import TaskResultCallback, cached_map_tasks, memoized_results
+from .clones import CloneCache, get_clone_cache, is_remote_url
+from .corpus import RepoCorpus, SourceFile
+from .complexity import ComplexityAnalyzer, analyze_complexity
+from .dependencies import DependencyAnalyzer, analyze_dependencies
+from .documentation import DocumentationAnalyzer, analyze_documentation
+from .yagni_detector import YAGNIDetector, detect_yagni
+from .orchestrator import AnalysisPipeline
+from .snapshot import AnalysisSnapshot
+from .dependency_index import DependencyIndex
+from .executor import get_executor
+from .git_corpus import corpus_from_commit, diff_python_files, has_commit, list_commits, resolve_commit
+from config import settings
+from .progress import AnalysisProgress
+from .reducers import ModuleRollup, StructureReducer
+from .rules import rule_timings
+from .sampling import ESTIMATORS, StratifiedSample
+from .spool import RecordSpool
 
-def _is_local_path(path: str) -> bool:
-    """Check if the path is a local file system path"""
-    return os.path.exists(path) or not path.startswith(('http://', 'https://', 'git@'))
+# Every analyzer run by analyze_repository, keyed in results by its NAME
+ANALYZERS = [ComplexityAnalyzer, DependencyAnalyzer, DocumentationAnalyzer, YAGNIDetector]
 
-def _get_repo_path(repo_url: str) -> Path:
-    """Get the repository path - either local path or backend directory for local analysis"""
-    if _is_local_path(repo_url):
-        return Path(repo_url)
-    # For remote repos, we'd clone them, but for now analyze the backend itself
-    # This handles the case where we want to analyze the local starship repo
-    return Path(__file__).parent.parent
+# Files analyzed at a time when a repository is too large to hold in memory
+SPILL_BATCH_SIZE = 1024
+
+# Files analyzed at a time under a deadline; a batch cut off by the deadline is lost
+DEADLINE_BATCH_SIZE = 256
+
+@asynccontextmanager
+async def _repository(repo_url: str, branch: Optional[str] = None, depth: int = 0,
+                      checkout: bool = True) -> AsyncIterator[Tuple[str, Optional[str]]]:
+    """
+    (local path, commit) of the repository to analyze, held for the
+    duration: a local path as it is (commit None, the working tree), or for
+    a remote URL the clone cache's mirror and the commit fetched for
+    branch, depth commits deep (0 = full history). With checkout, the
+    cache's worktree at that commit is used instead (commit None).
+    """
+    if not is_remote_url(repo_url) or os.path.exists(repo_url):
+        yield str(Path(repo_url)), None
+    elif checkout:
+        async with get_clone_cache().checkout(repo_url, branch, depth) as worktree:
+            yield str(worktree), None
+    else:
+        async with get_clone_cache().mirror(repo_url, branch, depth) as (mirror, commit):
+            yield str(mirror), commit
 
 def _generate_3d_positions(modules: List[Dict[str, Any]], center: tuple = (0, 0, 0)) -> List[Dict[str, Any]]:
     """Generate 3D positions for modules in a sphere around center"""
@@ -63,18 +97,53 @@ def _calculate_module_health(complexity_score: float, doc_score: float, yagni_sc
     health = (doc_norm * 0.4 + yagni_norm * 0.3 + (1 - complexity_norm) * 0.3)
     return round(health, 2)
 
-async def analyze_repository(repo_url: str, branch: str = "main", depth: int = 1):
+def _module_type(module_name: str) -> str:
+    return "core" if module_name in ["api", "analyzers", "models"] else "module"
+
+def _preview_structure(modules: Dict[str, ModuleRollup]) -> List[Dict[str, Any]]:
+    """Module layout before any analyzer has finished (health not yet known)"""
+    structure = [
+        {
+            "id": module_name,
+            "name": module_name,
+            "size": module.size,
+            "health": None,
+            "type": _module_type(module_name)
+        }
+        for module_name, module in modules.items()
+    ]
+    return _generate_3d_positions(structure)
+
+def _repository_metrics(complexity: float, documentation: float, yagni: float,
+                        dependencies: Optional[int]) -> Dict[str, Any]:
+    """Dashboard metrics from the analyzer scores"""
+    return {
+        "complexity": complexity,
+        "coverage": 0,  # Would need test coverage tool
+        "documentation": documentation,
+        "yagni": yagni,
+        "dependencies": dependencies,
+        "tech_debt": max(0, 100 - (complexity * 0.5 + documentation * 0.5)),
+        "vulnerabilities": {
+            "critical": 0,
+            "high": 0,
+            "medium": 0,
+            "low": 0
+        }
+    }
+
+def _summarize_repository(repo_path: str, files: Dict[str, Dict[str, Any]],
+                          results: Dict[str, Dict[str, Any]],
+                          records: Dict[str, Mapping[str, Dict[str, Any]]]) -> Dict[str, Any]:
     """
-    Main repository analysis function
-    Analyzes the repository using all available analyzers
+    Aggregate repository metrics from analyzer results, and the module
+    structure by folding per-file records into per-module rollups
     """
-    repo_path = _get_repo_path(repo_url)
-    
-    # Run all analyzers in parallel
-    complexity_result = await analyze_complexity(str(repo_path))
-    dependencies_result = await analyze_dependencies(str(repo_path))
-    documentation_result = await analyze_documentation(str(repo_path))
-    yagni_result = await detect_yagni(str(repo_path))
+    repo_path = Path(repo_path)
+    complexity_result = results.get("complexity", {})
+    dependencies_result = results.get("dependencies", {})
+    documentation_result = results.get("documentation", {})
+    yagni_result = results.get("yagni", {})
     
     # Extract metrics
     complexity_summary = complexity_result.get("summary", {})
@@ -83,103 +152,38 @@ async def analyze_repository(repo_url: str, branch: str = "main", depth: int = 1
     yagni_score = yagni_result.get("score", 0)
     
     # Aggregate metrics
-    metrics = {
-        "complexity": complexity_summary.get("complexity_score", 0),
-        "coverage": 0,  # Would need test coverage tool
-        "documentation": doc_coverage.get("overall_score", 0),
-        "yagni": yagni_score,
-        "dependencies": dep_metrics.get("unique_external_dependencies", 0),
-        "tech_debt": max(0, 100 - (complexity_summary.get("complexity_score", 0) * 0.5 + doc_coverage.get("overall_score", 0) * 0.5)),
-        "vulnerabilities": {
-            "critical": 0,
-            "high": 0,
-            "medium": 0,
-            "low": 0
-        }
-    }
+    metrics = _repository_metrics(
+        complexity_summary.get("complexity_score", 0),
+        doc_coverage.get("overall_score", 0),
+        yagni_score,
+        dep_metrics.get("unique_external_dependencies", 0)
+    )
     
     # Build module structure from directory analysis
     modules = []
-    module_data = defaultdict(lambda: {
-        "files": [],
-        "complexity_details": [],
-        "doc_details": [],
-        "size": 0
-    })
-    
-    # Group files by top-level directory
-    for py_file in repo_path.rglob("*.py"):
-        if "__pycache__" in str(py_file) or "test_" in py_file.name or "venv" in str(py_file):
-            continue
-        
-        rel_path = py_file.relative_to(repo_path)
-        
-        # Determine module name: use first directory if exists, otherwise use filename without extension
-        if len(rel_path.parts) > 1:
-            top_level = rel_path.parts[0]
-        else:
-            # File in root - use filename without extension as module name
-            top_level = rel_path.stem if rel_path.stem != "__init__" else "root"
-        
-        # Count lines
-        try:
-            with open(py_file, 'r', encoding='utf-8') as f:
-                lines = len(f.readlines())
-                module_data[top_level]["size"] += lines
-                module_data[top_level]["files"].append(str(rel_path))
-        except Exception:
-            pass
-    
-    # Get complexity and documentation per module
-    complexity_details = complexity_result.get("details", [])
-    doc_files = documentation_result.get("files", [])
-    
-    # Map files to modules
-    for detail in complexity_details:
-        file_path = detail.get("file", "")
-        top_level = file_path.split("/")[0] if "/" in file_path else "root"
-        if top_level in module_data:
-            module_data[top_level]["complexity_details"].append(detail)
-    
-    for doc_file in doc_files:
-        file_path = doc_file.get("file", "")
-        top_level = file_path.split("/")[0] if "/" in file_path else "root"
-        if top_level in module_data:
-            module_data[top_level]["doc_details"].append(doc_file)
+    module_data = StructureReducer(repo_path, files).add_all(
+        records.get("complexity", {}).values(),
+        records.get("documentation", {}).values()
+    ).modules
     
     # Create module entries
     for module_name, data in module_data.items():
         # Calculate module-specific metrics
-        module_complexity = 0
-        if data["complexity_details"]:
-            total_cc = sum(
-                sum(f.get("complexity", 0) for f in detail.get("cyclomatic_complexity", []))
-                for detail in data["complexity_details"]
-            )
-            module_complexity = min(100, max(0, 100 - (total_cc / len(data["complexity_details"]) * 5)))
+        module_complexity = data.complexity_score
         
-        module_doc = 0
-        if data["doc_details"]:
-            doc_scores = [
-                detail.get("functions", [])
-                for detail in data["doc_details"]
-            ]
-            # Simplified: use overall documentation score
-            module_doc = doc_coverage.get("overall_score", 0)
+        # Simplified: use overall documentation score
+        module_doc = doc_coverage.get("overall_score", 0) if data.doc_files else 0
         
         module_yagni = yagni_score  # Use overall for now
         
         health = _calculate_module_health(module_complexity, module_doc, module_yagni)
         
-        # Determine module type
-        module_type = "core" if module_name in ["api", "analyzers", "models"] else "module"
-        
         modules.append({
             "id": module_name,
             "name": module_name,
-            "size": data["size"],
+            "size": data.size,
             "health": health,
-            "type": module_type
+            "type": _module_type(module_name)
         })
     
     # Generate 3D positions
@@ -190,10 +194,504 @@ async def analyze_repository(repo_url: str, branch: str = "main", depth: int = 1
         "structure": modules
     }
 
+def _is_large(corpus: RepoCorpus) -> bool:
+    """Whether per-file data should be released and spilled rather than held in memory"""
+    return bool(settings.analysis_spill_records) and len(corpus) > settings.analysis_spill_records
+
+def _file_facts(corpus: RepoCorpus) -> Dict[str, Dict[str, Any]]:
+    """Content hash and line count of every file in the corpus"""
+    release = _is_large(corpus)
+    facts = {}
+    for source in corpus:
+        try:
+            lines = source.line_count
+        except Exception:
+            lines = None
+        facts[source.rel_path] = {"digest": source.digest, "lines": lines}
+        if release:
+            # Re-read on demand instead of keeping every file's content alive
+            source.release()
+    return facts
+
+def _merge_records(base: Mapping[str, Dict[str, Any]], removed: List[str],
+                   fresh: List[Dict[str, Any]], records: RecordSpool) -> RecordSpool:
+    """Add base per-file records minus removed files plus freshly analyzed ones to records, in path order"""
+    fresh_by_path = {record["file"]: record for record in fresh}
+    removed = set(removed)
+    kept = (
+        (path, record) for path, record in base.items()
+        if path not in removed and path not in fresh_by_path
+    )
+    for path, record in heapq.merge(kept, sorted(fresh_by_path.items()), key=lambda item: item[0]):
+        records.add(path, record)
+    return records
+
+def _skipped_files(corpus: RepoCorpus, base: Optional[AnalysisSnapshot],
+                   changed: Sequence[str], removed: Sequence[str]) -> List[Dict[str, str]]:
+    """
+    Files counted but not analyzed (generated, vendored, minified), in path
+    order; an incremental run keeps the base's entries for unchanged files
+    """
+    skipped = {path: {"file": path, **info} for path, info in corpus.classified.items()}
+    if base is not None:
+        stale = set(changed) | set(removed)
+        for entry in base.result.get("analysis", {}).get("skipped_files", []):
+            if entry["file"] not in stale and entry["file"] not in skipped:
+                skipped[entry["file"]] = entry
+    return [skipped[path] for path in sorted(skipped)]
+
+def _summarize(analyzer: Any, records: RecordSpool) -> Dict[str, Any]:
+    """
+    An analyzer's result from its per-file records, for a worker thread:
+    summarize is a coroutine but never waits, so it runs on a private loop
+    instead of stalling the server's (import resolution, cycle detection,
+    symbol resolution and reducers all grow with the repository)
+    """
+    return asyncio.run(analyzer.summarize(records.values()))
+
+async def _collect_all(analyzers: Sequence[Any], sources: Sequence[Sequence[SourceFile]],
+                       on_result: Optional[TaskResultCallback] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Per-file results of several analyzers, each over its own sources, with
+    every file dispatched once for all of them (see cached_map_tasks)
+    """
+    return await cached_map_tasks(get_executor(), [analyzer.file_task for analyzer in analyzers], sources,
+                                  on_result=on_result)
+
+def _build_pipeline(repo_path: str, commit: Optional[str], target_ref: Optional[str],
+                    base: Optional[AnalysisSnapshot],
+                    progress: Optional[AnalysisProgress] = None,
+                    budget: Optional[AnalysisBudget] = None) -> AnalysisPipeline:
+    """
+    Change detection and discovery first, then the four analyzers side by
+    side over the shared corpus. With a base snapshot only the files that
+    changed since its commit are read and analyzed; everything else is
+    taken from the base. progress, if given, receives every per-file result
+    as it arrives. budget, if given, limits the corpus and stops analyzers
+    at its deadline (recording what was left out).
+    """
+    pipeline = AnalysisPipeline()
+    
+    def admit(corpus: RepoCorpus) -> RepoCorpus:
+        return budget.admit(corpus) if budget is not None else corpus
+    
+    # Git and file system access block, so keep them off the event loop
+    if base is not None:
+        pipeline.add("changes", lambda done: asyncio.to_thread(
+            diff_python_files, repo_path, base.commit, commit
+        ))
+        pipeline.add("corpus", lambda done: asyncio.to_thread(
+            lambda: admit(corpus_from_commit(repo_path, commit, done["changes"][0], classify=False)).classify()
+        ), depends_on=["changes"])
+    elif target_ref is not None:
+        # Blobs over the size cutoff are never read, not even to classify them
+        pipeline.add("corpus", lambda done: asyncio.to_thread(
+            lambda: admit(corpus_from_commit(repo_path, commit, classify=False)).classify()
+        ))
+    else:
+        pipeline.add("corpus", lambda done: asyncio.to_thread(
+            lambda: admit(RepoCorpus.from_path(repo_path))
+        ))
+    
+    def removed_paths(done) -> set:
+        """Files the base has that this run must drop: deleted ones and ones the budget left out"""
+        removed = set(done["changes"][1])
+        if budget is not None:
+            removed |= budget.skipped_paths
+        return removed
+    
+    inputs = ["changes", "corpus"] if base is not None else ["corpus"]
+    
+    async def collect_files(done):
+        facts = await asyncio.to_thread(_file_facts, done["corpus"])
+        if base is None:
+            files = facts
+        else:
+            removed = removed_paths(done)
+            merged = {path: fact for path, fact in base.files.items() if path not in removed}
+            merged.update(facts)
+            files = {path: merged[path] for path in sorted(merged)}
+        
+        if progress is not None:
+            corpus = done["corpus"]
+            modules = await asyncio.to_thread(lambda: StructureReducer(Path(repo_path), files).modules)
+            progress.files_discovered(
+                _preview_structure(modules),
+                {name: [path for path in module.files if corpus.get(path) is not None]
+                 for name, module in modules.items()},
+                {analyzer_class.NAME: [source.rel_path for source in analyzer_class(repo_path, corpus).select(corpus)]
+                 for analyzer_class in ANALYZERS}
+            )
+        return files
+    
+    pipeline.add("files", collect_files, depends_on=inputs)
+    
+    def make_analyzer(analyzer_class, corpus: RepoCorpus):
+        if analyzer_class is YAGNIDetector and base is not None:
+            # Only the changed files' symbols are updated and re-resolved
+            return YAGNIDetector(repo_path, corpus, symbols=base.symbols)
+        return analyzer_class(repo_path, corpus)
+    
+    # Analysis waits for discovery so progress events follow the announcement
+    # (the file contents it reads are shared with it through the corpus).
+    # Every file is dispatched once for all the analyzers covering it, so it
+    # is parsed once whichever executor runs it. Large repositories are
+    # analyzed in batches whose content is released afterwards, with the
+    # per-file records spilled to disk.
+    async def analyze_files(done):
+        corpus = done["corpus"]
+        analyzers = [make_analyzer(analyzer_class, corpus) for analyzer_class in ANALYZERS]
+        selected = [{source.rel_path for source in analyzer.select(corpus)} for analyzer in analyzers]
+        sources = [source for source in corpus if any(source.rel_path in paths for paths in selected)]
+        spools = [RecordSpool.for_size(len(done["files"]), settings.analysis_spill_records) for _ in analyzers]
+        batch_size = SPILL_BATCH_SIZE if spools[0].on_disk else max(len(sources), 1)
+        if budget is not None and budget.deadline is not None:
+            batch_size = min(batch_size, DEADLINE_BATCH_SIZE)
+        fresh: List[List[Dict[str, Any]]] = [[] for _ in analyzers]
+        finished = 0
+        
+        for start in range(0, len(sources), batch_size):
+            batch = sources[start:start + batch_size]
+            chosen = [[source for source in batch if source.rel_path in paths] for paths in selected]
+            on_result = None
+            if progress is not None:
+                on_result = lambda task, index, record, chosen=chosen: progress.file_done(
+                    analyzers[task].NAME, chosen[task][index].rel_path, analyzers[task].file_summary(record)
+                )
+            try:
+                per_analyzer = await asyncio.wait_for(
+                    _collect_all(analyzers, chosen, on_result),
+                    budget.remaining() if budget is not None else None
+                )
+            except asyncio.TimeoutError:
+                break
+            finished += len(batch)
+            for analyzer, records, new, results in zip(analyzers, spools, fresh, per_analyzer):
+                if budget is not None:
+                    budget.record_timeouts(analyzer.NAME, results)
+                if base is None:
+                    for record in results:
+                        records.add(record["file"], record)
+                else:
+                    new.extend(results)
+            if spools[0].on_disk:
+                for source in batch:
+                    source.release()
+        
+        outcome = {}
+        for analyzer, paths, records, new in zip(analyzers, selected, spools, fresh):
+            # Out of time: leave the rest out rather than keep their outdated base records
+            left = [source.rel_path for source in sources[finished:] if source.rel_path in paths]
+            if left:
+                budget.mark_incomplete(analyzer.NAME, len(paths) - len(left), len(paths))
+            outcome[analyzer.NAME] = (analyzer, records, new, left)
+        return outcome
+    
+    pipeline.add("analysis", analyze_files, depends_on=inputs + ["files"])
+    
+    for analyzer_class in ANALYZERS:
+        async def run_analyzer(done, name=analyzer_class.NAME):
+            analyzer, records, fresh, removed = done["analysis"][name]
+            if base is not None:
+                removed = removed_paths(done).union(removed)
+                if analyzer.SKIP_GENERATED:
+                    # Changed files that are now classified as generated
+                    removed |= set(done["corpus"].classified)
+                await asyncio.to_thread(_merge_records, base.records.get(name, {}), removed, fresh, records)
+            return records, await asyncio.to_thread(_summarize, analyzer, records), analyzer
+        
+        pipeline.add(analyzer_class.NAME, run_analyzer, depends_on=inputs + ["analysis"])
+    
+    return pipeline
+
+async def analyze_snapshot(repo_url: str, target_ref: Optional[str] = None,
+                           base_snapshot: Optional[AnalysisSnapshot] = None,
+                           progress: Optional[AnalysisProgress] = None,
+                           branch: Optional[str] = None, depth: int = 0) -> AnalysisSnapshot:
+    """
+    Analyze a repository and return the full snapshot (per-file records and
+    aggregated result). target_ref analyzes a commit straight from git
+    instead of the working tree; base_snapshot re-analyzes only the files
+    changed since the snapshot's commit. An unusable base (no commit, dirty
+    working tree, different analyzer versions, commit missing from a
+    shallow clone) falls back to a full run. progress receives discovery,
+    per-file and per-module events while the analysis runs.
+    Remote URLs are analyzed from the clone cache's mirror, straight from
+    its object database, at the tip of branch (default: the remote's HEAD)
+    or target_ref, fetched depth commits deep (0 = all).
+    """
+    async with _repository(repo_url, branch, depth, checkout=False) as (repo_path, fetched):
+        return await _analyze_path(repo_path, target_ref or fetched, base_snapshot, progress)
+
+async def _analyze_path(repo_path: str, target_ref: Optional[str],
+                        base_snapshot: Optional[AnalysisSnapshot],
+                        progress: Optional[AnalysisProgress]) -> AnalysisSnapshot:
+    versions = {analyzer_class.NAME: analyzer_class.VERSION for analyzer_class in ANALYZERS}
+    
+    commit, dirty = await asyncio.to_thread(resolve_commit, repo_path, target_ref)
+    base = base_snapshot
+    if base is not None and (commit is None or dirty or not base.can_base(versions)):
+        base = None
+    if base is not None and not await asyncio.to_thread(has_commit, repo_path, base.commit):
+        base = None
+    
+    # Run all analyzers in parallel, within the configured limits
+    budget = AnalysisBudget.from_settings().start()
+    run = await _build_pipeline(repo_path, commit, target_ref, base, progress, budget).run()
+    if progress is not None:
+        progress.finish()
+    
+    files = run.get("files", {})
+    results = {name: run.get(name, ({}, {}, None)) for name in versions}
+    analysis = run.report()
+    analysis["mode"] = "incremental" if base is not None else "full"
+    analysis["partial"] = budget.partial
+    analysis["budget"] = budget.report()
+    changed, removed = [], []
+    if base is not None and "changes" in run.results:
+        changed, removed = run.get("changes")
+        analysis["base_commit"] = base.commit
+        analysis["changed_files"] = len(changed)
+        analysis["removed_files"] = len(set(removed) - set(changed))
+    if "corpus" in run.results:
+        # Files deleted or left out by the budget also leave the base's skip list
+        dropped = list(removed) + sorted(budget.skipped_paths)
+        analysis["skipped_files"] = _skipped_files(run.get("corpus"), base, changed, dropped)
+    
+    result = await asyncio.to_thread(
+        _summarize_repository,
+        repo_path,
+        files,
+        {name: value[1] for name, value in results.items()},
+        {name: value[0] for name, value in results.items()}
+    )
+    result["commit"] = commit
+    result["analysis"] = analysis
+    
+    # Persisted with the snapshot for importer and blast-radius queries
+    dependency_records, dependency_result, _analyzer = results["dependencies"]
+    index = None
+    if "module_graph" in dependency_result:
+        index = await asyncio.to_thread(
+            DependencyIndex.from_adjacency, dependency_records, dependency_result["module_graph"]["adjacency"]
+        )
+    
+    return AnalysisSnapshot(
+        repo_path,
+        commit=commit,
+        dirty=dirty,
+        partial=budget.partial,
+        files=files,
+        records={name: value[0] for name, value in results.items()},
+        versions=versions,
+        result=result,
+        index=index,
+        symbols=results["yagni"][2].symbols if results["yagni"][2] is not None else None
+    )
+
+# Files analyzed per step of stream_file_records
+STREAM_BATCH_SIZE = 64
+
+async def stream_file_records(repo_url: str, analyzers: Optional[Sequence[str]] = None,
+                              batch_size: int = STREAM_BATCH_SIZE,
+                              budget: Optional[AnalysisBudget] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield one record per file of the working tree, {"file": path, <analyzer>: record, ...},
+    as files are analyzed. Files are processed batch_size at a time and released
+    afterwards, so memory stays bounded however large the repository is.
+    analyzers restricts the output to the named analyzers. The analysis
+    budget (by default the configured one) applies as in a full run; a
+    last {"summary": {"partial": ..., "budget": ...}} record reports what
+    it left out.
+    """
+    budget = budget if budget is not None else AnalysisBudget.from_settings()
+    async with _repository(repo_url) as (repo_path, _commit):
+        budget.start()
+        async for record in _stream_path(repo_path, analyzers, batch_size, budget):
+            yield record
+    yield {"summary": {"partial": budget.partial, "budget": budget.report()}}
+
+async def _stream_path(repo_path: str, analyzers: Optional[Sequence[str]],
+                       batch_size: int, budget: AnalysisBudget) -> AsyncIterator[Dict[str, Any]]:
+    classes = [cls for cls in ANALYZERS if analyzers is None or cls.NAME in analyzers]
+    corpus = await asyncio.to_thread(lambda: budget.admit(RepoCorpus.from_path(repo_path)))
+    
+    instances = [cls(repo_path, corpus) for cls in classes]
+    selected = {analyzer.NAME: {source.rel_path for source in analyzer.select(corpus)}
+                for analyzer in instances}
+    analyzed = {analyzer.NAME: 0 for analyzer in instances}
+    
+    for start in range(0, len(corpus), batch_size):
+        batch = corpus.files[start:start + batch_size]
+        chosen = [[source for source in batch if source.rel_path in selected[analyzer.NAME]]
+                  for analyzer in instances]
+        try:
+            per_analyzer = await asyncio.wait_for(_collect_all(instances, chosen), budget.remaining())
+        except asyncio.TimeoutError:
+            for analyzer in instances:
+                budget.mark_incomplete(analyzer.NAME, analyzed[analyzer.NAME], len(selected[analyzer.NAME]))
+            return
+        
+        records = {source.rel_path: {"file": source.rel_path} for source in batch}
+        for analyzer, sources, results in zip(instances, chosen, per_analyzer):
+            analyzed[analyzer.NAME] += len(sources)
+            budget.record_timeouts(analyzer.NAME, results)
+            for result in results:
+                records[result["file"]][analyzer.NAME] = {
+                    key: value for key, value in result.items() if key != "file"
+                }
+        
+        for source in batch:
+            source.release()
+        for record in records.values():
+            yield record
+
+async def estimate_repository(repo_url: str, sample_size: Optional[int] = None,
+                              seed: int = 0, branch: Optional[str] = None,
+                              depth: int = 0) -> Dict[str, Any]:
+    """
+    Estimate the complexity, documentation and YAGNI scores of the working
+    tree from a stratified sample of its files (by top-level directory and
+    size), each with a 95% confidence interval. Only the sample is read
+    and analyzed, so this takes a fraction of a full run; dependencies and
+    the module structure are left to the full run.
+    """
+    started = time.perf_counter()
+    async with _repository(repo_url, branch, depth) as (repo_path, _commit):
+        return await _estimate_path(repo_path, sample_size, seed, started)
+
+async def _estimate_path(repo_path: str, sample_size: Optional[int], seed: int,
+                         started: float) -> Dict[str, Any]:
+    budget = AnalysisBudget(max_file_bytes=settings.max_file_size_mb * 1024 * 1024)
+    corpus = await asyncio.to_thread(lambda: budget.admit(RepoCorpus.from_path(repo_path)))
+    commit, _dirty = await asyncio.to_thread(resolve_commit, repo_path)
+    
+    sample = StratifiedSample.draw(corpus.files, sample_size or settings.analysis_sample_size, seed)
+    sampled = sample.files
+    analyzers = [cls(repo_path, corpus) for cls in ANALYZERS if cls.NAME in ESTIMATORS]
+    
+    covered = [{source.rel_path for source in analyzer.select(corpus)} for analyzer in analyzers]
+    per_analyzer = await _collect_all(
+        analyzers, [[source for source in sampled if source.rel_path in paths] for paths in covered]
+    )
+    estimates = {
+        analyzer.NAME: sample.estimate(ESTIMATORS[analyzer.NAME], records)
+        for analyzer, records in zip(analyzers, per_analyzer)
+    }
+    
+    return {
+        "metrics": _repository_metrics(
+            estimates["complexity"]["score"],
+            estimates["documentation"]["score"],
+            estimates["yagni"]["score"],
+            None
+        ),
+        "estimates": estimates,
+        "structure": [],
+        "commit": commit,
+        "analysis": {
+            "mode": "sample",
+            "confidence": 0.95,
+            "sample": {**sample.describe(), "seed": seed},
+            "skipped_files": _skipped_files(corpus, None, [], []),
+            "budget": budget.report(),
+            "timings": {"total": round(time.perf_counter() - started, 4)}
+        }
+    }
+
+async def analyze_history(repo_url: str, branch: Optional[str] = None,
+                          target_ref: Optional[str] = None, step: int = 1,
+                          limit: Optional[int] = None, depth: int = 0,
+                          known: Optional[Mapping[str, Dict[str, Any]]] = None,
+                          progress: Optional[AnalysisProgress] = None) -> List[Dict[str, Any]]:
+    """
+    Repository metrics at every step-th commit of the first-parent history
+    of branch (or target_ref), at most limit commits, oldest first. Commits
+    are analyzed from the object database, each incrementally against the
+    one before, so only files changed in between are analyzed, and blobs
+    seen before at any commit of the run are never analyzed again (they
+    are memoized for the run, whatever the persistent cache holds). known maps commits to points
+    from earlier runs, reused when the analyzer versions match. Remote
+    repositories are fetched depth commits deep (0 = as deep as limit and
+    step need, or all history without a limit).
+    """
+    versions = {analyzer_class.NAME: analyzer_class.VERSION for analyzer_class in ANALYZERS}
+    depth = depth or (limit * step if limit else 0)
+    
+    async with _repository(repo_url, branch, depth, checkout=False) as (repo_path, fetched):
+        commits = await asyncio.to_thread(list_commits, repo_path, target_ref or fetched or "HEAD", step, limit)
+        commits.reverse()
+        
+        points = []
+        base = None
+        with memoized_results():
+            for position, (commit, committed_at) in enumerate(commits, start=1):
+                point = (known or {}).get(commit)
+                if point is not None and point.get("versions") == versions:
+                    # The next commit then starts over, mostly from the run's memo
+                    if base is not None:
+                        base.close()
+                    base = None
+                else:
+                    snapshot = await _analyze_path(repo_path, commit, base, None)
+                    analysis = snapshot.result["analysis"]
+                    point = {
+                        "commit": commit,
+                        "committed_at": committed_at,
+                        "metrics": snapshot.result["metrics"],
+                        "files": len(snapshot.files),
+                        "mode": analysis["mode"],
+                        "changed_files": analysis.get("changed_files", len(snapshot.files)),
+                        "partial": snapshot.partial,
+                        "versions": versions
+                    }
+                    if base is not None:
+                        base.close()
+                    base = snapshot
+                points.append(point)
+                if progress is not None:
+                    progress.commit_done(position, len(commits), point)
+            if base is not None:
+                base.close()
+    
+    return points
+
+async def analyze_repository(repo_url: str, branch: Optional[str] = None, depth: int = 1,
+                             base_snapshot: Optional[AnalysisSnapshot] = None,
+                             target_ref: Optional[str] = None,
+                             mode: str = "full", sample_size: Optional[int] = None):
+    """
+    Main repository analysis function
+    Analyzes the repository using all available analyzers
+    (mode="sample" returns estimate_repository's sampled estimates instead).
+    branch and depth apply to remote URLs, cloned into the clone cache.
+    """
+    if mode == "sample":
+        return await estimate_repository(repo_url, sample_size, branch=branch, depth=depth)
+    if mode != "full":
+        raise ValueError(f"Unknown analysis mode: {mode}")
+    snapshot = await analyze_snapshot(repo_url, target_ref=target_ref, base_snapshot=base_snapshot,
+                                      branch=branch, depth=depth)
+    snapshot.close()
+    return snapshot.result
+
 __all__ = [
+    "AnalysisBudget",
+    "AnalysisProgress",
+    "AnalysisSnapshot",
+    "CloneCache",
+    "DependencyIndex",
+    "RepoCorpus",
+    "SourceFile",
     "analyze_complexity",
     "analyze_dependencies", 
     "analyze_documentation",
     "detect_yagni",
-    "analyze_repository"
+    "rule_timings",
+    "analyze_history",
+    "analyze_repository",
+    "analyze_snapshot",
+    "estimate_repository",
+    "get_clone_cache",
+    "stream_file_records"
 ]
\ No newline at end of file
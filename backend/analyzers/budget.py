@@ -0,0 +1,101 @@
+"""
+Analysis Budget Module
+File size and count cutoffs and an overall deadline for one analysis
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from config import settings
+from .corpus import RepoCorpus
+
+class AnalysisBudget:
+    """
+    Limits applied to one analysis (0 disables a limit). Files above the size
+    cutoff are skipped and reported; beyond the file limit the rest of the
+    repository is left out and the result is partial. Once the deadline
+    passes, analyzers stop taking new batches and report what they finished.
+    """
+
+    def __init__(self, max_file_bytes: int = 0, max_files: int = 0, timeout_seconds: float = 0):
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.timeout_seconds = timeout_seconds
+        self.deadline: Optional[float] = None
+        self.skipped: List[Dict[str, Any]] = []
+        self.incomplete: Dict[str, Dict[str, int]] = {}
+        self.timed_out: List[Dict[str, str]] = []
+        self.truncated = False
+
+    @classmethod
+    def from_settings(cls) -> "AnalysisBudget":
+        return cls(
+            max_file_bytes=settings.max_file_size_mb * 1024 * 1024,
+            max_files=settings.max_files_to_analyze,
+            timeout_seconds=settings.analysis_timeout_seconds
+        )
+
+    def start(self) -> "AnalysisBudget":
+        """Start the clock"""
+        if self.timeout_seconds:
+            self.deadline = time.monotonic() + self.timeout_seconds
+        return self
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None without one)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def skipped_paths(self) -> Set[str]:
+        return {entry["file"] for entry in self.skipped}
+
+    @property
+    def partial(self) -> bool:
+        """Whether some of the repository was not analyzed (size cutoffs aside)"""
+        return self.truncated or bool(self.incomplete)
+
+    def admit(self, corpus: RepoCorpus) -> RepoCorpus:
+        """The corpus without files over the size cutoff, and at most max_files files"""
+        admitted = []
+        for source in corpus:
+            if self.max_file_bytes and source.size > self.max_file_bytes:
+                self.skipped.append({"file": source.rel_path, "reason": "file_too_large", "size": source.size})
+            elif self.max_files and len(admitted) >= self.max_files:
+                self.truncated = True
+                self.skipped.append({"file": source.rel_path, "reason": "file_limit"})
+            else:
+                admitted.append(source)
+
+        if len(admitted) == len(corpus):
+            return corpus
+        return RepoCorpus(str(corpus.repo_path), admitted, corpus.classified)
+
+    def mark_incomplete(self, analyzer: str, analyzed: int, total: int):
+        """Record that an analyzer ran out of time after analyzed of total files"""
+        self.incomplete[analyzer] = {"analyzed": analyzed, "total": total}
+
+    def record_timeouts(self, analyzer: str, results: List[Dict[str, Any]]):
+        """Note files the per-file watchdog interrupted"""
+        for record in results:
+            if record.get("timed_out"):
+                self.timed_out.append({"file": record["file"], "analyzer": analyzer})
+
+    def report(self) -> Dict[str, Any]:
+        """Limits and what they cut, for the analysis report"""
+        return {
+            "limits": {
+                "max_file_bytes": self.max_file_bytes,
+                "max_files": self.max_files,
+                "timeout_seconds": self.timeout_seconds,
+                "file_timeout_seconds": settings.analysis_file_timeout_seconds
+            },
+            "skipped": self.skipped,
+            "timed_out": self.timed_out,
+            "incomplete": self.incomplete
+        }
@@ -0,0 +1,319 @@
+"""
+Result Cache Module
+Persistent, content-addressed cache of per-file analyzer output (SQLite)
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from config import settings
+from .corpus import SourceFile
+from .executor import ResultCallback
+
+class ResultCache:
+    """
+    Per-file analyzer results keyed by (content hash, analyzer, analyzer version).
+
+    Entries are stored without their file path so identical content anywhere
+    in any repository shares one entry. Entries older than ttl_seconds are
+    ignored, and the least recently used entries are evicted once the stored
+    payloads exceed max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: int = 0):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS file_results (
+                digest TEXT NOT NULL,
+                analyzer TEXT NOT NULL,
+                version TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (digest, analyzer, version)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS file_results_accessed ON file_results (accessed_at)"
+        )
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM file_results"
+        ).fetchone()[0]
+
+    def _min_created_at(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+    def get_many(self, analyzer: str, version: str, digests: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch fresh cached results for the given content hashes"""
+        digests = list(dict.fromkeys(digests))
+        found: Dict[str, Dict[str, Any]] = {}
+        now = time.time()
+        min_created_at = self._min_created_at()
+
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(digests), 500):
+                batch = digests[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT digest, payload FROM file_results "
+                    f"WHERE analyzer = ? AND version = ? AND created_at >= ? "
+                    f"AND digest IN ({placeholders})",
+                    [analyzer, version, min_created_at, *batch]
+                ).fetchall()
+                for digest, payload in rows:
+                    found[digest] = json.loads(payload)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE file_results SET accessed_at = ? "
+                    "WHERE digest = ? AND analyzer = ? AND version = ?",
+                    [(now, digest, analyzer, version) for digest in found]
+                )
+                self._conn.commit()
+
+        return found
+
+    def put_many(self, analyzer: str, version: str, results: Dict[str, Dict[str, Any]]):
+        """Store results keyed by content hash, evicting old entries if over budget"""
+        if not results:
+            return
+
+        now = time.time()
+        rows = []
+        for digest, result in results.items():
+            payload = json.dumps(result, separators=(",", ":")).encode("utf-8")
+            rows.append((digest, analyzer, version, payload, len(payload), now, now))
+
+        with self._lock:
+            replaced = self._sizes(analyzer, version, list(results))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO file_results "
+                "(digest, analyzer, version, payload, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._total_bytes += sum(row[4] for row in rows) - replaced
+            self._evict()
+            self._conn.commit()
+
+    def _sizes(self, analyzer: str, version: str, digests: List[str]) -> int:
+        total = 0
+        for start in range(0, len(digests), 500):
+            batch = digests[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            total += self._conn.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM file_results "
+                f"WHERE analyzer = ? AND version = ? AND digest IN ({placeholders})",
+                [analyzer, version, *batch]
+            ).fetchone()[0]
+        return total
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones down to 90% of the budget"""
+        if self.ttl_seconds > 0:
+            self._conn.execute(
+                "DELETE FROM file_results WHERE created_at < ?", (self._min_created_at(),)
+            )
+            self._total_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM file_results"
+            ).fetchone()[0]
+
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT rowid, size FROM file_results ORDER BY accessed_at"
+        )
+        doomed = []
+        for rowid, size in rows:
+            if self._total_bytes <= target:
+                break
+            doomed.append((rowid,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM file_results WHERE rowid = ?", doomed)
+
+    def clear(self):
+        """Remove every cached result"""
+        with self._lock:
+            self._conn.execute("DELETE FROM file_results")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache: Optional[ResultCache] = None
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Return the process-wide result cache, or None when ENABLE_CACHE is off"""
+    global _cache
+    if not settings.enable_cache:
+        return None
+    if _cache is None:
+        _cache = ResultCache(
+            str(Path(settings.cache_dir) / "results.sqlite3"),
+            max_bytes=settings.cache_max_size_mb * 1024 * 1024,
+            ttl_seconds=settings.cache_ttl_seconds
+        )
+    return _cache
+
+# Results of the current run by (analyzer, version) and content hash, when
+# memoized_results() is active; consulted before (and regardless of) the
+# persistent cache
+_memo: ContextVar[Optional[Dict[Tuple[str, str], Dict[str, Dict[str, Any]]]]] = ContextVar("result_memo", default=None)
+
+@contextmanager
+def memoized_results() -> Iterator[None]:
+    """
+    Keep every per-file result computed or loaded inside the block in
+    memory, so content seen again (e.g. the same blob at another commit)
+    is never analyzed twice, whatever the persistent cache's TTL, size or
+    ENABLE_CACHE setting. Tasks and threads started inside share it.
+    """
+    token = _memo.set({})
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+class FileTask(NamedTuple):
+    """An analyzer's per-file function and the cache key of its results"""
+    analyzer: str
+    version: str
+    func: Callable[[SourceFile], Dict[str, Any]]
+
+# Called with (index into tasks, index into that task's sources, result)
+TaskResultCallback = Callable[[int, int, Dict[str, Any]], None]
+
+def _apply_each(funcs: Sequence[Callable[[SourceFile], Dict[str, Any]]], source: SourceFile) -> List[Dict[str, Any]]:
+    """Every function's result for one file, sharing its parse products (runs inside a worker)"""
+    return [func(source) for func in funcs]
+
+async def cached_map(executor, analyzer: str, version: str,
+                     func: Callable[[SourceFile], Dict[str, Any]],
+                     sources: Sequence[SourceFile],
+                     cache: Optional[ResultCache] = None,
+                     on_result: Optional[ResultCallback] = None) -> List[Dict[str, Any]]:
+    """
+    Run a per-file analyzer function over sources, reusing cached results for
+    content that has been analyzed before and dispatching only the misses.
+    on_result is called for every file as its result becomes available.
+    """
+    results = await cached_map_tasks(
+        executor, [FileTask(analyzer, version, func)], [sources], cache,
+        (lambda _task, index, result: on_result(index, result)) if on_result is not None else None
+    )
+    return results[0]
+
+async def cached_map_tasks(executor, tasks: Sequence[FileTask],
+                           sources: Sequence[Sequence[SourceFile]],
+                           cache: Optional[ResultCache] = None,
+                           on_result: Optional[TaskResultCallback] = None) -> List[List[Dict[str, Any]]]:
+    """
+    cached_map for several analyzers at once, each over its own sources
+    (sources[i] for tasks[i]), returning each task's results in its input
+    order. A file missed by several tasks is dispatched once, and one
+    worker runs all of their functions on it, so it is read and parsed
+    once whichever executor runs it; results are split back per task and
+    cache key here.
+    """
+    cache = cache if cache is not None else get_result_cache()
+    memo = _memo.get()
+    memos = [memo.setdefault((task.analyzer, task.version), {}) if memo is not None else None for task in tasks]
+    keyed = cache is not None or memo is not None
+
+    # Every distinct file once; positions map it to its index in each task's sources
+    unique: Dict[int, SourceFile] = {}
+    positions: List[Dict[int, int]] = []
+    for task_sources in sources:
+        positions.append({id(source): i for i, source in enumerate(task_sources)})
+        for source in task_sources:
+            unique.setdefault(id(source), source)
+
+    digests: Dict[int, str] = {}
+    if keyed and unique:
+        # Hashing reads every file; do it off the event loop
+        files = list(unique.values())
+        hashed = await asyncio.to_thread(lambda: [source.digest for source in files])
+        digests = {id(source): digest for source, digest in zip(files, hashed)}
+
+    results: List[List[Dict[str, Any]]] = [[None] * len(task_sources) for task_sources in sources]
+    # The tasks still lacking a result for each file
+    missing: Dict[int, List[int]] = {}
+    for t, (task, task_sources) in enumerate(zip(tasks, sources)):
+        hits: Dict[str, Dict[str, Any]] = {}
+        if keyed:
+            task_digests = [digests[id(source)] for source in task_sources]
+            if memos[t] is not None:
+                hits = {digest: memos[t][digest] for digest in task_digests if digest in memos[t]}
+            if cache is not None:
+                wanted = [digest for digest in task_digests if digest not in hits]
+                if wanted:
+                    stored = await asyncio.to_thread(cache.get_many, task.analyzer, task.version, wanted)
+                    hits.update(stored)
+                    if memos[t] is not None:
+                        memos[t].update(stored)
+        for i, source in enumerate(task_sources):
+            digest = digests.get(id(source))
+            if digest in hits:
+                results[t][i] = {"file": source.rel_path, **hits[digest]}
+                if on_result is not None:
+                    on_result(t, i, results[t][i])
+            else:
+                missing.setdefault(id(source), []).append(t)
+
+    # Files missed by the same tasks travel together
+    groups: Dict[Tuple[int, ...], List[SourceFile]] = {}
+    for key, wanting in missing.items():
+        groups.setdefault(tuple(wanting), []).append(unique[key])
+
+    fresh: List[Dict[str, Dict[str, Any]]] = [{} for _ in tasks]
+
+    def deliver(group: Tuple[int, ...], source: SourceFile, outcome: Any):
+        # A file the watchdog interrupted has one record for all of its tasks
+        values = outcome if isinstance(outcome, list) else [dict(outcome) for _ in group]
+        for t, result in zip(group, values):
+            i = positions[t][id(source)]
+            results[t][i] = result
+            if on_result is not None:
+                on_result(t, i, result)
+            # A timeout depends on load and limits, not on content; retry it next time
+            if keyed and not result.get("timed_out"):
+                fresh[t][digests[id(source)]] = {key: value for key, value in result.items() if key != "file"}
+
+    async def run_group(group: Tuple[int, ...], group_sources: List[SourceFile]):
+        await executor.map(
+            partial(_apply_each, tuple(tasks[t].func for t in group)),
+            group_sources,
+            lambda index, value: deliver(group, group_sources[index], value)
+        )
+
+    await asyncio.gather(*(run_group(group, group_sources) for group, group_sources in groups.items()))
+
+    for t, task in enumerate(tasks):
+        if memos[t] is not None:
+            memos[t].update(fresh[t])
+        if cache is not None:
+            await asyncio.to_thread(cache.put_many, task.analyzer, task.version, fresh[t])
+    return results
@@ -0,0 +1,68 @@
+"""
+Generated Code Classifier
+Recognizes generated, vendored and minified files from their path and first few kilobytes
+"""
+
+import re
+from typing import Dict, Optional, Sequence
+
+from config import settings
+
+# Bytes of a file looked at; markers and line statistics come from its start
+HEAD_BYTES = 8192
+
+# Header lines searched for generator markers
+HEADER_LINES = 15
+
+# Generators shout "DO NOT EDIT"; in lower case it is more likely prose
+GENERATED_MARKERS = re.compile(
+    rb"DO NOT EDIT|(?i:@generated|automatically generated|auto-?generated (?:file|code|by)"
+    rb"|code generated by|generated by the protocol buffer compiler"
+    rb"|generated by (?:protoc|grpc|thrift|swig|cython|flatc|antlr))"
+)
+
+# File name suffixes of protobuf/gRPC stubs
+GENERATED_SUFFIXES = ("_pb2.py", "_pb2_grpc.py", "_pb2.pyi")
+
+# Django migrations (migrations/0001_initial.py) and Alembic revisions ("Revision ID:" headers)
+MIGRATION_NAME = re.compile(r"^\d{4}_\w*\.py$")
+ALEMBIC_MARKERS = (b"Revision ID:", b"Revises:")
+
+# A file is minified when its lines average more than this many characters,
+# or one of them is at least MINIFIED_MAX_LINE long
+MINIFIED_MEAN_LINE = 200
+MINIFIED_MAX_LINE = 2000
+
+def classify(rel_path: str, head: bytes, vendor_directories: Optional[Sequence[str]] = None) -> Optional[Dict[str, str]]:
+    """
+    {"category": "vendored" | "generated" | "migration" | "minified", "reason": ...}
+    for a file the analyzers should skip, from its repository-relative path
+    and first HEAD_BYTES bytes; None for ordinary source
+    """
+    vendor_directories = settings.vendor_directories if vendor_directories is None else vendor_directories
+    parts = rel_path.split("/")
+    name = parts[-1]
+
+    for directory in parts[:-1]:
+        if directory in vendor_directories:
+            return {"category": "vendored", "reason": f"inside '{directory}/'"}
+
+    if name.endswith(GENERATED_SUFFIXES):
+        return {"category": "generated", "reason": "protobuf stub"}
+
+    header = b"\n".join(head.split(b"\n", HEADER_LINES)[:HEADER_LINES])
+    marker = GENERATED_MARKERS.search(header)
+    if marker:
+        return {"category": "generated", "reason": f"header marker '{marker.group(0).decode('ascii', 'replace')}'"}
+
+    if len(parts) > 1 and parts[-2] == "migrations" and MIGRATION_NAME.match(name):
+        return {"category": "migration", "reason": "Django migration"}
+    if all(marker in header for marker in ALEMBIC_MARKERS):
+        return {"category": "migration", "reason": "Alembic revision"}
+
+    lines = head.split(b"\n")
+    longest = max(len(line) for line in lines)
+    if longest >= MINIFIED_MAX_LINE or (len(head) >= 1024 and len(head) / len(lines) > MINIFIED_MEAN_LINE):
+        return {"category": "minified", "reason": f"longest line {longest} characters"}
+
+    return None
@@ -0,0 +1,251 @@
+"""
+Clone Cache Module
+Bare mirrors of remote repositories, fetched incrementally, with a reused worktree each
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import subprocess
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from config import settings
+from .git_objects import close_object_stores
+
+# Repository URLs cloned into the cache rather than read in place
+REMOTE_PREFIXES = ("http://", "https://", "ssh://", "git://", "file://", "git@")
+
+def is_remote_url(repo_url: str) -> bool:
+    """Whether repo_url names a remote repository (file:// URLs count, so the cache can be used locally)"""
+    return repo_url.startswith(REMOTE_PREFIXES)
+
+def _directory_size(path: Path) -> int:
+    """Bytes used by the files under path (symlinks not followed)"""
+    total = 0
+    stack = [str(path)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as scan:
+                for entry in scan:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+class CloneCache:
+    """
+    One entry per repository URL under root: a bare mirror (mirror.git)
+    fetched with the partial clone filter and, when depth > 0, shallowly,
+    and a detached worktree (worktree/) checked out at the fetched commit.
+    Later analyses fetch only what is new and move the same worktree, or
+    skip the worktree and read the mirror's objects directly. Least
+    recently used entries are evicted once the cache exceeds max_bytes
+    (0 = unlimited). Entries in use are never evicted. Each entry's size is
+    measured after it is fetched and recorded (in its size file), so
+    eviction never walks the rest of the cache.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 0, filter_spec: str = "", timeout_seconds: float = 0):
+        self.root = Path(root).resolve()
+        self.max_bytes = max_bytes
+        self.filter_spec = filter_spec
+        self.timeout_seconds = timeout_seconds
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Analyses using each entry
+        self._users: Dict[str, int] = {}
+        # Bytes used by each entry, as last measured
+        self._sizes: Dict[str, int] = {}
+
+    @staticmethod
+    def key_for(repo_url: str) -> str:
+        return hashlib.sha256(repo_url.rstrip("/").encode("utf-8")).hexdigest()[:24]
+
+    def _git(self, *args: str) -> str:
+        """Run git non-interactively and return its stdout; RuntimeError on failure"""
+        try:
+            completed = subprocess.run(
+                ["git", *args], capture_output=True, text=True,
+                env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+                timeout=self.timeout_seconds or None
+            )
+        except subprocess.TimeoutExpired as e:
+            raise RuntimeError(f"git timed out after {self.timeout_seconds}s") from e
+        if completed.returncode != 0:
+            message = completed.stderr.strip().splitlines()
+            raise RuntimeError(f"git failed: {message[-1] if message else completed.returncode}")
+        return completed.stdout.strip()
+
+    def fetch(self, repo_url: str, branch: Optional[str] = None, depth: int = 0,
+              in_use: Optional[Set[str]] = None) -> Tuple[Path, str]:
+        """
+        Fetch branch (default: the remote's HEAD) into the URL's mirror.
+        Returns (mirror path, commit SHA). Blocking; callers on the event
+        loop should use mirror() or checkout().
+        """
+        key = self.key_for(repo_url)
+        entry = self.root / key
+        mirror = entry / "mirror.git"
+        entry.mkdir(parents=True, exist_ok=True)
+        (entry / "url").write_text(repo_url, encoding="utf-8")
+
+        if not (mirror / "HEAD").exists():
+            shutil.rmtree(mirror, ignore_errors=True)
+            self._git("init", "--quiet", "--bare", str(mirror))
+            self._git("--git-dir", str(mirror), "remote", "add", "origin", repo_url)
+
+        fetch = ["--git-dir", str(mirror), "fetch", "--quiet", "--no-tags"]
+        if depth > 0:
+            fetch += ["--depth", str(depth)]
+        elif (mirror / "shallow").exists():
+            fetch.append("--unshallow")
+        if self.filter_spec:
+            fetch.append(f"--filter={self.filter_spec}")
+        self._git(*fetch, "origin", branch or "HEAD")
+        commit = self._git("--git-dir", str(mirror), "rev-parse", "FETCH_HEAD")
+        # Keeps the commit reachable, so gc does not prune it between analyses
+        self._git("--git-dir", str(mirror), "update-ref", f"refs/remotes/origin/{branch or 'HEAD'}", commit)
+
+        os.utime(entry)
+        self._measure(key)
+        self.evict((in_use or set()) | {key})
+        return mirror, commit
+
+    def sync(self, repo_url: str, branch: Optional[str] = None, depth: int = 0,
+             in_use: Optional[Set[str]] = None) -> Tuple[Path, str]:
+        """
+        Fetch branch into the URL's mirror and check it out in its worktree.
+        Returns (worktree path, commit SHA). Blocking, like fetch().
+        """
+        mirror, commit = self.fetch(repo_url, branch, depth, in_use)
+        worktree = mirror.parent / "worktree"
+        if (worktree / ".git").exists():
+            self._git("-C", str(worktree), "checkout", "--quiet", "--force", "--detach", commit)
+            self._git("-C", str(worktree), "clean", "--quiet", "--force", "-d", "-x")
+        else:
+            shutil.rmtree(worktree, ignore_errors=True)
+            self._git("--git-dir", str(mirror), "worktree", "prune")
+            self._git("--git-dir", str(mirror), "worktree", "add", "--quiet", "--force", "--detach",
+                      str(worktree), commit)
+        # The checkout changed the entry's size
+        self._measure(mirror.parent.name)
+        self.evict((in_use or set()) | {mirror.parent.name})
+        return worktree, commit
+
+    def _measure(self, key: str) -> int:
+        """Walk one entry and record its size"""
+        size = _directory_size(self.root / key)
+        self._sizes[key] = size
+        try:
+            (self.root / key / "size").write_text(str(size), encoding="utf-8")
+        except OSError:
+            pass
+        return size
+
+    def _size(self, key: str) -> int:
+        """Recorded size of an entry (measured once if a previous process left none)"""
+        if key not in self._sizes:
+            try:
+                self._sizes[key] = int((self.root / key / "size").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                return self._measure(key)
+        return self._sizes[key]
+
+    def entries(self) -> List[Dict[str, object]]:
+        """Cached repositories, least recently used first"""
+        found = []
+        if not self.root.is_dir():
+            return found
+        for entry in self.root.iterdir():
+            if not entry.is_dir():
+                continue
+            url_file = entry / "url"
+            found.append({
+                "key": entry.name,
+                "url": url_file.read_text(encoding="utf-8") if url_file.exists() else None,
+                "last_used": entry.stat().st_mtime,
+                "size": self._size(entry.name)
+            })
+        found.sort(key=lambda item: item["last_used"])
+        return found
+
+    def evict(self, keep: Set[str]) -> List[str]:
+        """Remove least recently used entries (other than keep) until within max_bytes"""
+        if not self.max_bytes:
+            return []
+        entries = self.entries()
+        total = sum(item["size"] for item in entries)
+        evicted = []
+        for item in entries:
+            if total <= self.max_bytes:
+                break
+            if item["key"] in keep:
+                continue
+            close_object_stores(str(self.root / item["key"]))
+            shutil.rmtree(self.root / item["key"], ignore_errors=True)
+            self._sizes.pop(item["key"], None)
+            total -= item["size"]
+            evicted.append(item["key"])
+        return evicted
+
+    def _in_use(self) -> Set[str]:
+        return {key for key, count in self._users.items() if count}
+
+    @asynccontextmanager
+    async def _use(self, key: str) -> AsyncIterator[None]:
+        """Keep an entry from eviction for the duration of the block"""
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            self._users[key] -= 1
+
+    @asynccontextmanager
+    async def mirror(self, repo_url: str, branch: Optional[str] = None,
+                     depth: int = 0) -> AsyncIterator[Tuple[Path, str]]:
+        """
+        (mirror path, fetched commit) of repo_url, for the duration of the
+        block. Only fetches take turns; any number of analyses can read
+        the mirror's objects at once.
+        """
+        key = self.key_for(repo_url)
+        async with self._use(key):
+            async with self._locks.setdefault(key, asyncio.Lock()):
+                fetched = await asyncio.to_thread(self.fetch, repo_url, branch, depth, self._in_use())
+            yield fetched
+
+    @asynccontextmanager
+    async def checkout(self, repo_url: str, branch: Optional[str] = None,
+                       depth: int = 0) -> AsyncIterator[Path]:
+        """
+        Worktree of repo_url at the tip of branch, for the duration of the
+        block. Analyses of the same URL take turns, since they share the
+        worktree.
+        """
+        key = self.key_for(repo_url)
+        async with self._use(key):
+            async with self._locks.setdefault(key, asyncio.Lock()):
+                worktree, _commit = await asyncio.to_thread(self.sync, repo_url, branch, depth, self._in_use())
+                yield worktree
+
+_clone_cache: Optional[CloneCache] = None
+
+def get_clone_cache() -> CloneCache:
+    """Return the process-wide clone cache"""
+    global _clone_cache
+    if _clone_cache is None:
+        _clone_cache = CloneCache(
+            str(Path(settings.cache_dir) / "repos"),
+            max_bytes=settings.clone_cache_max_size_mb * 1024 * 1024,
+            filter_spec=settings.clone_filter,
+            timeout_seconds=settings.clone_timeout_seconds
+        )
+    return _clone_cache
@@ -5,18 +5,33 @@ Analyzes cyclomatic complexity, cognitive complexity, and code maintainability
 
 import ast
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional
 from pathlib import Path
-from radon.complexity import cc_visit, cc_rank
-from radon.metrics import mi_visit, mi_rank
-from radon.raw import analyze
+from radon.complexity import cc_rank
+from radon.metrics import h_visit_ast, mi_compute, mi_rank
+from radon.visitors import ComplexityVisitor
 import asyncio
 
+from .corpus import RepoCorpus, SourceFile, get_corpus
+from .executor import AnalysisExecutor, ResultCallback, get_executor
+from .cache import FileTask, cached_map
+from .reducers import ComplexitySummary
+
 class ComplexityAnalyzer:
     """Analyze code complexity metrics"""
     
-    def __init__(self, repo_path: str):
+    # Cache key for per-file results; bump VERSION whenever per-file output changes
+    NAME = "complexity"
+    VERSION = "2"
+    SKIP_TESTS = True
+    # Generated, vendored and minified files are counted but not analyzed
+    SKIP_GENERATED = True
+    
+    def __init__(self, repo_path: str, corpus: Optional[RepoCorpus] = None,
+                 executor: Optional[AnalysisExecutor] = None):
         self.repo_path = Path(repo_path)
+        self.corpus = get_corpus(repo_path, corpus)
+        self.executor = executor or get_executor()
         self.results = {
             "cyclomatic_complexity": {},
             "cognitive_complexity": {},
@@ -24,16 +39,33 @@ class ComplexityAnalyzer:
             "raw_metrics": {}
         }
     
-    async def analyze_file(self, file_path: Path) -> Dict[str, Any]:
+    def select(self, corpus: RepoCorpus) -> List[SourceFile]:
+        """Files this analyzer covers"""
+        return list(corpus.iter_files(skip_tests=self.SKIP_TESTS, skip_generated=self.SKIP_GENERATED))
+    
+    async def collect(self, sources: List[SourceFile],
+                      on_result: Optional[ResultCallback] = None) -> List[Dict[str, Any]]:
+        """Per-file results for sources, served from the result cache where possible"""
+        return await cached_map(self.executor, self.NAME, self.VERSION, self.analyze_source, sources,
+                                on_result=on_result)
+    
+    @property
+    def file_task(self) -> FileTask:
+        """The per-file function and its cache key, for dispatch alongside other analyzers"""
+        return FileTask(self.NAME, self.VERSION, self.analyze_source)
+    
+    async def analyze_file(self, source: SourceFile) -> Dict[str, Any]:
         """Analyze a single Python file"""
+        return (await self.collect([source]))[0]
+    
+    @staticmethod
+    def analyze_source(source: SourceFile) -> Dict[str, Any]:
+        """Compute complexity metrics for one file (pure, safe to run in a worker process)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                code = f.read()
-            
-            # Cyclomatic complexity
-            cc_results = cc_visit(code)
+            # Cyclomatic complexity (radon is fed the shared AST instead of re-parsing)
+            visitor = ComplexityVisitor.from_ast(source.tree)
             cc_data = []
-            for item in cc_results:
+            for item in visitor.blocks:
                 cc_data.append({
                     "name": item.name,
                     "complexity": item.complexity,
@@ -41,95 +73,71 @@ class ComplexityAnalyzer:
                     "lineno": item.lineno
                 })
             
-            # Maintainability index
-            mi_score = mi_visit(code, multi=True)
+            # Raw metrics (LOC, comments, etc.), from the token pass shared with documentation
+            raw = source.raw_metrics
             
-            # Raw metrics (LOC, comments, etc.)
-            raw = analyze(code)
+            # Maintainability index from radon's formula with mi_visit(code, multi=True)'s
+            # comment share, but our lloc (never above radon's, so the score can be higher)
+            comments = (raw["comments"] + raw["multi"]) / float(raw["sloc"]) * 100 if raw["sloc"] != 0 else 0
+            mi_score = mi_compute(
+                h_visit_ast(source.tree).total.volume,
+                visitor.total_complexity,
+                raw["lloc"],
+                comments
+            )
             
             return {
-                "file": str(file_path.relative_to(self.repo_path)),
+                "file": source.rel_path,
                 "cyclomatic_complexity": cc_data,
                 "maintainability_index": mi_score,
                 "maintainability_rank": mi_rank(mi_score),
-                "raw_metrics": {
-                    "loc": raw.loc,
-                    "lloc": raw.lloc,
-                    "sloc": raw.sloc,
-                    "comments": raw.comments,
-                    "multi": raw.multi,
-                    "blank": raw.blank
-                }
+                "raw_metrics": dict(raw)
             }
         except Exception as e:
             return {
-                "file": str(file_path.relative_to(self.repo_path)),
+                "file": source.rel_path,
                 "error": str(e)
             }
     
+    @staticmethod
+    def file_summary(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Compact per-file figures for progress updates"""
+        if "error" in record:
+            return {"error": record["error"]}
+        return {
+            "complexity": sum(func["complexity"] for func in record["cyclomatic_complexity"]),
+            "maintainability_index": round(record["maintainability_index"], 2),
+            "loc": record["raw_metrics"]["loc"]
+        }
+    
     async def analyze_directory(self, directory: Path) -> List[Dict[str, Any]]:
         """Analyze all Python files in a directory"""
-        results = []
-        
-        for py_file in directory.rglob("*.py"):
-            # Skip test files and __pycache__
-            if "__pycache__" in str(py_file) or "test_" in py_file.name:
-                continue
-            
-            result = await self.analyze_file(py_file)
-            results.append(result)
-        
-        return results
+        # Skip test files (__pycache__ is never part of the corpus)
+        sources = list(self.corpus.iter_files(directory, skip_tests=self.SKIP_TESTS))
+        return await self.collect(sources)
     
-    async def calculate_summary(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def calculate_summary(self, results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
         """Calculate summary statistics"""
-        total_complexity = 0
-        total_files = 0
-        high_complexity_functions = []
-        total_loc = 0
-        
+        summary = ComplexitySummary()
         for file_result in results:
-            if "error" in file_result:
-                continue
-            
-            total_files += 1
-            
-            # Sum up complexity
-            for func in file_result.get("cyclomatic_complexity", []):
-                total_complexity += func["complexity"]
-                if func["complexity"] > 10:  # High complexity threshold
-                    high_complexity_functions.append({
-                        "file": file_result["file"],
-                        "function": func["name"],
-                        "complexity": func["complexity"],
-                        "rank": func["rank"]
-                    })
-            
-            # Sum up LOC
-            if file_result.get("raw_metrics"):
-                total_loc += file_result["raw_metrics"]["loc"]
-        
-        avg_complexity = total_complexity / total_files if total_files > 0 else 0
-        
-        return {
-            "total_files": total_files,
-            "total_loc": total_loc,
-            "average_complexity": round(avg_complexity, 2),
-            "high_complexity_functions": high_complexity_functions,
-            "complexity_score": min(100, max(0, 100 - (avg_complexity * 5)))  # Convert to 0-100 score
-        }
+            summary.add(file_result)
+        return summary.result()
     
-    async def run(self) -> Dict[str, Any]:
-        """Run the complete complexity analysis"""
-        results = await self.analyze_directory(self.repo_path)
+    async def summarize(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the analysis result from per-file results"""
         summary = await self.calculate_summary(results)
         
         return {
             "summary": summary,
             "details": results
         }
+    
+    async def run(self) -> Dict[str, Any]:
+        """Run the complete complexity analysis"""
+        results = await self.analyze_directory(self.repo_path)
+        return await self.summarize(results)
 
-async def analyze_complexity(repo_path: str) -> Dict[str, Any]:
+async def analyze_complexity(repo_path: str, corpus: Optional[RepoCorpus] = None) -> Dict[str, Any]:
     """Main entry point for complexity analysis"""
-    analyzer = ComplexityAnalyzer(repo_path)
+    analyzer = ComplexityAnalyzer(repo_path, corpus)
     return await analyzer.run()
\ No newline at end of file
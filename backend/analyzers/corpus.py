@@ -0,0 +1,209 @@
+"""
+Repository Corpus Module
+Reads and parses every source file once so all analyzers can share the work
+"""
+
+import ast
+import hashlib
+import io
+import tokenize
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from .classifier import HEAD_BYTES, classify
+from .discovery import discover_python_files
+from .raw_metrics import compute_raw_metrics
+from .rules import walk
+
+class SourceFile:
+    """A single Python source file with lazily computed, shared parse products"""
+
+    # Cached products dropped by release()
+    _DERIVED = ("text", "line_count", "tokens", "_parsed", "nodes", "raw_metrics")
+
+    def __init__(self, path: Path, rel_path: str, data: Optional[bytes] = None,
+                 size: Optional[int] = None):
+        self.path = Path(path)
+        self.rel_path = rel_path
+        # Size from discovery, so it need not be stat'ed again
+        self._size = size
+        # Content handed in (e.g. read from git) cannot be re-read from path
+        self._on_disk = data is None
+        if data is not None:
+            self.__dict__["data"] = data
+
+    def __repr__(self) -> str:
+        return f"SourceFile({self.rel_path!r})"
+
+    def __getstate__(self) -> Dict[str, object]:
+        # Only ship identity, size, where the content lives and (if already
+        # loaded) the raw bytes to worker processes. Derived products (tokens,
+        # AST, node walk) are cheaper to rebuild than to pickle; a file is
+        # shipped once for all analyzers (cached_map_tasks), so the worker
+        # rebuilds them once and every analyzer shares them.
+        state = {"path": self.path, "rel_path": self.rel_path, "_size": self._size, "_on_disk": self._on_disk}
+        if "data" in self.__dict__:
+            state["data"] = self.__dict__["data"]
+        return state
+
+    def __setstate__(self, state: Dict[str, object]):
+        self.__dict__.update(state)
+
+    @property
+    def name(self) -> str:
+        """File name without directories"""
+        return self.path.name
+
+    @property
+    def size(self) -> int:
+        """Size in bytes, without reading the file when it is not loaded yet"""
+        if "data" in self.__dict__:
+            return len(self.__dict__["data"])
+        if getattr(self, "_size", None) is not None:
+            return self._size
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def head(self, size: int) -> bytes:
+        """The first size bytes, without reading (or keeping) the rest when not loaded yet"""
+        if "data" in self.__dict__:
+            return self.__dict__["data"][:size]
+        try:
+            with open(self.path, 'rb') as f:
+                return f.read(size)
+        except OSError:
+            return b""
+
+    @cached_property
+    def data(self) -> bytes:
+        """Raw source bytes, read from disk on first access"""
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    @cached_property
+    def digest(self) -> str:
+        """Content hash, computed the way git hashes blobs so it matches git object IDs"""
+        sha = hashlib.sha1(f"blob {len(self.data)}\0".encode())
+        sha.update(self.data)
+        return sha.hexdigest()
+
+    @cached_property
+    def text(self) -> str:
+        """Decoded source text with universal newlines, as open(..., 'r') would return it"""
+        return io.TextIOWrapper(io.BytesIO(self.data), encoding='utf-8').read()
+
+    @cached_property
+    def line_count(self) -> int:
+        """Number of physical lines"""
+        return len(io.StringIO(self.text).readlines())
+
+    @cached_property
+    def tokens(self) -> List[tokenize.TokenInfo]:
+        """Token stream of the decoded source"""
+        return list(tokenize.generate_tokens(io.StringIO(self.text).readline))
+
+    @cached_property
+    def raw_metrics(self) -> Dict[str, int]:
+        """LOC, SLOC, comment, blank and docstring line counts from the shared token stream"""
+        return compute_raw_metrics(self.tokens, io.StringIO(self.text).readlines())
+
+    @cached_property
+    def _parsed(self) -> Tuple[Optional[ast.Module], Optional[Exception]]:
+        # Parse failures are remembered so every analyzer sees the same error
+        # without re-parsing the file
+        try:
+            return ast.parse(self.text), None
+        except (SyntaxError, ValueError) as e:
+            return None, e
+
+    @property
+    def tree(self) -> ast.Module:
+        """Parsed AST of the source (raises the original parse error on failure)"""
+        tree, error = self._parsed
+        if error is not None:
+            raise error
+        return tree
+
+    @cached_property
+    def nodes(self) -> List[Tuple[ast.AST, Tuple[Tuple[str, str], ...]]]:
+        """Every AST node with its enclosing definitions, walked once for all rules"""
+        return walk(self.tree)
+
+    def release(self):
+        """Free the cached content and parse products (the digest is kept); they are rebuilt on demand"""
+        for name in self._DERIVED:
+            self.__dict__.pop(name, None)
+        if getattr(self, "_on_disk", True):
+            self.__dict__.pop("data", None)
+
+class RepoCorpus:
+    """All Python source files of a repository, discovered once per analysis"""
+
+    def __init__(self, repo_path: str, files: Optional[List[SourceFile]] = None,
+                 classified: Optional[Dict[str, Dict[str, str]]] = None):
+        self.repo_path = Path(repo_path)
+        self.files: List[SourceFile] = files if files is not None else []
+        self._by_path: Dict[str, SourceFile] = {f.rel_path: f for f in self.files}
+        # Generated, vendored and minified files (path -> category and reason):
+        # counted, but skipped by analyzers with SKIP_GENERATED
+        self.classified: Dict[str, Dict[str, str]] = {
+            path: info for path, info in (classified or {}).items() if path in self._by_path
+        }
+
+    @classmethod
+    def from_path(cls, repo_path: str) -> "RepoCorpus":
+        """Discover all Python files under repo_path (see discover_python_files)"""
+        root = Path(repo_path)
+        # Path order keeps results deterministic across file systems and runs
+        files = [
+            SourceFile(root / rel_path, rel_path, size=size)
+            for rel_path, size in discover_python_files(str(root))
+        ]
+        return cls(repo_path, files).classify()
+
+    def classify(self) -> "RepoCorpus":
+        """Classify every file from its path and first few kilobytes (unless disabled by settings)"""
+        if settings.analysis_skip_generated:
+            for source in self.files:
+                info = classify(source.rel_path, source.head(HEAD_BYTES))
+                if info is not None:
+                    self.classified[source.rel_path] = info
+        return self
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __iter__(self) -> Iterator[SourceFile]:
+        return iter(self.files)
+
+    def get(self, rel_path: str) -> Optional[SourceFile]:
+        """Look up a file by its repository-relative path"""
+        return self._by_path.get(rel_path)
+
+    def iter_files(self, directory: Optional[Path] = None, skip_tests: bool = False,
+                   skip_generated: bool = False) -> Iterator[SourceFile]:
+        """
+        Iterate files, optionally restricted to a directory and excluding
+        test_ files and classified (generated, vendored, minified) files
+        """
+        directory = Path(directory) if directory is not None else None
+
+        for source in self.files:
+            if skip_tests and "test_" in source.name:
+                continue
+            if skip_generated and source.rel_path in self.classified:
+                continue
+            if directory is not None and directory != self.repo_path:
+                try:
+                    source.path.relative_to(directory)
+                except ValueError:
+                    continue
+            yield source
+
+def get_corpus(repo_path: str, corpus: Optional[RepoCorpus] = None) -> RepoCorpus:
+    """Return the given corpus or build one for repo_path"""
+    return corpus if corpus is not None else RepoCorpus.from_path(repo_path)
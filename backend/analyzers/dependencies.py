@@ -11,109 +11,177 @@ from pathlib import Path
 import asyncio
 from collections import defaultdict
 
+from .corpus import RepoCorpus, SourceFile, get_corpus
+from .executor import AnalysisExecutor, ResultCallback, get_executor
+from .cache import FileTask, cached_map
+from .module_graph import ModuleResolver, strongly_connected_components, cycle_through
+from .rules import Rule, Scope, run_rule
+
+# Standard library modules (simplified list)
+STDLIB_MODULES = {
+    'os', 'sys', 'json', 'math', 'random', 'datetime', 'collections',
+    'itertools', 'functools', 'typing', 'pathlib', 'asyncio', 're',
+    'urllib', 'http', 'email', 'csv', 'sqlite3', 'threading'
+}
+
+class ImportsRule(Rule):
+    """Import statements, categorized, plus [module, level, names] for resolving them"""
+    
+    NAME = "imports"
+    NODE_TYPES = (ast.Import, ast.ImportFrom)
+    
+    def __init__(self, rel_path: str, tree: ast.AST):
+        super().__init__(rel_path, tree)
+        self.imports = {
+            "standard_library": [],
+            "external": [],
+            "internal": []
+        }
+        self.specs = []
+    
+    def visit(self, node: ast.AST, scope: Scope):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                module_name = alias.name
+                DependencyAnalyzer.categorize_import(module_name, self.imports)
+                self.specs.append([module_name, 0, []])
+        
+        else:
+            level = node.level or 0
+            if node.module or level:
+                DependencyAnalyzer.categorize_import("." * level + (node.module or ""), self.imports)
+                self.specs.append([node.module or "", level, [alias.name for alias in node.names]])
+    
+    def result(self) -> Dict[str, Any]:
+        return {"imports": self.imports, "specs": self.specs}
+
 class DependencyAnalyzer:
     """Analyze code dependencies and imports"""
     
-    def __init__(self, repo_path: str):
+    # Cache key for per-file results; bump VERSION whenever per-file output changes
+    NAME = "dependencies"
+    VERSION = "2"
+    SKIP_TESTS = False
+    # Generated and vendored modules are still part of the import graph
+    SKIP_GENERATED = False
+    
+    def __init__(self, repo_path: str, corpus: Optional[RepoCorpus] = None,
+                 executor: Optional[AnalysisExecutor] = None):
         self.repo_path = Path(repo_path)
+        self.corpus = get_corpus(repo_path, corpus)
+        self.executor = executor or get_executor()
         self.import_graph = defaultdict(set)
         self.external_deps = set()
         self.internal_deps = defaultdict(set)
         self.circular_deps = []
+        self.import_specs: Dict[str, List[Any]] = {}
+        self.unresolved = defaultdict(set)
+        self.components: List[List[str]] = []
     
-    def extract_imports(self, file_path: Path) -> Dict[str, Any]:
-        """Extract import statements from a Python file"""
+    def select(self, corpus: RepoCorpus) -> List[SourceFile]:
+        """Files this analyzer covers"""
+        return list(corpus.iter_files(skip_tests=self.SKIP_TESTS, skip_generated=self.SKIP_GENERATED))
+    
+    async def collect(self, sources: List[SourceFile],
+                      on_result: Optional[ResultCallback] = None) -> List[Dict[str, Any]]:
+        """Per-file results for sources, served from the result cache where possible"""
+        return await cached_map(self.executor, self.NAME, self.VERSION, self.extract_imports, sources,
+                                on_result=on_result)
+    
+    @property
+    def file_task(self) -> FileTask:
+        """The per-file function and its cache key, for dispatch alongside other analyzers"""
+        return FileTask(self.NAME, self.VERSION, self.extract_imports)
+    
+    @staticmethod
+    def extract_imports(source: SourceFile) -> Dict[str, Any]:
+        """Extract import statements from a Python file (pure, safe to run in a worker process)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                tree = ast.parse(f.read())
-            
-            imports = {
-                "standard_library": [],
-                "external": [],
-                "internal": []
-            }
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    for alias in node.names:
-                        module_name = alias.name
-                        self.categorize_import(module_name, imports)
-                
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        self.categorize_import(node.module, imports)
+            tree = source.tree
+            found = run_rule(tree, source.rel_path, ImportsRule, source.nodes)
             
             return {
-                "file": str(file_path.relative_to(self.repo_path)),
-                "imports": imports
+                "file": source.rel_path,
+                "imports": found["imports"],
+                "specs": found["specs"]
             }
         
         except Exception as e:
             return {
-                "file": str(file_path.relative_to(self.repo_path)),
+                "file": source.rel_path,
                 "error": str(e)
             }
     
-    def categorize_import(self, module_name: str, imports: Dict[str, List[str]]):
+    @staticmethod
+    def file_summary(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Compact per-file figures for progress updates"""
+        if "error" in record:
+            return {"error": record["error"]}
+        return {"imports": sum(len(names) for names in record["imports"].values())}
+    
+    @staticmethod
+    def categorize_import(module_name: str, imports: Dict[str, List[str]]):
         """Categorize import as standard library, external, or internal"""
-        # Standard library modules (simplified list)
-        stdlib_modules = {
-            'os', 'sys', 'json', 'math', 'random', 'datetime', 'collections',
-            'itertools', 'functools', 'typing', 'pathlib', 'asyncio', 're',
-            'urllib', 'http', 'email', 'csv', 'sqlite3', 'threading'
-        }
-        
-        if module_name.split('.')[0] in stdlib_modules:
+        if module_name.split('.')[0] in STDLIB_MODULES:
             imports["standard_library"].append(module_name)
         elif module_name.startswith('.'):
             imports["internal"].append(module_name)
         else:
             imports["external"].append(module_name)
-            self.external_deps.add(module_name.split('.')[0])
     
     async def build_dependency_graph(self, directory: Path):
         """Build a dependency graph for all Python files"""
-        for py_file in directory.rglob("*.py"):
-            if "__pycache__" in str(py_file):
-                continue
-            
-            result = self.extract_imports(py_file)
+        sources = list(self.corpus.iter_files(directory, skip_tests=self.SKIP_TESTS))
+        self.add_import_results(await self.collect(sources))
+    
+    def add_import_results(self, results: List[Dict[str, Any]]):
+        """Add per-file import results; imports are resolved to files by resolve_imports"""
+        for result in results:
+            # Files that failed to parse can still be imported by others
+            self.import_specs.setdefault(result["file"], [])
             if "error" not in result:
-                file_key = str(py_file.relative_to(self.repo_path))
-                
-                for imp in result["imports"]["internal"]:
-                    self.internal_deps[file_key].add(imp)
+                self.import_specs[result["file"]] = result["specs"]
+    
+    def resolve_imports(self):
+        """Split imports into edges between repository files and external dependencies"""
+        resolver = ModuleResolver(self.import_specs)
+        
+        for file_key, specs in self.import_specs.items():
+            for module, level, names in specs:
+                if not level and module.split('.')[0] in STDLIB_MODULES:
+                    continue
                 
-                for imp in result["imports"]["external"]:
-                    self.import_graph[file_key].add(imp)
+                targets = resolver.resolve(file_key, module, level, names)
+                if targets:
+                    self.internal_deps[file_key].update(targets)
+                elif level:
+                    self.unresolved[file_key].add("." * level + module)
+                else:
+                    self.import_graph[file_key].add(module)
+                    self.external_deps.add(module.split('.')[0])
     
     def detect_circular_dependencies(self) -> List[List[str]]:
-        """Detect circular dependencies in the import graph"""
-        visited = set()
-        rec_stack = set()
-        cycles = []
-        
-        def dfs(node, path):
-            visited.add(node)
-            rec_stack.add(node)
-            path.append(node)
-            
-            for neighbor in self.internal_deps.get(node, []):
-                if neighbor not in visited:
-                    dfs(neighbor, path.copy())
-                elif neighbor in rec_stack:
-                    # Found a cycle
-                    cycle_start = path.index(neighbor)
-                    cycle = path[cycle_start:] + [neighbor]
-                    cycles.append(cycle)
-            
-            rec_stack.remove(node)
-        
-        for node in self.internal_deps:
-            if node not in visited:
-                dfs(node, [])
-        
-        return cycles
+        """One cycle per strongly connected component of the resolved file graph"""
+        graph = {node: sorted(deps) for node, deps in self.internal_deps.items()}
+        self.components = [
+            sorted(component) for component in strongly_connected_components(graph)
+            if len(component) > 1 or component[0] in graph.get(component[0], ())
+        ]
+        return sorted(cycle_through(graph, component) for component in self.components)
+    
+    def module_graph(self) -> Dict[str, Any]:
+        """The resolved import graph between repository files"""
+        return {
+            "files": len(self.import_specs),
+            "edges": sum(len(deps) for deps in self.internal_deps.values()),
+            "adjacency": {
+                node: sorted(deps) for node, deps in sorted(self.internal_deps.items()) if deps
+            },
+            "strongly_connected_components": sorted(self.components),
+            "unresolved_relative_imports": {
+                node: sorted(imports) for node, imports in sorted(self.unresolved.items())
+            }
+        }
     
     async def analyze_requirements(self) -> Dict[str, Any]:
         """Analyze requirements.txt or pyproject.toml"""
@@ -173,9 +241,14 @@ class DependencyAnalyzer:
             for module, count in sorted_imports
         ]
     
-    async def run(self) -> Dict[str, Any]:
-        """Run the complete dependency analysis"""
-        await self.build_dependency_graph(self.repo_path)
+    async def summarize(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the analysis result from per-file import results"""
+        self.add_import_results(results)
+        return await self.analyze_graph()
+    
+    async def analyze_graph(self) -> Dict[str, Any]:
+        """Compute cycles, requirements and metrics for the built graph"""
+        self.resolve_imports()
         self.circular_deps = self.detect_circular_dependencies()
         requirements = await self.analyze_requirements()
         metrics = await self.calculate_metrics()
@@ -183,10 +256,16 @@ class DependencyAnalyzer:
         return {
             "metrics": metrics,
             "circular_dependencies": self.circular_deps,
+            "module_graph": self.module_graph(),
             "requirements": requirements
         }
+    
+    async def run(self) -> Dict[str, Any]:
+        """Run the complete dependency analysis"""
+        await self.build_dependency_graph(self.repo_path)
+        return await self.analyze_graph()
 
-async def analyze_dependencies(repo_path: str) -> Dict[str, Any]:
+async def analyze_dependencies(repo_path: str, corpus: Optional[RepoCorpus] = None) -> Dict[str, Any]:
     """Main entry point for dependency analysis"""
-    analyzer = DependencyAnalyzer(repo_path)
+    analyzer = DependencyAnalyzer(repo_path, corpus)
     return await analyzer.run()
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Dependency Index Module
+Forward and reverse import adjacency of one analyzed snapshot, for impact queries
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+def dotted_name(rel_path: str) -> str:
+    """Module name of a file relative to the repository root (pkg/__init__.py -> pkg)"""
+    name = rel_path.replace("\\", "/")
+    if name.endswith(".py"):
+        name = name[:-3]
+    if name.endswith("/__init__"):
+        name = name[:-len("/__init__")]
+    return name.replace("/", ".")
+
+class DependencyIndex:
+    """
+    The resolved file-level import graph as integer adjacency lists in both
+    directions. Files are numbered in sorted order, so the index is compact
+    to persist and every query is a breadth-first walk over the edges it
+    reaches, without touching the repository.
+    """
+
+    def __init__(self, files: List[str], forward: List[List[int]], reverse: List[List[int]]):
+        self.files = files
+        self.forward = forward
+        self.reverse = reverse
+        self.ids = {path: i for i, path in enumerate(files)}
+
+        # Every dotted suffix of a file's module name, so "analyzers.cache" finds
+        # backend/analyzers/cache.py whatever directory the import root is
+        self.names: Dict[str, List[int]] = {}
+        for i, path in enumerate(files):
+            parts = dotted_name(path).split(".")
+            for start in range(len(parts)):
+                self.names.setdefault(".".join(parts[start:]), []).append(i)
+
+    @classmethod
+    def from_adjacency(cls, files: Iterable[str], adjacency: Mapping[str, Iterable[str]]) -> "DependencyIndex":
+        """Build from {file: [imported files]} (files missing from files are added)"""
+        nodes = set(files)
+        for source, targets in adjacency.items():
+            nodes.add(source)
+            nodes.update(targets)
+        ordered = sorted(nodes)
+        ids = {path: i for i, path in enumerate(ordered)}
+
+        forward: List[List[int]] = [[] for _ in ordered]
+        reverse: List[List[int]] = [[] for _ in ordered]
+        for source, targets in adjacency.items():
+            source_id = ids[source]
+            for target in sorted(set(targets)):
+                forward[source_id].append(ids[target])
+                reverse[ids[target]].append(source_id)
+        return cls(ordered, forward, reverse)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"files": self.files, "forward": self.forward, "reverse": self.reverse}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DependencyIndex":
+        return cls(data["files"], data["forward"], data["reverse"])
+
+    @property
+    def edge_count(self) -> int:
+        return sum(len(targets) for targets in self.forward)
+
+    def lookup(self, target: str) -> List[str]:
+        """Files matching a repository path or a (possibly partial) dotted module name"""
+        if target in self.ids:
+            return [target]
+        return [self.files[i] for i in self.names.get(target.strip("."), [])]
+
+    def _walk(self, edges: List[List[int]], start: Iterable[str],
+              max_depth: Optional[int]) -> List[Tuple[str, int]]:
+        """Files reachable from start along edges, with their distance, nearest first"""
+        seen = {self.ids[path] for path in start}
+        frontier = deque((i, 0) for i in seen)
+        reached = []
+        while frontier:
+            node, depth = frontier.popleft()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for neighbor in edges[node]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    reached.append((self.files[neighbor], depth + 1))
+                    frontier.append((neighbor, depth + 1))
+        return reached
+
+    def importers(self, files: Iterable[str], transitive: bool = True) -> List[Tuple[str, int]]:
+        """Files that import any of files, directly or (when transitive) through other files"""
+        return self._walk(self.reverse, files, None if transitive else 1)
+
+    def dependencies(self, files: Iterable[str], transitive: bool = True) -> List[Tuple[str, int]]:
+        """Files that any of files import, directly or (when transitive) through other files"""
+        return self._walk(self.forward, files, None if transitive else 1)
+
+    def blast_radius(self, changed: Iterable[str], max_depth: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Files affected by changing the given files: everything that imports
+        them, transitively up to max_depth. Unknown files are reported as such.
+        """
+        known, unknown = [], []
+        for path in dict.fromkeys(changed):
+            (known if path in self.ids else unknown).append(path)
+
+        affected = self._walk(self.reverse, known, max_depth)
+        return {
+            "changed": known,
+            "unknown": unknown,
+            "affected": [{"file": path, "distance": distance} for path, distance in affected],
+            "affected_count": len(affected),
+            "total_files": len(self.files)
+        }
@@ -0,0 +1,231 @@
+"""
+File Discovery Module
+Finds a repository's Python files once, through the git index when possible
+"""
+
+import fnmatch
+import os
+import re
+import subprocess
+from typing import List, Optional, Sequence, Set, Tuple
+
+from config import settings
+
+# (path relative to the root, size in bytes)
+DiscoveredFile = Tuple[str, int]
+
+# A directory holding this file is a virtualenv, whatever its name
+VIRTUALENV_MARKER = "pyvenv.cfg"
+
+def is_excluded(rel_path: str, excludes: Optional[Sequence[str]] = None) -> bool:
+    """Whether any directory of rel_path matches one of the exclude patterns"""
+    excludes = settings.discovery_excludes if excludes is None else excludes
+    directories = rel_path.split("/")[:-1]
+    return any(fnmatch.fnmatchcase(name, pattern) for name in directories for pattern in excludes)
+
+def virtualenv_roots(paths: Sequence[str]) -> Set[str]:
+    """Directories holding a pyvenv.cfg, from a listing of paths"""
+    marker = "/" + VIRTUALENV_MARKER
+    return {path[:-len(marker)] for path in paths if path.endswith(marker)}
+
+def in_virtualenv(path: str, roots: Set[str]) -> bool:
+    """Whether path lies inside one of the virtualenv directories roots"""
+    if not roots:
+        return False
+    parts = path.split("/")
+    return any("/".join(parts[:depth]) in roots for depth in range(1, len(parts)))
+
+def without_virtualenvs(paths: Sequence[str]) -> List[str]:
+    """
+    The Python files of a listing of paths (relative to the root, including
+    any pyvenv.cfg files) that are not inside a virtualenv below the root
+    """
+    roots = virtualenv_roots(paths)
+    return [path for path in paths if path.endswith(".py") and not in_virtualenv(path, roots)]
+
+def _translate(pattern: str) -> str:
+    """Regular expression for a gitignore glob (without its anchoring)"""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            parts.append("/.*")
+            i += 3
+            continue
+        if char == "*":
+            parts.append(".*" if pattern.startswith("**", i) else "[^/]*")
+            i += 2 if pattern.startswith("**", i) else 1
+            continue
+        if char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+class IgnoreRules:
+    """
+    The .gitignore patterns in effect in one directory: those of its own
+    .gitignore after those of its parents, the last matching pattern
+    deciding (so "!" patterns can re-include). Supports the usual syntax:
+    "#" comments, "!" negation, trailing "/" for directories only, patterns
+    with a "/" anchored to their .gitignore's directory, "*", "?", "[...]"
+    and "**".
+    """
+
+    def __init__(self, rules: Tuple[Tuple[str, "re.Pattern", bool, bool, bool], ...] = ()):
+        # (base directory, regex, anchored, negated, directories only)
+        self.rules = rules
+
+    def extend(self, base: str, lines: Sequence[str]) -> "IgnoreRules":
+        """Rules with the patterns of base/.gitignore added"""
+        added = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if not line:
+                continue
+            added.append((base, re.compile(_translate(line) + r"\Z"), anchored, negated, directory_only))
+        return IgnoreRules(self.rules + tuple(added)) if added else self
+
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        ignored = False
+        name = rel_path.rsplit("/", 1)[-1]
+        for base, regex, anchored, negated, directory_only in self.rules:
+            if directory_only and not is_dir:
+                continue
+            if anchored:
+                if base:
+                    if not rel_path.startswith(base + "/"):
+                        continue
+                    target = rel_path[len(base) + 1:]
+                else:
+                    target = rel_path
+            else:
+                target = name
+            if regex.match(target):
+                ignored = not negated
+        return ignored
+
+def _read_lines(path: str) -> List[str]:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.readlines()
+    except OSError:
+        return []
+
+def git_python_files(root: str) -> Optional[List[str]]:
+    """
+    Tracked and untracked-but-not-ignored Python files under root from the
+    git index, outside virtualenvs, relative to root (None when root is not
+    in a git work tree or git is unavailable)
+    """
+    try:
+        completed = subprocess.run(
+            ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard",
+             "--", "*.py", f"*/{VIRTUALENV_MARKER}"],
+            cwd=root, capture_output=True
+        )
+    except OSError:
+        return None
+    if completed.returncode != 0:
+        return None
+    paths = completed.stdout.decode("utf-8", errors="surrogateescape").split("\0")
+    return without_virtualenvs(sorted({path for path in paths if path}))
+
+def walk_python_files(root: str, excludes: Optional[Sequence[str]] = None) -> List[DiscoveredFile]:
+    """
+    Python files under root found with os.scandir, pruning excluded and
+    .gitignored directories and virtualenvs (directories with a pyvenv.cfg)
+    without descending into them. Symlinked directories are not followed.
+    """
+    excludes = settings.discovery_excludes if excludes is None else excludes
+    found = []
+    stack = [("", IgnoreRules())]
+
+    while stack:
+        rel_dir, rules = stack.pop()
+        directory = os.path.join(root, rel_dir) if rel_dir else root
+        try:
+            with os.scandir(directory) as scan:
+                entries = list(scan)
+        except OSError:
+            continue
+
+        names = {entry.name for entry in entries}
+        if rel_dir and VIRTUALENV_MARKER in names:
+            continue
+        if ".gitignore" in names:
+            rules = rules.extend(rel_dir, _read_lines(os.path.join(directory, ".gitignore")))
+
+        for entry in entries:
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if any(fnmatch.fnmatchcase(entry.name, pattern) for pattern in excludes):
+                        continue
+                    if not rules.ignored(rel, True):
+                        stack.append((rel, rules))
+                elif entry.name.endswith(".py") and entry.is_file() and not rules.ignored(rel, False):
+                    found.append((rel, entry.stat().st_size))
+            except OSError:
+                continue
+
+    found.sort()
+    return found
+
+def discover_python_files(root: str, excludes: Optional[Sequence[str]] = None,
+                          use_git: Optional[bool] = None) -> List[DiscoveredFile]:
+    """
+    Every Python file to analyze under root with its size, in path order:
+    from the git index when root is in a git work tree (honoring
+    .gitignore the way git does), otherwise by walking the file system
+    (honoring .gitignore files found on the way).
+    Virtualenvs and directories matching the exclude patterns are left
+    out either way.
+    """
+    excludes = settings.discovery_excludes if excludes is None else excludes
+    use_git = settings.discovery_use_git if use_git is None else use_git
+
+    paths = git_python_files(root) if use_git else None
+    if not paths:
+        # Not in a work tree, or nothing listed (e.g. root is a directory
+        # the enclosing repository ignores)
+        return walk_python_files(root, excludes)
+
+    found = []
+    for rel in paths:
+        if is_excluded(rel, excludes):
+            continue
+        try:
+            # Deleted from the working tree but still in the index
+            found.append((rel, os.stat(os.path.join(root, rel)).st_size))
+        except OSError:
+            continue
+    return found
@@ -9,30 +9,100 @@ from typing import Dict, List, Any, Optional
 from pathlib import Path
 import asyncio
 
+from .corpus import RepoCorpus, SourceFile, get_corpus
+from .executor import AnalysisExecutor, ResultCallback, get_executor
+from .cache import FileTask, cached_map
+from .rules import Rule, Scope, run_rule
+
+class DefinitionDocsRule(Rule):
+    """Docstring presence and quality of every function and class"""
+    
+    NAME = "definition_docs"
+    NODE_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+    
+    def __init__(self, rel_path: str, tree: ast.AST):
+        super().__init__(rel_path, tree)
+        self.functions = []
+        self.classes = []
+    
+    def visit(self, node: ast.AST, scope: Scope):
+        has_docstring = DocumentationAnalyzer.has_docstring
+        analyze_docstring_quality = DocumentationAnalyzer.analyze_docstring_quality
+        
+        if isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
+            func_info = {
+                "name": node.name,
+                "has_docstring": has_docstring(node),
+                "lineno": node.lineno
+            }
+            
+            if func_info["has_docstring"]:
+                docstring = ast.get_docstring(node)
+                func_info["docstring_quality"] = analyze_docstring_quality(docstring)
+            
+            self.functions.append(func_info)
+        
+        else:
+            class_info = {
+                "name": node.name,
+                "has_docstring": has_docstring(node),
+                "lineno": node.lineno,
+                "methods": []
+            }
+            
+            if class_info["has_docstring"]:
+                docstring = ast.get_docstring(node)
+                class_info["docstring_quality"] = analyze_docstring_quality(docstring)
+            
+            # Analyze methods
+            for item in node.body:
+                if isinstance(item, ast.FunctionDef):
+                    method_info = {
+                        "name": item.name,
+                        "has_docstring": has_docstring(item)
+                    }
+                    class_info["methods"].append(method_info)
+            
+            self.classes.append(class_info)
+    
+    def result(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {"functions": self.functions, "classes": self.classes}
+
 class DocumentationAnalyzer:
     """Analyze documentation coverage and quality"""
     
-    def __init__(self, repo_path: str):
+    # Cache key for per-file results; bump VERSION whenever per-file output changes
+    NAME = "documentation"
+    VERSION = "2"
+    SKIP_TESTS = False
+    # Generated, vendored and minified files are counted but not analyzed
+    SKIP_GENERATED = True
+    
+    # Repository totals the coverage figures are computed from
+    TOTALS = (
+        "documented_functions", "undocumented_functions",
+        "documented_classes", "undocumented_classes",
+        "documented_modules", "undocumented_modules",
+        "comment_lines", "total_lines"
+    )
+    
+    def __init__(self, repo_path: str, corpus: Optional[RepoCorpus] = None,
+                 executor: Optional[AnalysisExecutor] = None):
         self.repo_path = Path(repo_path)
-        self.results = {
-            "documented_functions": 0,
-            "undocumented_functions": 0,
-            "documented_classes": 0,
-            "undocumented_classes": 0,
-            "documented_modules": 0,
-            "undocumented_modules": 0,
-            "comment_lines": 0,
-            "total_lines": 0
-        }
+        self.corpus = get_corpus(repo_path, corpus)
+        self.executor = executor or get_executor()
+        self.results = dict.fromkeys(self.TOTALS, 0)
     
-    def has_docstring(self, node) -> bool:
+    @staticmethod
+    def has_docstring(node) -> bool:
         """Check if a node has a docstring"""
         return (
             ast.get_docstring(node) is not None and
             len(ast.get_docstring(node).strip()) > 0
         )
     
-    def analyze_docstring_quality(self, docstring: str) -> Dict[str, Any]:
+    @staticmethod
+    def analyze_docstring_quality(docstring: str) -> Dict[str, Any]:
         """Analyze the quality of a docstring"""
         if not docstring:
             return {"quality": "missing", "score": 0}
@@ -67,83 +137,99 @@ class DocumentationAnalyzer:
             "has_raises": has_raises
         }
     
-    async def analyze_file(self, file_path: Path) -> Dict[str, Any]:
+    def select(self, corpus: RepoCorpus) -> List[SourceFile]:
+        """Files this analyzer covers"""
+        return list(corpus.iter_files(skip_tests=self.SKIP_TESTS, skip_generated=self.SKIP_GENERATED))
+    
+    async def collect(self, sources: List[SourceFile],
+                      on_result: Optional[ResultCallback] = None) -> List[Dict[str, Any]]:
+        """Per-file results for sources, served from the result cache where possible"""
+        return await cached_map(self.executor, self.NAME, self.VERSION, self.analyze_source, sources,
+                                on_result=on_result)
+    
+    @property
+    def file_task(self) -> FileTask:
+        """The per-file function and its cache key, for dispatch alongside other analyzers"""
+        return FileTask(self.NAME, self.VERSION, self.analyze_source)
+    
+    async def analyze_file(self, source: SourceFile) -> Dict[str, Any]:
         """Analyze documentation in a single Python file"""
+        file_info = (await self.collect([source]))[0]
+        self.accumulate(file_info)
+        return file_info
+    
+    @staticmethod
+    def analyze_source(source: SourceFile) -> Dict[str, Any]:
+        """Collect documentation facts for one file (pure, safe to run in a worker process)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                tree = ast.parse(content)
+            tree = source.tree
+            raw = source.raw_metrics
+            
+            # Functions and classes, in one traversal
+            definitions = run_rule(tree, source.rel_path, DefinitionDocsRule, source.nodes)
             
             file_info = {
-                "file": str(file_path.relative_to(self.repo_path)),
+                "file": source.rel_path,
                 "module_docstring": ast.get_docstring(tree) is not None,
-                "functions": [],
-                "classes": [],
-                "total_lines": len(content.split('\\n')),
-                "comment_lines": content.count('#')
+                "functions": definitions["functions"],
+                "classes": definitions["classes"],
+                "total_lines": raw["loc"],
+                "comment_lines": raw["comments"],
+                "docstring_lines": raw["docstrings"]
             }
             
-            # Analyze functions
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
-                    func_info = {
-                        "name": node.name,
-                        "has_docstring": self.has_docstring(node),
-                        "lineno": node.lineno
-                    }
-                    
-                    if func_info["has_docstring"]:
-                        docstring = ast.get_docstring(node)
-                        func_info["docstring_quality"] = self.analyze_docstring_quality(docstring)
-                        self.results["documented_functions"] += 1
-                    else:
-                        self.results["undocumented_functions"] += 1
-                    
-                    file_info["functions"].append(func_info)
-                
-                elif isinstance(node, ast.ClassDef):
-                    class_info = {
-                        "name": node.name,
-                        "has_docstring": self.has_docstring(node),
-                        "lineno": node.lineno,
-                        "methods": []
-                    }
-                    
-                    if class_info["has_docstring"]:
-                        docstring = ast.get_docstring(node)
-                        class_info["docstring_quality"] = self.analyze_docstring_quality(docstring)
-                        self.results["documented_classes"] += 1
-                    else:
-                        self.results["undocumented_classes"] += 1
-                    
-                    # Analyze methods
-                    for item in node.body:
-                        if isinstance(item, ast.FunctionDef):
-                            method_info = {
-                                "name": item.name,
-                                "has_docstring": self.has_docstring(item)
-                            }
-                            class_info["methods"].append(method_info)
-                    
-                    file_info["classes"].append(class_info)
-            
-            # Update module stats
-            if file_info["module_docstring"]:
-                self.results["documented_modules"] += 1
-            else:
-                self.results["undocumented_modules"] += 1
-            
-            self.results["total_lines"] += file_info["total_lines"]
-            self.results["comment_lines"] += file_info["comment_lines"]
-            
             return file_info
         
         except Exception as e:
             return {
-                "file": str(file_path.relative_to(self.repo_path)),
+                "file": source.rel_path,
                 "error": str(e)
             }
     
+    @staticmethod
+    def file_summary(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Compact per-file figures for progress updates"""
+        if "error" in record:
+            return {"error": record["error"]}
+        return {
+            "functions": len(record["functions"]),
+            "documented_functions": sum(1 for func in record["functions"] if func["has_docstring"])
+        }
+    
+    @staticmethod
+    def file_totals(file_info: Dict[str, Any]) -> Dict[str, int]:
+        """One file's contribution to each of the repository totals"""
+        totals = dict.fromkeys(DocumentationAnalyzer.TOTALS, 0)
+        if "error" in file_info:
+            return totals
+        
+        for func_info in file_info["functions"]:
+            if func_info["has_docstring"]:
+                totals["documented_functions"] += 1
+            else:
+                totals["undocumented_functions"] += 1
+        
+        for class_info in file_info["classes"]:
+            if class_info["has_docstring"]:
+                totals["documented_classes"] += 1
+            else:
+                totals["undocumented_classes"] += 1
+        
+        # Update module stats
+        if file_info["module_docstring"]:
+            totals["documented_modules"] += 1
+        else:
+            totals["undocumented_modules"] += 1
+        
+        totals["total_lines"] = file_info["total_lines"]
+        totals["comment_lines"] = file_info["comment_lines"]
+        return totals
+    
+    def accumulate(self, file_info: Dict[str, Any]):
+        """Add one file's documentation facts to the repository totals"""
+        for key, value in self.file_totals(file_info).items():
+            self.results[key] += value
+    
     async def analyze_readme(self) -> Dict[str, Any]:
         """Check for and analyze README file"""
         readme_files = ["README.md", "README.rst", "README.txt", "README"]
@@ -167,30 +253,31 @@ class DocumentationAnalyzer:
         
         return {"exists": False}
     
-    async def calculate_coverage(self) -> Dict[str, Any]:
-        """Calculate documentation coverage metrics"""
-        total_functions = self.results["documented_functions"] + self.results["undocumented_functions"]
-        total_classes = self.results["documented_classes"] + self.results["undocumented_classes"]
-        total_modules = self.results["documented_modules"] + self.results["undocumented_modules"]
+    @staticmethod
+    def coverage_from_totals(totals: Dict[str, float]) -> Dict[str, float]:
+        """Coverage percentages and overall score (unrounded) from repository totals"""
+        total_functions = totals["documented_functions"] + totals["undocumented_functions"]
+        total_classes = totals["documented_classes"] + totals["undocumented_classes"]
+        total_modules = totals["documented_modules"] + totals["undocumented_modules"]
         
         function_coverage = (
-            self.results["documented_functions"] / total_functions * 100
+            totals["documented_functions"] / total_functions * 100
             if total_functions > 0 else 0
         )
         
         class_coverage = (
-            self.results["documented_classes"] / total_classes * 100
+            totals["documented_classes"] / total_classes * 100
             if total_classes > 0 else 0
         )
         
         module_coverage = (
-            self.results["documented_modules"] / total_modules * 100
+            totals["documented_modules"] / total_modules * 100
             if total_modules > 0 else 0
         )
         
         comment_ratio = (
-            self.results["comment_lines"] / self.results["total_lines"] * 100
-            if self.results["total_lines"] > 0 else 0
+            totals["comment_lines"] / totals["total_lines"] * 100
+            if totals["total_lines"] > 0 else 0
         )
         
         # Overall documentation score
@@ -202,23 +289,22 @@ class DocumentationAnalyzer:
         )
         
         return {
-            "function_coverage": round(function_coverage, 2),
-            "class_coverage": round(class_coverage, 2),
-            "module_coverage": round(module_coverage, 2),
-            "comment_ratio": round(comment_ratio, 2),
-            "overall_score": round(overall_score, 2)
+            "function_coverage": function_coverage,
+            "class_coverage": class_coverage,
+            "module_coverage": module_coverage,
+            "comment_ratio": comment_ratio,
+            "overall_score": overall_score
         }
     
-    async def run(self) -> Dict[str, Any]:
-        """Run the complete documentation analysis"""
-        file_results = []
-        
-        for py_file in self.repo_path.rglob("*.py"):
-            if "__pycache__" in str(py_file):
-                continue
-            
-            result = await self.analyze_file(py_file)
-            file_results.append(result)
+    async def calculate_coverage(self) -> Dict[str, Any]:
+        """Calculate documentation coverage metrics"""
+        coverage = self.coverage_from_totals(self.results)
+        return {key: round(value, 2) for key, value in coverage.items()}
+    
+    async def summarize(self, file_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the analysis result from per-file documentation results"""
+        for result in file_results:
+            self.accumulate(result)
         
         readme_info = await self.analyze_readme()
         coverage = await self.calculate_coverage()
@@ -236,8 +322,13 @@ class DocumentationAnalyzer:
             },
             "files": file_results
         }
+    
+    async def run(self) -> Dict[str, Any]:
+        """Run the complete documentation analysis"""
+        file_results = await self.collect(self.select(self.corpus))
+        return await self.summarize(file_results)
 
-async def analyze_documentation(repo_path: str) -> Dict[str, Any]:
+async def analyze_documentation(repo_path: str, corpus: Optional[RepoCorpus] = None) -> Dict[str, Any]:
     """Main entry point for documentation analysis"""
-    analyzer = DocumentationAnalyzer(repo_path)
+    analyzer = DocumentationAnalyzer(repo_path, corpus)
     return await analyzer.run()
\ No newline at end of file
@@ -0,0 +1,219 @@
+"""
+Analysis Executor Module
+Dispatches CPU-bound per-file analysis off the event loop
+"""
+
+import asyncio
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+from .corpus import SourceFile
+from .rules import drain_rule_timings, merge_rule_timings
+
+# Called on the event loop with (index into sources, result) as results arrive
+ResultCallback = Callable[[int, Any], None]
+
+class FileTimeout(BaseException):
+    """
+    Raised in a worker when one file exceeds its time limit. Not an
+    Exception, so analyzers' own error handling does not swallow it.
+    """
+
+def _on_alarm(signum, frame):
+    raise FileTimeout()
+
+def _run_chunk(func: Callable[[SourceFile], Any], sources: Sequence[SourceFile],
+               file_timeout: float = 0) -> Tuple[List[Any], Dict[str, List[float]]]:
+    """
+    Apply a per-file function to a chunk of sources (runs inside a worker),
+    returning the rule timings it accumulated along with the results.
+    With file_timeout, a file still running after that many seconds is
+    interrupted and gets a "timed_out" error record instead (only possible
+    on the main thread of a process, i.e. in pool workers).
+    """
+    if not file_timeout or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        return [func(source) for source in sources], drain_rule_timings()
+
+    results = []
+    previous = signal.signal(signal.SIGALRM, _on_alarm)
+    try:
+        for source in sources:
+            try:
+                signal.setitimer(signal.ITIMER_REAL, file_timeout)
+                result = func(source)
+                signal.setitimer(signal.ITIMER_REAL, 0)
+            except FileTimeout:
+                result = {
+                    "file": source.rel_path,
+                    "error": f"Analysis timed out after {file_timeout}s",
+                    "timed_out": True
+                }
+            results.append(result)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+    return results, drain_rule_timings()
+
+def _warm_worker():
+    """Pre-import the analysis stack so the first real task does not pay for it"""
+    import ast  # noqa: F401
+    import tokenize  # noqa: F401
+    import radon.complexity  # noqa: F401
+    import radon.metrics  # noqa: F401
+    import radon.visitors  # noqa: F401
+    from analyzers import complexity, dependencies, documentation, yagni_detector  # noqa: F401
+
+def _noop() -> None:
+    return None
+
+class AnalysisExecutor:
+    """Runs a per-file function over many sources, returning results in input order"""
+
+    def start(self):
+        """Prepare workers ahead of the first analysis"""
+
+    def shutdown(self):
+        """Release workers"""
+
+    async def map(self, func: Callable[[SourceFile], Any], sources: Sequence[SourceFile],
+                  on_result: Optional[ResultCallback] = None) -> List[Any]:
+        raise NotImplementedError
+
+class ThreadAnalysisExecutor(AnalysisExecutor):
+    """Runs all per-file work in one background thread, sharing the in-process corpus cache"""
+
+    # Files handed to the thread at a time, so results can be reported as they finish
+    CHUNK_SIZE = 32
+
+    async def map(self, func: Callable[[SourceFile], Any], sources: Sequence[SourceFile],
+                  on_result: Optional[ResultCallback] = None) -> List[Any]:
+        results: List[Any] = []
+        for start in range(0, len(sources), self.CHUNK_SIZE):
+            values, timings = await asyncio.to_thread(_run_chunk, func, sources[start:start + self.CHUNK_SIZE])
+            merge_rule_timings(timings)
+            if on_result is not None:
+                for offset, value in enumerate(values):
+                    on_result(start + offset, value)
+            results.extend(values)
+        return results
+
+class ProcessPoolAnalysisExecutor(AnalysisExecutor):
+    """
+    Runs per-file work on a pool of warm worker processes. Sources travel
+    without their parse products, so every map() re-parses the files it
+    ships (pickling ASTs costs more than re-parsing); callers dispatch each
+    file once for all analyzers rather than once per analyzer.
+    """
+
+    # Aim for several chunks per worker so stragglers even out
+    CHUNKS_PER_WORKER = 4
+    MAX_FILES_PER_CHUNK = 64
+
+    def __init__(self, workers: Optional[int] = None, file_timeout: Optional[float] = None):
+        self.workers = workers or settings.analysis_workers
+        self.file_timeout = settings.analysis_file_timeout_seconds if file_timeout is None else file_timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker
+            )
+        return self._pool
+
+    def start(self):
+        """Spawn every worker now so analyses never wait on interpreter startup"""
+        pool = self._get_pool()
+        for _ in range(self.workers):
+            pool.submit(_noop)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def make_chunks(self, sources: Sequence[SourceFile]) -> List[List[int]]:
+        """Group source indices into chunks, largest files first, balanced by bytes"""
+        order = sorted(range(len(sources)), key=lambda i: sources[i].size, reverse=True)
+        total_bytes = sum(sources[i].size for i in order)
+        target_bytes = max(1, total_bytes // (self.workers * self.CHUNKS_PER_WORKER))
+
+        chunks = []
+        current: List[int] = []
+        current_bytes = 0
+        for index in order:
+            current.append(index)
+            current_bytes += sources[index].size
+            if current_bytes >= target_bytes or len(current) >= self.MAX_FILES_PER_CHUNK:
+                chunks.append(current)
+                current = []
+                current_bytes = 0
+        if current:
+            chunks.append(current)
+
+        return chunks
+
+    async def map(self, func: Callable[[SourceFile], Any], sources: Sequence[SourceFile],
+                  on_result: Optional[ResultCallback] = None) -> List[Any]:
+        if not sources:
+            return []
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        results: List[Any] = [None] * len(sources)
+
+        async def run_chunk(chunk: List[int]):
+            values, timings = await loop.run_in_executor(
+                pool, _run_chunk, func, [sources[i] for i in chunk], self.file_timeout
+            )
+            merge_rule_timings(timings)
+            # Merge back in input order regardless of completion order
+            for index, value in zip(chunk, values):
+                results[index] = value
+                if on_result is not None:
+                    on_result(index, value)
+
+        try:
+            await asyncio.gather(*(run_chunk(chunk) for chunk in self.make_chunks(sources)))
+        except BrokenProcessPool:
+            # A worker died (e.g. killed by the OS); start a fresh pool next time
+            self.shutdown()
+            raise
+
+        return results
+
+_executor: Optional[AnalysisExecutor] = None
+
+def create_executor(kind: Optional[str] = None) -> AnalysisExecutor:
+    """Create an executor of the given kind ("process" or "thread")"""
+    kind = kind or settings.analysis_executor
+    if kind == "thread":
+        return ThreadAnalysisExecutor()
+    if kind == "process":
+        return ProcessPoolAnalysisExecutor()
+    raise ValueError(f"Unknown analysis executor: {kind}")
+
+def get_executor() -> AnalysisExecutor:
+    """Return the process-wide analysis executor"""
+    global _executor
+    if _executor is None:
+        _executor = create_executor()
+    return _executor
+
+def set_executor(executor: Optional[AnalysisExecutor]):
+    """Replace the process-wide executor (shutting down the previous one)"""
+    global _executor
+    if _executor is not None and _executor is not executor:
+        _executor.shutdown()
+    _executor = executor
+
+def shutdown_executor():
+    """Shut down the process-wide executor if one was created"""
+    set_executor(None)
@@ -0,0 +1,234 @@
+"""
+Git Corpus Module
+Builds corpora from git commits (read from the object database) and lists the Python files changed between commits
+"""
+
+from functools import cached_property
+from pathlib import Path, PurePosixPath
+from typing import List, Optional, Set, Tuple
+
+from git import Repo
+from git.exc import BadName, GitCommandError, InvalidGitRepositoryError, NoSuchPathError
+
+from .corpus import RepoCorpus, SourceFile
+from .discovery import in_virtualenv, is_excluded, virtualenv_roots, without_virtualenvs
+from .git_objects import GitObjectStore, get_object_store
+
+def open_repo(repo_path: str) -> Optional[Repo]:
+    """Open the git repository containing repo_path, or None if it is not in one"""
+    try:
+        return Repo(repo_path, search_parent_directories=True)
+    except (InvalidGitRepositoryError, NoSuchPathError):
+        return None
+
+def _prefix(repo: Repo, repo_path: str) -> str:
+    """Path of repo_path inside the git work tree ("" when it is the root or the repository is bare)"""
+    if repo.working_tree_dir is None:
+        return ""
+    rel = Path(repo_path).resolve().relative_to(Path(repo.working_tree_dir).resolve())
+    return "" if str(rel) == "." else rel.as_posix()
+
+def _to_rel_path(git_path: str, prefix: str) -> Optional[str]:
+    """Map a git path to a path relative to the analyzed directory (None if outside it)"""
+    if prefix:
+        if not git_path.startswith(prefix + "/"):
+            return None
+        git_path = git_path[len(prefix) + 1:]
+    return str(PurePosixPath(git_path))
+
+def _is_python_file(git_path: str) -> bool:
+    return git_path.endswith(".py") and "__pycache__" not in git_path
+
+def _analyzed_path(git_path: str, prefix: str) -> Optional[str]:
+    """Path relative to the analyzed directory of a file discovery would pick (None otherwise)"""
+    if not _is_python_file(git_path):
+        return None
+    rel = _to_rel_path(git_path, prefix)
+    if rel is None or is_excluded(rel):
+        return None
+    return rel
+
+def resolve_commit(repo_path: str, ref: Optional[str] = None) -> Tuple[Optional[str], bool]:
+    """
+    Resolve ref (default HEAD) to a commit SHA.
+    Returns (sha, dirty) where dirty tells whether the working tree differs from
+    HEAD; (None, False) when repo_path is not inside a git repository.
+    """
+    repo = open_repo(repo_path)
+    if repo is None:
+        if ref:
+            raise ValueError(f"{repo_path} is not a git repository, cannot resolve '{ref}'")
+        return None, False
+
+    try:
+        commit = repo.commit(ref or "HEAD")
+    except (BadName, ValueError) as e:
+        if ref:
+            raise ValueError(f"Unknown git ref '{ref}'") from e
+        # Repository without commits yet
+        return None, True
+
+    dirty = ref is None and repo.is_dirty(untracked_files=True)
+    return commit.hexsha, dirty
+
+def has_commit(repo_path: str, sha: str) -> bool:
+    """Whether the repository containing repo_path has the commit (shallow clones may lack old ones)"""
+    repo = open_repo(repo_path)
+    if repo is None:
+        return False
+    try:
+        repo.git.cat_file("-e", f"{sha}^{{commit}}")
+    except GitCommandError:
+        return False
+    return True
+
+def list_commits(repo_path: str, ref: str, step: int = 1,
+                 limit: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    (SHA, commit time) of ref and every step-th commit before it on its
+    first-parent history, newest first, at most limit of them (history
+    stops early at the boundary of a shallow clone)
+    """
+    repo = open_repo(repo_path)
+    if repo is None:
+        raise ValueError(f"{repo_path} is not a git repository")
+    args = ["--first-parent", "--format=%H %ct"]
+    if limit:
+        args.append(f"--max-count={limit * step}")
+    try:
+        output = repo.git.log(*args, ref)
+    except GitCommandError as e:
+        raise ValueError(f"Unknown git ref '{ref}'") from e
+    commits = []
+    for line in output.splitlines()[::step]:
+        sha, _, timestamp = line.partition(" ")
+        commits.append((sha, int(timestamp)))
+    return commits[:limit] if limit else commits
+
+def diff_python_files(repo_path: str, base_sha: str, target_sha: str) -> Tuple[List[str], List[str]]:
+    """
+    Python files that differ between two commits, as paths relative to repo_path.
+    Returns (changed, removed): changed files must be re-analyzed at target,
+    removed files must be dropped from the base results. Modified and renamed
+    files appear in both lists. Files inside committed virtualenvs are left
+    out as a full listing leaves them out, including unchanged files whose
+    directory became (or stopped being) a virtualenv.
+    """
+    repo = open_repo(repo_path)
+    prefix = _prefix(repo, repo_path)
+    store = get_object_store(repo.common_dir)
+    base_paths = [path for path, _blob in store.tree_entries(base_sha, prefix)]
+    target_paths = [path for path, _blob in store.tree_entries(target_sha, prefix)]
+    base_envs, target_envs = virtualenv_roots(base_paths), virtualenv_roots(target_paths)
+    changed, removed = set(), set()
+
+    def add(paths: Set[str], git_path: str, envs: Set[str]):
+        rel = _analyzed_path(git_path, prefix)
+        if rel is not None and not in_virtualenv(git_path, envs):
+            paths.add(rel)
+
+    for diff in repo.commit(base_sha).diff(target_sha):
+        if diff.a_path and not diff.new_file:
+            add(removed, diff.a_path, base_envs)
+        if diff.b_path and not diff.deleted_file:
+            add(changed, diff.b_path, target_envs)
+
+    if base_envs != target_envs:
+        # Unchanged files entering a virtualenv are dropped, leaving one re-analyzed
+        entered, left = target_envs - base_envs, base_envs - target_envs
+        for path in base_paths:
+            if in_virtualenv(path, entered):
+                add(removed, path, set())
+        for path in target_paths:
+            if in_virtualenv(path, left):
+                add(changed, path, target_envs)
+
+    return sorted(changed), sorted(removed)
+
+class BlobSource(SourceFile):
+    """
+    A file of a commit, read from the object store when first needed
+    rather than checked out. Its blob SHA is its digest (SourceFile hashes
+    content the way git does), so cached results are found without reading it.
+    """
+
+    def __init__(self, path: Path, rel_path: str, sha: str, store: GitObjectStore,
+                 size: Optional[int] = None):
+        super().__init__(path, rel_path, size=size)
+        self.sha = sha
+        self._store = store
+        self.__dict__["digest"] = sha
+
+    def __getstate__(self):
+        # Worker processes cannot reach the store; ship the content (a
+        # missing blob then fails there, as a per-file error)
+        state = super().__getstate__()
+        state.update(sha=self.sha, _store=None)
+        try:
+            state["data"] = self.data
+        except OSError:
+            pass
+        return state
+
+    def _read(self) -> bytes:
+        try:
+            if self._store is None:
+                raise KeyError(self.sha)
+            return self._store.read(self.sha)
+        except KeyError:
+            # A blob missing from (or not fetched into) the repository fails this file only
+            raise FileNotFoundError(f"Blob {self.sha} of {self.rel_path} is not in the repository") from None
+
+    @cached_property
+    def data(self) -> bytes:
+        return self._read()
+
+    def head(self, size: int) -> bytes:
+        # The blob is read whole, but only kept once analysis loads it
+        if "data" in self.__dict__:
+            return self.__dict__["data"][:size]
+        try:
+            return self._read()[:size]
+        except OSError:
+            return b""
+
+    def release(self):
+        super().release()
+        # Blobs can be read again
+        self.__dict__.pop("data", None)
+
+def corpus_from_commit(repo_path: str, sha: str, paths: Optional[List[str]] = None,
+                       classify: bool = True) -> RepoCorpus:
+    """
+    Build a corpus from the blobs of a commit without touching the working
+    tree, listing the tree and reading blobs on demand through the
+    repository's shared object store (bare mirrors work too).
+    Only the given paths (relative to repo_path) are loaded when paths is set.
+    Without classify the files are left unclassified (classifying reads the
+    start of every blob), so size cutoffs can be applied first.
+    """
+    repo = open_repo(repo_path)
+    prefix = _prefix(repo, repo_path)
+    store = get_object_store(repo.common_dir)
+    entries = store.tree_entries(sha, prefix)
+    root = Path(repo_path)
+
+    if paths is None:
+        # Leave out committed virtualenvs, as discovery does
+        kept = set(without_virtualenvs([path for path, _blob in entries]))
+    else:
+        kept = {f"{prefix}/{rel}" if prefix else rel for rel in paths}
+
+    blobs = []
+    for path, blob in entries:
+        rel = _analyzed_path(path, prefix) if path in kept else None
+        if rel is not None:
+            blobs.append((rel, blob))
+
+    shas = sorted({blob for _rel, blob in blobs})
+    store.prefetch(sha, shas)
+    sizes = store.sizes(shas)
+    files = [BlobSource(root / rel, rel, blob, store, sizes.get(blob)) for rel, blob in blobs]
+    files.sort(key=lambda source: source.rel_path)
+    corpus = RepoCorpus(repo_path, files)
+    return corpus.classify() if classify else corpus
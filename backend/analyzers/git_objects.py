@@ -0,0 +1,165 @@
+"""
+Git Object Store Module
+Reads trees and blobs straight from a repository's object database through one persistent git cat-file process
+"""
+
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Object stores kept open (one git cat-file process each)
+MAX_OPEN_STORES = 8
+
+# (path in the tree, blob SHA)
+TreeEntry = Tuple[str, str]
+
+class GitObjectStore:
+    """
+    One repository's object database, read through a single long-lived
+    `git cat-file --batch` process so blobs cost no process start and no
+    checkout. Reads are serialized, so threads analyzing different refs
+    can share one store. In a partial clone, missing blobs are fetched from
+    the promisor remote in one request before they are read, rather than
+    one lazy fetch per blob.
+    """
+
+    def __init__(self, git_dir: str):
+        self.git_dir = git_dir
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self.promisor = self._promisor_remote()
+
+    def _git(self, *args: str, input: Optional[bytes] = None) -> bytes:
+        completed = subprocess.run(
+            ["git", "--git-dir", self.git_dir, *args], input=input, capture_output=True,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+        )
+        if completed.returncode != 0:
+            message = completed.stderr.decode("utf-8", "replace").strip().splitlines()
+            raise RuntimeError(f"git {args[0]} failed: {message[-1] if message else completed.returncode}")
+        return completed.stdout
+
+    def _promisor_remote(self) -> Optional[str]:
+        """The remote missing objects of a partial clone come from (None when not a partial clone)"""
+        try:
+            output = self._git("config", "--get-regexp", r"^remote\..*\.promisor$")
+        except RuntimeError:
+            return None
+        for line in output.decode("utf-8", "replace").splitlines():
+            key, _, value = line.partition(" ")
+            if value.strip().lower() == "true":
+                return key[len("remote."):-len(".promisor")]
+        return None
+
+    def tree_entries(self, treeish: str, prefix: str = "") -> List[TreeEntry]:
+        """Every blob of a commit or tree (below prefix, if given) with its SHA, in path order"""
+        args = ["ls-tree", "-r", "-z", "--full-tree", treeish]
+        if prefix:
+            args += ["--", prefix]
+        entries = []
+        for item in self._git(*args).split(b"\0"):
+            if not item:
+                continue
+            meta, _, path = item.partition(b"\t")
+            _mode, kind, sha = meta.split(b" ")
+            if kind == b"blob":
+                entries.append((path.decode("utf-8", "surrogateescape"), sha.decode("ascii")))
+        entries.sort()
+        return entries
+
+    def prefetch(self, commit: str, shas: Iterable[str]):
+        """Fetch those of shas (blobs of commit) a partial clone does not have yet, in one request"""
+        if self.promisor is None:
+            return
+        wanted = set(shas)
+        listing = self._git("rev-list", "--objects", "--no-walk", "--missing=print", commit)
+        missing = [
+            line[1:].decode("ascii") for line in listing.splitlines()
+            if line.startswith(b"?") and line[1:].decode("ascii") in wanted
+        ]
+        if missing:
+            self._git(
+                "-c", "fetch.negotiationAlgorithm=noop", "fetch", "--quiet", "--no-tags",
+                "--no-write-fetch-head", "--recurse-submodules=no", "--filter=blob:none", "--stdin",
+                self.promisor, input="\n".join(missing).encode("ascii") + b"\n"
+            )
+
+    def sizes(self, shas: Sequence[str]) -> Dict[str, int]:
+        """Sizes of objects without reading them (one batch-check run)"""
+        if not shas:
+            return {}
+        output = self._git("cat-file", "--batch-check=%(objectname) %(objectsize)",
+                           input="\n".join(shas).encode("ascii") + b"\n")
+        found = {}
+        for line in output.decode("ascii", "replace").splitlines():
+            sha, _, size = line.partition(" ")
+            if size.isdigit():
+                found[sha] = int(size)
+        return found
+
+    def _start(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ["git", "--git-dir", self.git_dir, "cat-file", "--batch"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+            )
+        return self._process
+
+    def read(self, sha: str) -> bytes:
+        """Content of an object; KeyError if the repository does not have it"""
+        with self._lock:
+            process = self._start()
+            try:
+                process.stdin.write(sha.encode("ascii") + b"\n")
+                process.stdin.flush()
+                header = process.stdout.readline()
+                parts = header.split()
+                if len(parts) != 3:
+                    raise KeyError(sha)
+                size = int(parts[2])
+                data = process.stdout.read(size)
+                process.stdout.read(1)
+            except (OSError, ValueError) as e:
+                # A broken pipe leaves the stream unusable; start over next time
+                self.close_locked()
+                raise KeyError(sha) from e
+            return data
+
+    def close_locked(self):
+        process, self._process = self._process, None
+        if process is not None:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+            process.kill()
+            process.wait()
+
+    def close(self):
+        with self._lock:
+            self.close_locked()
+
+_stores: "OrderedDict[str, GitObjectStore]" = OrderedDict()
+_stores_lock = threading.Lock()
+
+def get_object_store(git_dir: str) -> GitObjectStore:
+    """The shared object store of a git directory (the least recently used one beyond MAX_OPEN_STORES is closed)"""
+    git_dir = os.path.realpath(git_dir)
+    with _stores_lock:
+        store = _stores.get(git_dir)
+        if store is None:
+            store = _stores[git_dir] = GitObjectStore(git_dir)
+            while len(_stores) > MAX_OPEN_STORES:
+                _stores.popitem(last=False)[1].close()
+        _stores.move_to_end(git_dir)
+        return store
+
+def close_object_stores(under: str):
+    """Close the stores of git directories at or below a path (before it is deleted)"""
+    root = os.path.realpath(under)
+    with _stores_lock:
+        for git_dir in [path for path in _stores if path == root or path.startswith(root + os.sep)]:
+            _stores.pop(git_dir).close()
@@ -0,0 +1,170 @@
+"""
+Module Graph Module
+Resolves imports to repository files and finds import cycles
+"""
+
+import posixpath
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+def _to_posix(rel_path: str) -> str:
+    return rel_path.replace("\\", "/")
+
+class ModuleResolver:
+    """
+    Maps absolute and relative imports to the repository files that provide
+    them. Absolute imports are looked up against the import root of the
+    importing file (the nearest directory above its package chain, as it
+    would be on sys.path), then the repository root, then every enclosing
+    directory from the nearest outwards.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        self.paths: Dict[str, str] = {_to_posix(path): path for path in paths}
+        self.packages: Set[str] = {
+            posixpath.dirname(path) for path in self.paths if posixpath.basename(path) == "__init__.py"
+        }
+        self._roots: Dict[str, List[str]] = {}
+
+    def _find(self, directory: str, dotted: str) -> Optional[str]:
+        """File providing module dotted under directory (a module or a package)"""
+        if not dotted:
+            return self.paths.get(posixpath.join(directory, "__init__.py"))
+        base = posixpath.join(directory, *dotted.split("."))
+        for candidate in (f"{base}.py", posixpath.join(base, "__init__.py")):
+            if candidate in self.paths:
+                return self.paths[candidate]
+        return None
+
+    def _roots_for(self, directory: str) -> List[str]:
+        roots = self._roots.get(directory)
+        if roots is None:
+            import_root = directory
+            while import_root and import_root in self.packages:
+                import_root = posixpath.dirname(import_root)
+
+            roots = [import_root, ""]
+            ancestor = directory
+            while ancestor:
+                roots.append(ancestor)
+                ancestor = posixpath.dirname(ancestor)
+            roots = list(dict.fromkeys(roots))
+            self._roots[directory] = roots
+        return roots
+
+    def resolve(self, importer: str, module: Optional[str], level: int = 0,
+                names: Iterable[str] = ()) -> List[str]:
+        """
+        Files an import statement in importer refers to: the imported module
+        and, for "from x import y", any submodules y. Empty when the import is
+        not provided by the repository.
+        """
+        directory = posixpath.dirname(_to_posix(importer))
+        module = module or ""
+        names = [name for name in names if name != "*"]
+
+        if level:
+            # "from ..x import y" inside a/b/c.py starts from a/
+            for _ in range(level - 1):
+                if not directory:
+                    return []
+                directory = posixpath.dirname(directory)
+            roots = [directory]
+        else:
+            roots = self._roots_for(directory)
+
+        for root in roots:
+            target = self._find(root, module)
+            submodules = []
+            for name in names:
+                found = self._find(root, f"{module}.{name}" if module else name)
+                if found is not None:
+                    submodules.append(found)
+            if target is None and not submodules:
+                continue
+            # "from pkg import submodule" depends on the submodule; any other
+            # name (or a plain "import pkg") comes from the module itself
+            if target is not None and len(submodules) < len(names) or not names:
+                return [target] + submodules
+            return submodules
+        return []
+
+def strongly_connected_components(graph: Dict[str, Iterable[str]]) -> List[List[str]]:
+    """
+    Tarjan's algorithm, iterative so deep graphs cannot overflow the stack.
+    Runs in O(nodes + edges); components come out in reverse topological order.
+    """
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    components: List[List[str]] = []
+    counter = 0
+
+    for root in graph:
+        if root in index:
+            continue
+
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph.get(root, ())))]
+
+        while work:
+            node, neighbors = work[-1]
+            descended = False
+            for neighbor in neighbors:
+                if neighbor not in index:
+                    index[neighbor] = low[neighbor] = counter
+                    counter += 1
+                    stack.append(neighbor)
+                    on_stack.add(neighbor)
+                    work.append((neighbor, iter(graph.get(neighbor, ()))))
+                    descended = True
+                    break
+                if neighbor in on_stack:
+                    low[node] = min(low[node], index[neighbor])
+            if descended:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    return components
+
+def cycle_through(graph: Dict[str, Iterable[str]], component: Iterable[str]) -> List[str]:
+    """
+    A shortest cycle through the smallest node of a strongly connected
+    component, as [start, ..., start] (breadth-first, linear in its size)
+    """
+    members = set(component)
+    start = min(members)
+    parents: Dict[str, str] = {}
+    queue = deque([start])
+
+    while queue:
+        node = queue.popleft()
+        for neighbor in sorted(graph.get(node, ())):
+            if neighbor == start:
+                path = [node]
+                while path[-1] != start:
+                    path.append(parents[path[-1]])
+                return [start] + path[::-1][1:] + [start] if node != start else [start, start]
+            if neighbor in members and neighbor not in parents:
+                parents[neighbor] = node
+                queue.append(neighbor)
+
+    return [start, start]
@@ -0,0 +1,91 @@
+"""
+Analysis Orchestrator Module
+Runs analysis steps as a concurrent dependency graph with per-step timing
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+StepFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+class AnalysisStep:
+    """A named unit of work that runs once all of its dependencies have finished"""
+
+    def __init__(self, name: str, func: StepFunc, depends_on: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on)
+
+class PipelineResult:
+    """Outcome of a pipeline run: step results, wall-clock timings and errors"""
+
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Result of a step, or default if it failed or was skipped"""
+        return self.results.get(name, default)
+
+    def report(self) -> Dict[str, Any]:
+        """Timings and errors in a JSON-friendly form"""
+        return {
+            "timings": {name: round(seconds, 4) for name, seconds in self.timings.items()},
+            "errors": dict(self.errors)
+        }
+
+class AnalysisPipeline:
+    """
+    A small DAG runner. Every step is started as soon as its dependencies are
+    done, so independent steps run concurrently. A failing step only skips
+    the steps that depend on it.
+    """
+
+    def __init__(self):
+        self.steps: Dict[str, AnalysisStep] = {}
+
+    def add(self, name: str, func: StepFunc, depends_on: Iterable[str] = ()) -> "AnalysisPipeline":
+        """Register a step; func receives the dict of finished step results"""
+        if name in self.steps:
+            raise ValueError(f"Duplicate analysis step: {name}")
+        step = AnalysisStep(name, func, depends_on)
+        for dependency in step.depends_on:
+            if dependency not in self.steps:
+                raise ValueError(f"Step '{name}' depends on unknown step '{dependency}'")
+        self.steps[name] = step
+        return self
+
+    async def run(self) -> PipelineResult:
+        """Run every step and wait for the whole graph to settle"""
+        outcome = PipelineResult()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_step(step: AnalysisStep):
+            if step.depends_on:
+                await asyncio.gather(*(tasks[name] for name in step.depends_on))
+
+            failed = [name for name in step.depends_on if name not in outcome.results]
+            if failed:
+                outcome.errors[step.name] = f"skipped: dependency failed ({', '.join(failed)})"
+                return
+
+            started = time.perf_counter()
+            try:
+                outcome.results[step.name] = await step.func(outcome.results)
+            except Exception as e:
+                outcome.errors[step.name] = f"{type(e).__name__}: {e}"
+            finally:
+                outcome.timings[step.name] = time.perf_counter() - started
+
+        # Steps are registered in dependency order, so every dependency task
+        # exists before its dependents start awaiting it
+        for step in self.steps.values():
+            tasks[step.name] = asyncio.create_task(run_step(step))
+
+        started = time.perf_counter()
+        await asyncio.gather(*tasks.values())
+        outcome.timings["total"] = time.perf_counter() - started
+
+        return outcome
@@ -0,0 +1,154 @@
+"""
+Analysis Progress Module
+Turns per-file analyzer results into incremental events for streaming clients
+"""
+
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+def module_name_for(rel_path: str) -> str:
+    """Module a repository file belongs to: its top-level directory, or its stem for root files"""
+    path = Path(rel_path)
+    if len(path.parts) > 1:
+        return path.parts[0]
+    return path.stem if path.stem != "__init__" else "root"
+
+class AnalysisProgress:
+    """
+    Collects per-file results while an analysis runs and emits them as events:
+    one "files_discovered" with a preview of the module structure, batched
+    "file_results" carrying a progress percentage, and a "module_complete"
+    rollup as soon as every analyzer has finished every file of a module.
+    History analyses send one "history_point" per commit instead.
+
+    emit is called synchronously on the event loop and must not block.
+    """
+
+    # Per-file results are sent in batches of up to BATCH_SIZE, at least every FLUSH_INTERVAL seconds
+    BATCH_SIZE = 200
+    FLUSH_INTERVAL = 0.1
+
+    def __init__(self, emit: Callable[[Dict[str, Any]], None]):
+        self.emit = emit
+        self.total = 0
+        self.completed = 0
+        self._batch: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        self._modules: Dict[str, str] = {}
+        self._pending: Dict[str, int] = defaultdict(int)
+        self._rollups: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def percent(self) -> float:
+        return round(self.completed / self.total * 100, 1) if self.total else 100.0
+
+    def files_discovered(self, structure: List[Dict[str, Any]], modules: Dict[str, List[str]],
+                         work: Dict[str, List[str]]):
+        """
+        Announce the files about to be analyzed. structure is the preview of
+        the module layout, modules maps each module to its files and work maps
+        each analyzer to the files it will report on.
+        """
+        self._modules = {path: name for name, paths in modules.items() for path in paths}
+        for paths in work.values():
+            self.total += len(paths)
+            for path in paths:
+                module = self._modules.get(path)
+                if module is not None:
+                    self._pending[module] += 1
+
+        for name, paths in modules.items():
+            self._rollups[name] = {
+                "module": name,
+                "files": len(paths),
+                "complexity": 0,
+                "complexity_files": 0,
+                "functions": 0,
+                "documented_functions": 0,
+                "issues": 0
+            }
+
+        self.emit({
+            "type": "files_discovered",
+            "files": len({path for paths in work.values() for path in paths}),
+            "total": self.total,
+            "structure": structure
+        })
+
+        # Modules without any work to do are complete already
+        for name in modules:
+            if not self._pending.get(name):
+                self._complete_module(name)
+
+    def file_done(self, analyzer: str, rel_path: str, summary: Dict[str, Any]):
+        """Record that an analyzer finished one file"""
+        self.completed += 1
+        self._batch.append({"file": rel_path, "analyzer": analyzer, **summary})
+
+        module = self._modules.get(rel_path)
+        if module is not None:
+            self._add_to_rollup(self._rollups[module], summary)
+            self._pending[module] -= 1
+            if self._pending[module] == 0:
+                self.flush()
+                self._complete_module(module)
+                return
+
+        if len(self._batch) >= self.BATCH_SIZE or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Send buffered per-file results along with the current progress"""
+        self._last_flush = time.monotonic()
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        self.emit({
+            "type": "file_results",
+            "results": batch,
+            "progress": {"completed": self.completed, "total": self.total, "percent": self.percent}
+        })
+
+    def commit_done(self, position: int, total: int, point: Dict[str, Any]):
+        """Send the metrics of one commit of a history analysis"""
+        self.emit({
+            "type": "history_point",
+            "point": point,
+            "progress": {"completed": position, "total": total,
+                         "percent": round(position / total * 100, 1) if total else 100.0}
+        })
+
+    def finish(self):
+        """Send anything still buffered"""
+        self.flush()
+
+    @staticmethod
+    def _add_to_rollup(rollup: Dict[str, Any], summary: Dict[str, Any]):
+        if "complexity" in summary:
+            rollup["complexity"] += summary["complexity"]
+            rollup["complexity_files"] += 1
+        rollup["functions"] += summary.get("functions", 0)
+        rollup["documented_functions"] += summary.get("documented_functions", 0)
+        rollup["issues"] += summary.get("issues", 0)
+
+    def _complete_module(self, name: str):
+        rollup = self._rollups[name]
+        complexity_score: Optional[float] = None
+        if rollup["complexity_files"]:
+            # Same per-module score as the final structure
+            complexity_score = min(100, max(0, 100 - (rollup["complexity"] / rollup["complexity_files"] * 5)))
+        documentation = None
+        if rollup["functions"]:
+            documentation = round(rollup["documented_functions"] / rollup["functions"] * 100, 2)
+
+        self.emit({
+            "type": "module_complete",
+            "module": name,
+            "files": rollup["files"],
+            "complexity_score": complexity_score,
+            "documentation": documentation,
+            "issues": rollup["issues"],
+            "progress": {"completed": self.completed, "total": self.total, "percent": self.percent}
+        })
@@ -0,0 +1,115 @@
+"""
+Raw Metrics Module
+Line counts (LOC, SLOC, comments, blank, docstrings) from one pass over a file's tokens
+"""
+
+import tokenize
+from typing import Dict, List
+
+# Statements whose body may follow the colon on the same line ("if x: return 1")
+COMPOUND_KEYWORDS = {
+    "if", "elif", "else", "for", "while", "try", "except", "finally",
+    "with", "def", "class", "async", "match", "case"
+}
+
+# Tokens that never make a line count as code
+_LAYOUT = {tokenize.NL, tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING}
+
+_CODE, _MULTI, _SINGLE = 1, 2, 3
+
+def _extra_statements(statement: List[tokenize.TokenInfo]) -> int:
+    """Logical lines beyond the first: an inline compound body and ';'-separated statements"""
+    extra = 0
+    depth = 0
+    header = statement[0].type == tokenize.NAME and statement[0].string in COMPOUND_KEYWORDS
+    last = len(statement) - 1
+    for i, token in enumerate(statement):
+        if token.type != tokenize.OP:
+            continue
+        if token.string in "([{":
+            depth += 1
+        elif token.string in ")]}":
+            depth -= 1
+        elif depth == 0 and i < last:
+            if token.string == ";":
+                extra += 1
+            elif token.string == ":" and header:
+                extra += 1
+                header = False
+    return extra
+
+def compute_raw_metrics(tokens: List[tokenize.TokenInfo], lines: List[str]) -> Dict[str, int]:
+    """
+    Raw metrics from an existing token stream, following radon's
+    definitions except for lloc: loc (physical lines), lloc (logical lines:
+    one per statement, plus one for a compound statement's body on the
+    same line and one per extra ';'-separated statement; radon instead
+    splits at every ':' token, so dict displays, slices, lambdas and
+    annotations make it count more), sloc (lines of code),
+    comments (comment tokens), multi (lines of multi-line string
+    statements), single_comments (comment-only lines and one-line string
+    statements), blank, and docstrings (lines of module, class and function
+    docstrings). sloc + blank + multi + single_comments == loc.
+    """
+    kinds = [0] * (len(lines) + 1)
+    comments = 0
+    lloc = 0
+    docstrings = 0
+
+    statement: List[tokenize.TokenInfo] = []
+    # A statement opening a block body (or the module) may be a docstring
+    body_start = True
+    previous_kind = None
+    for token in tokens:
+        token_type = token.type
+        if token_type == tokenize.COMMENT:
+            comments += 1
+            row = token.start[0]
+            if not kinds[row]:
+                kinds[row] = _SINGLE
+            continue
+        if token_type in _LAYOUT or token_type == tokenize.ENDMARKER:
+            if token_type == tokenize.INDENT and previous_kind == "header":
+                body_start = True
+            continue
+        if token_type != tokenize.NEWLINE:
+            statement.append(token)
+            continue
+
+        if not statement:
+            continue
+        first_row, last_row = statement[0].start[0], statement[-1].end[0]
+        if len(statement) == 1 and statement[0].type == tokenize.STRING:
+            kind = _MULTI if last_row > first_row else _SINGLE
+            if body_start:
+                docstrings += last_row - first_row + 1
+        else:
+            kind = _CODE
+            lloc += _extra_statements(statement)
+        lloc += 1
+        for row in range(first_row, last_row + 1):
+            kinds[row] = kind
+
+        is_header = statement[-1].type == tokenize.OP and statement[-1].string == ":"
+        previous_kind = "header" if is_header else None
+        body_start = False
+        statement = []
+
+    counts = {_CODE: 0, _MULTI: 0, _SINGLE: 0}
+    blank = 0
+    for row, line in enumerate(lines, start=1):
+        if not line.strip():
+            blank += 1
+        else:
+            counts[kinds[row] or _CODE] += 1
+
+    return {
+        "loc": len(lines),
+        "lloc": lloc,
+        "sloc": counts[_CODE],
+        "comments": comments,
+        "multi": counts[_MULTI],
+        "single_comments": counts[_SINGLE],
+        "blank": blank,
+        "docstrings": docstrings
+    }
@@ -0,0 +1,138 @@
+"""
+Streaming Reducers Module
+Repository rollups computed one per-file record at a time
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .progress import module_name_for
+
+class ComplexitySummary:
+    """Running totals behind ComplexityAnalyzer.calculate_summary"""
+
+    __slots__ = ("total_complexity", "total_files", "total_loc", "high_complexity_functions")
+
+    # Functions above this cyclomatic complexity are listed individually
+    HIGH_COMPLEXITY = 10
+
+    def __init__(self):
+        self.total_complexity = 0
+        self.total_files = 0
+        self.total_loc = 0
+        self.high_complexity_functions: List[Dict[str, Any]] = []
+
+    def add(self, file_result: Dict[str, Any]):
+        if "error" in file_result:
+            return
+
+        self.total_files += 1
+
+        for func in file_result.get("cyclomatic_complexity", []):
+            self.total_complexity += func["complexity"]
+            if func["complexity"] > self.HIGH_COMPLEXITY:
+                self.high_complexity_functions.append({
+                    "file": file_result["file"],
+                    "function": func["name"],
+                    "complexity": func["complexity"],
+                    "rank": func["rank"]
+                })
+
+        if file_result.get("raw_metrics"):
+            self.total_loc += file_result["raw_metrics"]["loc"]
+
+    def result(self) -> Dict[str, Any]:
+        avg_complexity = self.total_complexity / self.total_files if self.total_files > 0 else 0
+        return {
+            "total_files": self.total_files,
+            "total_loc": self.total_loc,
+            "average_complexity": round(avg_complexity, 2),
+            "high_complexity_functions": self.high_complexity_functions,
+            "complexity_score": min(100, max(0, 100 - (avg_complexity * 5)))  # Convert to 0-100 score
+        }
+
+class IssueTally:
+    """Running issue counts behind YAGNIDetector.calculate_yagni_score"""
+
+    __slots__ = ("total", "weighted", "by_type")
+
+    SEVERITY_WEIGHTS = {"high": 3, "medium": 2, "low": 1}
+
+    def __init__(self):
+        self.total = 0
+        self.weighted = 0
+        self.by_type: Dict[str, int] = {}
+
+    def add(self, file_result: Dict[str, Any]):
+        for issue in file_result.get("issues", []):
+            self.total += 1
+            self.weighted += self.SEVERITY_WEIGHTS.get(issue.get("severity", "low"), 1)
+            self.by_type[issue["type"]] = self.by_type.get(issue["type"], 0) + 1
+
+    def score(self) -> float:
+        # Assume 50 weighted issues = 0 score, 0 issues = 100 score
+        return max(0, 100 - (self.weighted * 2))
+
+class ModuleRollup:
+    """Per-module totals for the repository structure"""
+
+    __slots__ = ("files", "size", "complexity_total", "complexity_files", "doc_files")
+
+    def __init__(self):
+        self.files: List[str] = []
+        self.size = 0
+        self.complexity_total = 0
+        self.complexity_files = 0
+        self.doc_files = 0
+
+    @property
+    def complexity_score(self) -> float:
+        if not self.complexity_files:
+            return 0
+        return min(100, max(0, 100 - (self.complexity_total / self.complexity_files * 5)))
+
+class StructureReducer:
+    """
+    Groups files into modules (top-level directories, skipping tests; virtualenvs
+    and other excluded directories never reach it, see discovery) and folds complexity and documentation records into them
+    with one dictionary lookup per record.
+    """
+
+    def __init__(self, repo_path: Path, files: Dict[str, Dict[str, Any]]):
+        self.modules: Dict[str, ModuleRollup] = {}
+
+        for file_path, facts in files.items():
+            rel_path = Path(file_path)
+            if "test_" in rel_path.name:
+                continue
+
+            # Count lines (files that could not be decoded have none)
+            if facts["lines"] is not None:
+                module = self.modules.get(module_name_for(file_path))
+                if module is None:
+                    module = self.modules[module_name_for(file_path)] = ModuleRollup()
+                module.size += facts["lines"]
+                module.files.append(file_path)
+
+    def _module_for_record(self, file_path: str) -> Optional[ModuleRollup]:
+        # Records are attributed by top-level directory; root files all count towards "root"
+        return self.modules.get(file_path.split("/")[0] if "/" in file_path else "root")
+
+    def add_complexity(self, record: Dict[str, Any]):
+        module = self._module_for_record(record.get("file", ""))
+        if module is not None:
+            module.complexity_total += sum(f.get("complexity", 0) for f in record.get("cyclomatic_complexity", []))
+            module.complexity_files += 1
+
+    def add_documentation(self, record: Dict[str, Any]):
+        module = self._module_for_record(record.get("file", ""))
+        if module is not None:
+            module.doc_files += 1
+
+    def add_all(self, complexity_records: Iterable[Dict[str, Any]],
+                documentation_records: Iterable[Dict[str, Any]]) -> "StructureReducer":
+        for record in complexity_records:
+            self.add_complexity(record)
+        for record in documentation_records:
+            self.add_documentation(record)
+        return self
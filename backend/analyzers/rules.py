@@ -0,0 +1,140 @@
+"""
+Rule Engine Module
+AST checks that subscribe to node types and share one traversal per file
+"""
+
+import ast
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+# Enclosing definitions of a node, outermost first: ((name, "function" | "method" | "class"), ...)
+Scope = Tuple[Tuple[str, str], ...]
+
+class Rule:
+    """
+    One check. The engine calls visit for every node that is an instance of
+    one of NODE_TYPES, in ast.walk order, then result() once the whole tree
+    has been seen. A new instance is made for every file.
+    """
+
+    NAME = ""
+    NODE_TYPES: Tuple[type, ...] = ()
+
+    def __init__(self, rel_path: str, tree: ast.AST):
+        self.rel_path = rel_path
+        self.tree = tree
+
+    def visit(self, node: ast.AST, scope: Scope):
+        raise NotImplementedError
+
+    def result(self) -> Any:
+        raise NotImplementedError
+
+# Per-rule counters: name -> [files, nodes dispatched, seconds]. Counters
+# accumulate in _pending wherever rules run (worker processes included)
+# and are folded into _totals by the executor as chunks complete.
+_lock = threading.Lock()
+_pending: Dict[str, List[float]] = {}
+_totals: Dict[str, List[float]] = {}
+
+def _add(target: Dict[str, List[float]], counters: Dict[str, List[float]]):
+    for name, (files, nodes, seconds) in counters.items():
+        entry = target.setdefault(name, [0, 0, 0.0])
+        entry[0] += files
+        entry[1] += nodes
+        entry[2] += seconds
+
+def drain_rule_timings() -> Dict[str, List[float]]:
+    """Counters accumulated in this process since the last drain"""
+    global _pending
+    with _lock:
+        drained, _pending = _pending, {}
+    return drained
+
+def merge_rule_timings(counters: Dict[str, List[float]]):
+    """Fold drained counters (possibly from another process) into the totals"""
+    with _lock:
+        _add(_totals, counters)
+
+def rule_timings() -> Dict[str, Dict[str, Any]]:
+    """Cumulative per-rule counters: files, nodes visited and time spent"""
+    with _lock:
+        combined: Dict[str, List[float]] = {}
+        _add(combined, _totals)
+        _add(combined, _pending)
+    return {
+        name: {"files": int(files), "nodes": int(nodes), "seconds": round(seconds, 6)}
+        for name, (files, nodes, seconds) in sorted(combined.items())
+    }
+
+_FUNCTION_TYPES = {ast.FunctionDef, ast.AsyncFunctionDef}
+
+def walk(tree: ast.AST) -> List[Tuple[ast.AST, Scope]]:
+    """Every node with its enclosing definitions, in ast.walk (breadth-first) order"""
+    # The result list doubles as the breadth-first queue; fields are read
+    # directly because ast.iter_child_nodes is a comparatively slow generator
+    nodes = [(tree, ())]
+    append = nodes.append
+    AST = ast.AST
+    ClassDef = ast.ClassDef
+    i = 0
+    while i < len(nodes):
+        node, scope = nodes[i]
+        i += 1
+        node_type = type(node)
+        if node_type in _FUNCTION_TYPES or node_type is ClassDef:
+            if node_type is ClassDef:
+                kind = "class"
+            else:
+                kind = "method" if scope and scope[-1][1] == "class" else "function"
+            scope = scope + ((node.name, kind),)
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, AST):
+                        append((item, scope))
+            elif isinstance(value, AST):
+                append((value, scope))
+    return nodes
+
+def run_rules(tree: ast.AST, rel_path: str, rule_classes: Sequence[Type[Rule]],
+              nodes: Optional[List[Tuple[ast.AST, Scope]]] = None) -> Dict[str, Any]:
+    """
+    Run rules over tree in a single traversal and return each rule's result
+    by NAME. nodes is walk(tree) when the caller already has it (SourceFile
+    caches it, so every analyzer of a file shares one traversal).
+    """
+    rules = [rule_class(rel_path, tree) for rule_class in rule_classes]
+    dispatch: Dict[type, List[Tuple[Rule, List[float]]]] = {}
+    counters = {rule.NAME: [1, 0, 0.0] for rule in rules}
+    clock = time.perf_counter
+
+    for node, scope in (walk(tree) if nodes is None else nodes):
+        node_type = type(node)
+        subscribers = dispatch.get(node_type)
+        if subscribers is None:
+            subscribers = dispatch[node_type] = [
+                (rule, counters[rule.NAME]) for rule in rules if issubclass(node_type, rule.NODE_TYPES)
+            ]
+        for rule, counter in subscribers:
+            started = clock()
+            rule.visit(node, scope)
+            counter[1] += 1
+            counter[2] += clock() - started
+
+    results = {}
+    for rule in rules:
+        started = clock()
+        results[rule.NAME] = rule.result()
+        counters[rule.NAME][2] += clock() - started
+
+    with _lock:
+        _add(_pending, counters)
+    return results
+
+def run_rule(tree: ast.AST, rel_path: str, rule_class: Type[Rule],
+             nodes: Optional[List[Tuple[ast.AST, Scope]]] = None) -> Any:
+    """Result of a single rule"""
+    return run_rules(tree, rel_path, [rule_class], nodes)[rule_class.NAME]
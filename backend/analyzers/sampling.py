@@ -0,0 +1,201 @@
+"""
+Sampling Module
+Repository scores estimated from a stratified sample of files, with confidence intervals
+"""
+
+import bisect
+import math
+import random
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .corpus import SourceFile
+from .documentation import DocumentationAnalyzer
+from .progress import module_name_for
+from .reducers import IssueTally
+
+# Two-sided normal quantile for 95% confidence intervals
+Z_95 = 1.959964
+
+# File sizes are split into classes at these quantiles of the repository's sizes
+SIZE_QUANTILES = (0.25, 0.5, 0.75)
+
+# A directory becomes its own stratum when it would get at least this many
+# sampled files; smaller directories share one stratum
+MIN_DIRECTORY_SAMPLE = 8
+
+# A stratum gets at least this many sampled files (when it has them), so its variance can be estimated
+MIN_STRATUM_SAMPLE = 2
+
+Vector = Tuple[float, ...]
+
+def _clamp(score: float) -> float:
+    return min(100.0, max(0.0, score))
+
+class ScoreEstimator:
+    """
+    How an analyzer's score follows from repository totals: each file
+    contributes a vector of counts, and the score is a function of their
+    sums. score is the formula before clamping to 0-100 (a clamped score
+    has no slope to propagate the sampling error through).
+    """
+
+    def __init__(self, fields: Sequence[str], contribution: Callable[[Dict[str, Any]], Vector],
+                 score: Callable[[Vector], float]):
+        self.fields = tuple(fields)
+        self.contribution = contribution
+        self.score = score
+
+def _complexity_contribution(record: Dict[str, Any]) -> Vector:
+    if "error" in record:
+        return (0, 0)
+    return (sum(func["complexity"] for func in record.get("cyclomatic_complexity", [])), 1)
+
+def _complexity_score(totals: Vector) -> float:
+    # ComplexitySummary's complexity_score
+    complexity, files = totals
+    return 100 - (complexity / files if files > 0 else 0) * 5
+
+def _documentation_contribution(record: Dict[str, Any]) -> Vector:
+    totals = DocumentationAnalyzer.file_totals(record)
+    return tuple(totals[key] for key in DocumentationAnalyzer.TOTALS)
+
+def _documentation_score(totals: Vector) -> float:
+    return DocumentationAnalyzer.coverage_from_totals(dict(zip(DocumentationAnalyzer.TOTALS, totals)))["overall_score"]
+
+def _yagni_contribution(record: Dict[str, Any]) -> Vector:
+    tally = IssueTally()
+    tally.add(record)
+    return (tally.weighted,)
+
+def _yagni_score(totals: Vector) -> float:
+    # IssueTally.score
+    return 100 - totals[0] * 2
+
+# Scores that can be extrapolated from a sample, by analyzer NAME
+ESTIMATORS = {
+    "complexity": ScoreEstimator(("complexity", "files"), _complexity_contribution, _complexity_score),
+    "documentation": ScoreEstimator(DocumentationAnalyzer.TOTALS, _documentation_contribution, _documentation_score),
+    "yagni": ScoreEstimator(("weighted_issues",), _yagni_contribution, _yagni_score)
+}
+
+class StratifiedSample:
+    """
+    A sample of a repository's files stratified by top-level directory and
+    size class, allocated proportionally to stratum size. Totals are
+    estimated stratum by stratum, with a finite population correction, and
+    scores get delta-method confidence intervals.
+    """
+
+    def __init__(self, strata: Dict[Tuple[str, int], List[SourceFile]],
+                 sampled: Dict[Tuple[str, int], List[SourceFile]]):
+        self.strata = strata
+        self.sampled = sampled
+
+    @classmethod
+    def draw(cls, sources: Sequence[SourceFile], size: int, seed: int = 0) -> "StratifiedSample":
+        """Sample about size files (every file when there are not more than that)"""
+        population = len(sources)
+        sizes = sorted(source.size for source in sources)
+        bounds = sorted({sizes[int(q * (population - 1))] for q in SIZE_QUANTILES}) if sizes else []
+
+        directories: Dict[str, int] = {}
+        for source in sources:
+            directory = module_name_for(source.rel_path)
+            directories[directory] = directories.get(directory, 0) + 1
+        own_stratum = {
+            directory for directory, count in directories.items()
+            if count * size >= MIN_DIRECTORY_SAMPLE * population
+        }
+
+        strata: Dict[Tuple[str, int], List[SourceFile]] = {}
+        for source in sources:
+            directory = module_name_for(source.rel_path)
+            key = (directory if directory in own_stratum else "", bisect.bisect_right(bounds, source.size))
+            strata.setdefault(key, []).append(source)
+
+        # Proportional allocation by largest remainder, then the per-stratum minimum
+        keys = sorted(strata)
+        quotas = {key: len(strata[key]) * size / population for key in keys} if population else {}
+        allocation = {key: int(quotas[key]) for key in keys}
+        leftover = size - sum(allocation.values())
+        for key in sorted(keys, key=lambda key: quotas[key] - allocation[key], reverse=True)[:max(leftover, 0)]:
+            allocation[key] += 1
+
+        rng = random.Random(seed)
+        sampled = {}
+        for key in keys:
+            files = strata[key]
+            count = min(len(files), max(allocation[key], MIN_STRATUM_SAMPLE))
+            sampled[key] = rng.sample(files, count) if count < len(files) else list(files)
+        return cls(strata, sampled)
+
+    @property
+    def files(self) -> List[SourceFile]:
+        """Sampled files, in path order"""
+        return sorted((source for files in self.sampled.values() for source in files),
+                      key=lambda source: source.rel_path)
+
+    @property
+    def population(self) -> int:
+        return sum(len(files) for files in self.strata.values())
+
+    def estimate_totals(self, vectors: Dict[str, Vector], width: int) -> Tuple[List[float], List[List[float]]]:
+        """
+        Estimated population totals and their covariance matrix from the
+        sampled files' vectors (files missing from vectors contribute zeros)
+        """
+        zero = (0,) * width
+        totals = [0.0] * width
+        covariance = [[0.0] * width for _ in range(width)]
+
+        for key, files in self.sampled.items():
+            stratum_size, count = len(self.strata[key]), len(files)
+            rows = [vectors.get(source.rel_path, zero) for source in files]
+            means = [sum(row[j] for row in rows) / count for j in range(width)]
+            for j in range(width):
+                totals[j] += stratum_size * means[j]
+
+            if count < 2 or count == stratum_size:
+                continue
+            factor = stratum_size * stratum_size * (1 - count / stratum_size) / count / (count - 1)
+            for j in range(width):
+                for k in range(j, width):
+                    value = factor * sum((row[j] - means[j]) * (row[k] - means[k]) for row in rows)
+                    covariance[j][k] += value
+                    if k != j:
+                        covariance[k][j] += value
+
+        return totals, covariance
+
+    def estimate(self, estimator: ScoreEstimator, records: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """Score estimate with a 95% confidence interval from the sampled files' records"""
+        vectors = {record["file"]: estimator.contribution(record) for record in records}
+        width = len(estimator.fields)
+        totals, covariance = self.estimate_totals(vectors, width)
+        score = estimator.score(tuple(totals))
+
+        # Delta method, with a numerical gradient of the score
+        gradient = []
+        for j in range(width):
+            step = max(abs(totals[j]) * 1e-4, 1e-3)
+            up, down = list(totals), list(totals)
+            up[j] += step
+            down[j] = max(down[j] - step, 0.0)
+            gradient.append((estimator.score(tuple(up)) - estimator.score(tuple(down))) / (up[j] - down[j]))
+        variance = sum(gradient[j] * covariance[j][k] * gradient[k] for j in range(width) for k in range(width))
+        error = math.sqrt(max(variance, 0.0))
+
+        return {
+            "score": round(_clamp(score), 2),
+            "low": round(_clamp(score - Z_95 * error), 2),
+            "high": round(_clamp(score + Z_95 * error), 2),
+            "standard_error": round(error, 4)
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        """Sample size and layout, for the analysis report"""
+        return {
+            "files": sum(len(files) for files in self.sampled.values()),
+            "population": self.population,
+            "strata": len(self.strata)
+        }
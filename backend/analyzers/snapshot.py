@@ -0,0 +1,83 @@
+"""
+Analysis Snapshot Module
+Per-file analyzer results for one repository state, reusable for incremental runs
+"""
+
+from typing import Any, Dict, Mapping, Optional
+
+from .dependency_index import DependencyIndex
+from .spool import RecordSpool
+from .symbols import SymbolIndex
+
+class AnalysisSnapshot:
+    """
+    Everything needed to re-derive a repository analysis: per-file facts
+    (content hash, line count), every analyzer's per-file records and the
+    analyzer versions that produced them, plus the aggregated result.
+    A partial snapshot (cut short by the analysis budget) is not used as a
+    base for incremental runs.
+    The dependency index is persisted alongside, not as part of to_dict().
+    The symbol index is kept in memory only (it is rebuilt from the YAGNI
+    records when missing) for the next incremental run to start from.
+    """
+
+    def __init__(self, repo_path: str, commit: Optional[str] = None, dirty: bool = False,
+                 partial: bool = False,
+                 files: Optional[Dict[str, Dict[str, Any]]] = None,
+                 records: Optional[Dict[str, Mapping[str, Dict[str, Any]]]] = None,
+                 versions: Optional[Dict[str, str]] = None,
+                 result: Optional[Dict[str, Any]] = None,
+                 index: Optional[DependencyIndex] = None,
+                 symbols: Optional[SymbolIndex] = None):
+        self.repo_path = repo_path
+        self.commit = commit
+        self.dirty = dirty
+        self.partial = partial
+        self.files = files or {}
+        self.records = records or {}
+        self.versions = versions or {}
+        self.result = result or {}
+        self.index = index
+        self.symbols = symbols
+
+    def can_base(self, versions: Dict[str, str]) -> bool:
+        """Whether an incremental run against this snapshot is sound"""
+        return self.commit is not None and not self.dirty and not self.partial and self.versions == versions
+
+    def header(self) -> Dict[str, Any]:
+        """JSON-serializable form without the per-file records, for storing them separately"""
+        return {
+            "repo_path": self.repo_path,
+            "commit": self.commit,
+            "dirty": self.dirty,
+            "partial": self.partial,
+            "files": self.files,
+            "versions": self.versions,
+            "result": self.result
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form"""
+        return {
+            **self.header(),
+            "records": {name: dict(records) for name, records in self.records.items()}
+        }
+
+    def close(self):
+        """Delete the spill files of records spooled to disk (the records are unusable afterwards)"""
+        for records in self.records.values():
+            if isinstance(records, RecordSpool):
+                records.close()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AnalysisSnapshot":
+        return cls(
+            data["repo_path"],
+            commit=data.get("commit"),
+            dirty=data.get("dirty", False),
+            partial=data.get("partial", False),
+            files=data.get("files"),
+            records=data.get("records"),
+            versions=data.get("versions"),
+            result=data.get("result")
+        )
@@ -0,0 +1,58 @@
+"""
+Record Spool Module
+Per-file records kept in memory, or in a temporary file for very large repositories
+"""
+
+import pickle
+import tempfile
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator
+
+class _Offset(int):
+    """Position of a spilled record in the spill file"""
+
+class RecordSpool(Mapping):
+    """
+    Insertion-ordered mapping of file path to per-file record. With on_disk
+    the records are pickled to an anonymous temporary file and read back on
+    access, so holding every record of a huge repository costs one offset
+    per file.
+    """
+
+    def __init__(self, on_disk: bool = False):
+        self.on_disk = on_disk
+        self._entries: Dict[str, Any] = {}  # path -> record, or its offset when on disk
+        self._file = tempfile.TemporaryFile(prefix="starship-records-") if on_disk else None
+
+    @classmethod
+    def for_size(cls, expected: int, spill_after: int) -> "RecordSpool":
+        """Spool that spills to disk when more than spill_after records are expected (0 = never)"""
+        return cls(on_disk=bool(spill_after) and expected > spill_after)
+
+    def add(self, path: str, record: Dict[str, Any]):
+        """Append a record (paths are expected to be unique)"""
+        if self._file is None:
+            self._entries[path] = record
+            return
+        self._file.seek(0, 2)
+        self._entries[path] = _Offset(self._file.tell())
+        pickle.dump(record, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __getitem__(self, path: str) -> Dict[str, Any]:
+        entry = self._entries[path]
+        if isinstance(entry, _Offset):
+            self._file.seek(entry)
+            return pickle.load(self._file)
+        return entry
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self):
+        """Delete the spill file"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,299 @@
+"""
+Symbol Index Module
+Repository-wide definitions and references for precise dead-code detection
+"""
+
+import ast
+import posixpath
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .module_graph import ModuleResolver
+from .rules import Rule, Scope
+
+# Decorators that do not make the decorated function reachable on their own
+# (anything else, e.g. @router.get or @app.command, registers it somewhere)
+PASSIVE_DECORATORS = {
+    "staticmethod", "classmethod", "property", "cached_property", "abstractmethod",
+    "setter", "getter", "deleter", "lru_cache", "cache", "wraps", "overload",
+    "dataclass", "total_ordering"
+}
+
+# Entry points that are never referenced from Python code
+ENTRY_POINTS = {"main"}
+
+def _dotted(node: ast.AST) -> Optional[str]:
+    """a.b.c for a chain of attribute accesses on a name, else None"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+def _decorator_name(node: ast.AST) -> str:
+    if isinstance(node, ast.Call):
+        node = node.func
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return ""
+
+class SymbolRule(Rule):
+    """
+    Symbol table of one file: qualified definitions ([qualname, kind, line,
+    registered by a decorator]), loaded names, attribute names, import
+    bindings, attribute accesses on imported names and the __all__ exports
+    (None when the file has no __all__). JSON-serializable.
+    """
+
+    NAME = "symbols"
+    NODE_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Name, ast.Attribute,
+                  ast.Import, ast.ImportFrom, ast.Assign, ast.AugAssign)
+
+    def __init__(self, rel_path: str, tree: ast.AST):
+        super().__init__(rel_path, tree)
+        self.definitions: List[List[Any]] = []
+        self.names: Set[str] = set()
+        self.attributes: Set[str] = set()
+        self.chains: Set[Tuple[str, str]] = set()
+        self.imports: List[List[Any]] = []
+        self.exports: Optional[List[str]] = None
+
+    @staticmethod
+    def _exported(value: ast.AST) -> List[str]:
+        if isinstance(value, (ast.List, ast.Tuple)):
+            return [elt.value for elt in value.elts
+                    if isinstance(elt, ast.Constant) and isinstance(elt.value, str)]
+        return []
+
+    def visit(self, node: ast.AST, scope: Scope):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                self.names.add(node.id)
+
+        elif isinstance(node, ast.Attribute):
+            self.attributes.add(node.attr)
+            base = _dotted(node.value)
+            if base is not None:
+                self.chains.add((base, node.attr))
+
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            if isinstance(node, ast.ClassDef):
+                kind = "class"
+            else:
+                kind = "method" if scope and scope[-1][1] == "class" else "function"
+            qualname = ".".join([name for name, _ in scope] + [node.name])
+            registered = any(_decorator_name(d) not in PASSIVE_DECORATORS for d in node.decorator_list)
+            self.definitions.append([qualname, kind, node.lineno, registered])
+
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                self.imports.append([alias.name, 0, None, alias.asname])
+
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                self.imports.append([node.module or "", node.level or 0, alias.name, alias.asname])
+
+        elif not scope and isinstance(node, ast.Assign):
+            if any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+                self.exports = self._exported(node.value)
+
+        elif not scope and isinstance(node, ast.AugAssign):
+            if isinstance(node.target, ast.Name) and node.target.id == "__all__":
+                self.exports = (self.exports or []) + self._exported(node.value)
+
+    def result(self) -> Dict[str, Any]:
+        bound = set()
+        for module, level, name, asname in self.imports:
+            bound.add(asname or (name if name is not None else module.split(".")[0]))
+
+        return {
+            "definitions": sorted(self.definitions, key=lambda definition: definition[2]),
+            "names": sorted(self.names),
+            "attributes": sorted(self.attributes),
+            "imports": self.imports,
+            "module_attributes": sorted(
+                [base, attr] for base, attr in self.chains if base.split(".")[0] in bound
+            ),
+            "exports": self.exports
+        }
+
+def _module_suffixes(path: str) -> Set[str]:
+    """Every dotted name an import could use to reach the file at path (a/b/c.py -> c, b.c, a.b.c)"""
+    name = path.replace("\\", "/")
+    if name.endswith(".py"):
+        name = name[:-3]
+    if name.endswith("/__init__") or name == "__init__":
+        name = name[:-len("__init__")].rstrip("/")
+    parts = name.split("/") if name else []
+    return {".".join(parts[start:]) for start in range(len(parts))}
+
+class SymbolIndex:
+    """
+    Repository-wide symbol table built from per-file symbol tables. Files
+    can be updated or removed one at a time: only that file's references
+    are withdrawn and re-added, and when the set of files changes only the
+    files whose imports could resolve differently (they name a module the
+    added or removed files provide, or sit below an added or removed
+    package) are re-resolved, without re-parsing anything.
+    """
+
+    def __init__(self):
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.names: Dict[str, Set[str]] = {}
+        self.attributes: Counter = Counter()
+        # (file, top-level name) -> number of files importing it; name "*" for star imports
+        self.imported: Counter = Counter()
+        self._contributions: Dict[str, List[Tuple[str, str]]] = {}
+        # Dotted module names each file's imports were looked up by
+        self._queries: Dict[str, Set[str]] = {}
+        self._resolver: Optional[ModuleResolver] = None
+        # Files whose imports are not resolved yet, and files added or removed since the resolver was built
+        self._pending: Set[str] = set()
+        self._moved: Set[str] = set()
+
+    def copy(self) -> "SymbolIndex":
+        """An independent index with the same contents (per-file entries are replaced, never mutated, so they are shared)"""
+        other = SymbolIndex()
+        other.files = dict(self.files)
+        other.names = dict(self.names)
+        other.attributes = Counter(self.attributes)
+        other.imported = Counter(self.imported)
+        other._contributions = dict(self._contributions)
+        other._queries = dict(self._queries)
+        other._resolver = self._resolver
+        other._pending = set(self._pending)
+        other._moved = set(self._moved)
+        return other
+
+    def update(self, path: str, symbols: Dict[str, Any]):
+        """Add a file's symbol table, replacing any previous version of it (an identical one is kept as is)"""
+        if path in self.files:
+            if self.files[path] == symbols:
+                return
+            self._withdraw(path)
+        else:
+            # Imports elsewhere may resolve differently with this file
+            self._moved.add(path)
+        self.files[path] = symbols
+        self.names[path] = set(symbols["names"])
+        self.attributes.update(symbols["attributes"])
+        self._pending.add(path)
+
+    def remove(self, path: str):
+        """Withdraw a file's definitions and references"""
+        if path in self.files:
+            self._withdraw(path)
+            self._moved.add(path)
+
+    def _withdraw(self, path: str):
+        symbols = self.files.pop(path)
+        del self.names[path]
+        self.attributes.subtract(symbols["attributes"])
+        self.imported.subtract(self._contributions.pop(path, []))
+        self._queries.pop(path, None)
+        self._pending.discard(path)
+
+    def _affected(self) -> Set[str]:
+        """Resolved files whose imports may point elsewhere now that the files in _moved came or went"""
+        names: Set[str] = set()
+        packages: List[str] = []
+        for path in self._moved:
+            names |= _module_suffixes(path)
+            if posixpath.basename(path.replace("\\", "/")) == "__init__.py":
+                # Import roots and relative imports below the package change with it
+                packages.append(posixpath.dirname(path.replace("\\", "/")))
+        affected = set()
+        for path, queries in self._queries.items():
+            posix = path.replace("\\", "/")
+            if queries & names or any(not package or posix.startswith(package + "/") for package in packages):
+                affected.add(path)
+        return affected
+
+    def _resolve_imports(self):
+        """Resolve the imports of every file not resolved against the current set of files"""
+        if self._resolver is None:
+            self._pending = set(self.files)
+        elif self._moved:
+            self._pending |= self._affected()
+        if self._moved or self._resolver is None:
+            self._resolver = ModuleResolver(self.files)
+        self._moved = set()
+        for path in sorted(self._pending):
+            self.imported.subtract(self._contributions.pop(path, []))
+            self._contribute(path)
+        self._pending = set()
+
+    def _contribute(self, path: str):
+        resolver = self._resolver
+        symbols = self.files[path]
+        targets: Set[Tuple[str, str]] = set()
+        modules: Dict[str, Tuple[str, int]] = {}
+        queries: Set[str] = set()
+
+        for module, level, name, asname in symbols["imports"]:
+            if name is None:
+                # import a.b binds a; import a.b as c binds c to a.b
+                if asname:
+                    modules[asname] = (module, level)
+                else:
+                    root = module.split(".")[0]
+                    modules.setdefault(root, (root, level))
+                continue
+
+            submodule = f"{module}.{name}" if module else name
+            queries.update((submodule, module))
+            if resolver.resolve(path, submodule, level):
+                modules[asname or name] = (submodule, level)
+            for file in resolver.resolve(path, module, level):
+                targets.add((file, name))
+
+        for base, attr in symbols["module_attributes"]:
+            root, _, rest = base.partition(".")
+            if root not in modules:
+                continue
+            module, level = modules[root]
+            dotted = f"{module}.{rest}" if rest else module
+            queries.add(dotted)
+            for file in resolver.resolve(path, dotted, level):
+                targets.add((file, attr))
+
+        self._contributions[path] = list(targets)
+        self._queries[path] = queries
+        self.imported.update(targets)
+
+    def is_used(self, path: str, definition: List[Any]) -> bool:
+        """Whether a definition of the file at path is referenced anywhere"""
+        if self._resolver is None or self._pending or self._moved:
+            self._resolve_imports()
+        qualname, kind, _line, registered = definition
+        name = qualname.rsplit(".", 1)[-1]
+        if registered or name in ENTRY_POINTS or (name.startswith("__") and name.endswith("__")):
+            return True
+        if name in self.names[path]:
+            return True
+        if kind == "method":
+            # Method calls cannot be tied to a class without type inference
+            return self.attributes[name] > 0
+        if "." in qualname:
+            return False
+        exports = self.files[path]["exports"]
+        return bool(
+            self.imported[(path, name)] > 0
+            or (exports is not None and name in exports)
+            or (self.imported[(path, "*")] > 0 and not name.startswith("_"))
+        )
+
+    def unused(self, kinds: Iterable[str] = ("function", "method", "class")) -> List[Tuple[str, List[Any]]]:
+        """(file, definition) pairs never referenced, by file and line"""
+        kinds = set(kinds)
+        unused = []
+        for path in sorted(self.files):
+            for definition in self.files[path]["definitions"]:
+                if definition[1] in kinds and not self.is_used(path, definition):
+                    unused.append((path, definition))
+        return unused
@@ -5,16 +5,150 @@ Identifies over-engineering, dead code, and unnecessary abstractions
 
 import ast
 import os
-from typing import Dict, List, Set, Any
+from typing import Dict, Iterable, List, Set, Any, Optional
 from pathlib import Path
 import asyncio
-from collections import defaultdict
+
+from .corpus import RepoCorpus, SourceFile, get_corpus
+from .executor import AnalysisExecutor, ResultCallback, get_executor
+from .cache import FileTask, cached_map
+from .reducers import IssueTally
+from .rules import Rule, Scope, run_rule, run_rules
+from .symbols import SymbolIndex, SymbolRule
+
+class SingleImplementationInterfaceRule(Rule):
+    """Interfaces/abstract classes with only one implementation"""
+    
+    NAME = "single_implementation_interface"
+    NODE_TYPES = (ast.ClassDef,)
+    
+    def __init__(self, rel_path: str, tree: ast.AST):
+        super().__init__(rel_path, tree)
+        self.issues = []
+    
+    def visit(self, node: ast.ClassDef, scope: Scope):
+        # Check if it's an abstract class or interface-like
+        is_abstract = any(
+            isinstance(base, ast.Name) and 'ABC' in base.id
+            for base in node.bases if isinstance(base, ast.Name)
+        )
+        
+        if is_abstract:
+            # Check for abstract methods
+            abstract_methods = []
+            for item in node.body:
+                if isinstance(item, ast.FunctionDef):
+                    for decorator in item.decorator_list:
+                        if isinstance(decorator, ast.Name) and 'abstract' in decorator.id:
+                            abstract_methods.append(item.name)
+            
+            if abstract_methods:
+                self.issues.append({
+                    "type": "single_implementation_interface",
+                    "class": node.name,
+                    "line": node.lineno,
+                    "severity": "medium",
+                    "message": f"Abstract class '{node.name}' might be over-engineering if it has only one implementation"
+                })
+    
+    def result(self) -> List[Dict[str, Any]]:
+        return self.issues
+
+class UnnecessaryWrapperRule(Rule):
+    """Wrapper classes that mostly delegate to another object"""
+    
+    NAME = "unnecessary_wrapper"
+    NODE_TYPES = (ast.ClassDef,)
+    
+    def __init__(self, rel_path: str, tree: ast.AST):
+        super().__init__(rel_path, tree)
+        self.issues = []
+    
+    def visit(self, node: ast.ClassDef, scope: Scope):
+        # Check for wrapper classes that just delegate
+        delegation_count = 0
+        total_methods = 0
+        
+        for item in node.body:
+            if isinstance(item, ast.FunctionDef) and not item.name.startswith('__'):
+                total_methods += 1
+                
+                # Check if method just delegates to another object
+                if len(item.body) == 1:
+                    stmt = item.body[0]
+                    if isinstance(stmt, ast.Return) and isinstance(stmt.value, ast.Call):
+                        if isinstance(stmt.value.func, ast.Attribute):
+                            delegation_count += 1
+        
+        if total_methods > 0 and delegation_count / total_methods > 0.8:
+            self.issues.append({
+                "type": "unnecessary_wrapper",
+                "class": node.name,
+                "line": node.lineno,
+                "severity": "low",
+                "message": f"Class '{node.name}' appears to be mostly delegating calls, consider if this abstraction is necessary"
+            })
+    
+    def result(self) -> List[Dict[str, Any]]:
+        return self.issues
+
+class PrematureOptimizationRule(Rule):
+    """Caching and specialised data structures without a clear need"""
+    
+    NAME = "premature_optimization"
+    NODE_TYPES = (ast.FunctionDef, ast.Assign)
+    
+    def __init__(self, rel_path: str, tree: ast.AST):
+        super().__init__(rel_path, tree)
+        self.issues = []
+    
+    def visit(self, node: ast.AST, scope: Scope):
+        # Check for caching without clear need
+        if isinstance(node, ast.FunctionDef):
+            for decorator in node.decorator_list:
+                if isinstance(decorator, ast.Name) and 'cache' in decorator.id.lower():
+                    # Check if function is simple (low complexity)
+                    if len(node.body) < 5:  # Simple heuristic
+                        self.issues.append({
+                            "type": "premature_caching",
+                            "function": node.name,
+                            "line": node.lineno,
+                            "severity": "low",
+                            "message": f"Function '{node.name}' uses caching but appears simple - might be premature optimization"
+                        })
+        
+        # Check for complex data structures for simple use cases
+        elif isinstance(node.value, ast.Call):
+            if isinstance(node.value.func, ast.Name):
+                if node.value.func.id in ['OrderedDict', 'deque', 'ChainMap']:
+                    self.issues.append({
+                        "type": "complex_data_structure",
+                        "line": node.lineno,
+                        "severity": "low",
+                        "message": f"Using {node.value.func.id} - ensure this complexity is needed"
+                    })
+    
+    def result(self) -> List[Dict[str, Any]]:
+        return self.issues
 
 class YAGNIDetector:
     """Detect over-engineering and unnecessary code"""
     
-    def __init__(self, repo_path: str):
+    # Cache key for per-file results; bump VERSION whenever per-file output changes
+    NAME = "yagni"
+    VERSION = "3"
+    SKIP_TESTS = True
+    # Generated, vendored and minified files are counted but not analyzed
+    SKIP_GENERATED = True
+    
+    # Checked together in one traversal per file; issues are reported in this order
+    ISSUE_RULES = [SingleImplementationInterfaceRule, UnnecessaryWrapperRule, PrematureOptimizationRule]
+    
+    def __init__(self, repo_path: str, corpus: Optional[RepoCorpus] = None,
+                 executor: Optional[AnalysisExecutor] = None, symbols: Optional[SymbolIndex] = None):
         self.repo_path = Path(repo_path)
+        self.corpus = get_corpus(repo_path, corpus)
+        self.executor = executor or get_executor()
         self.unused_functions = []
         self.unused_classes = []
         self.unused_variables = []
@@ -22,258 +156,158 @@ class YAGNIDetector:
         self.over_engineered_patterns = []
         self.dead_code_blocks = []
         
-        # Track usage
-        self.function_calls = defaultdict(int)
-        self.class_instantiations = defaultdict(int)
-        self.variable_usage = defaultdict(int)
-        self.defined_functions = set()
-        self.defined_classes = set()
-        self.defined_variables = set()
+        # Definitions and references across all files, updated file by file;
+        # starting from a base analysis' index only re-resolves what changed
+        self.symbols = symbols.copy() if symbols is not None else SymbolIndex()
+    
+    def select(self, corpus: RepoCorpus) -> List[SourceFile]:
+        """Files this analyzer covers"""
+        return list(corpus.iter_files(skip_tests=self.SKIP_TESTS, skip_generated=self.SKIP_GENERATED))
+    
+    async def collect(self, sources: List[SourceFile],
+                      on_result: Optional[ResultCallback] = None) -> List[Dict[str, Any]]:
+        """Per-file results for sources, served from the result cache where possible"""
+        return await cached_map(self.executor, self.NAME, self.VERSION, self.analyze_source, sources,
+                                on_result=on_result)
     
-    async def analyze_file(self, file_path: Path) -> Dict[str, Any]:
+    @property
+    def file_task(self) -> FileTask:
+        """The per-file function and its cache key, for dispatch alongside other analyzers"""
+        return FileTask(self.NAME, self.VERSION, self.analyze_source)
+    
+    async def analyze_file(self, source: SourceFile) -> Dict[str, Any]:
         """Analyze a single file for YAGNI violations"""
+        return self.record_symbols((await self.collect([source]))[0])
+    
+    @staticmethod
+    def analyze_source(source: SourceFile) -> Dict[str, Any]:
+        """
+        Collect definitions, usages and pattern issues for one file
+        (pure, safe to run in a worker process). Cross-file usage tracking
+        happens later in record_symbols.
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                tree = ast.parse(content)
+            tree = source.tree
             
-            file_name = str(file_path.relative_to(self.repo_path))
+            file_name = source.rel_path
+            # Symbol table (definitions, references, imports, __all__) and pattern checks in one walk
+            rules = YAGNIDetector.ISSUE_RULES
+            found = run_rules(tree, file_name, [SymbolRule] + rules, source.nodes)
             
-            # First pass: collect definitions
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
-                    self.defined_functions.add(f"{file_name}:{node.name}")
-                elif isinstance(node, ast.ClassDef):
-                    self.defined_classes.add(f"{file_name}:{node.name}")
-                elif isinstance(node, ast.Assign):
-                    for target in node.targets:
-                        if isinstance(target, ast.Name):
-                            self.defined_variables.add(f"{file_name}:{target.id}")
-            
-            # Second pass: track usage
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Call):
-                    if isinstance(node.func, ast.Name):
-                        self.function_calls[node.func.id] += 1
-                    elif isinstance(node.func, ast.Attribute):
-                        self.function_calls[node.func.attr] += 1
-                
-                elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
-                    # Track variable/class usage
-                    self.variable_usage[node.id] += 1
-            
-            # Detect patterns
             yagni_issues = {
                 "file": file_name,
-                "issues": []
+                "issues": [issue for rule in rules for issue in found[rule.NAME]],
+                "symbols": found[SymbolRule.NAME]
             }
             
-            # Check for single implementation interfaces
-            interfaces = self.detect_single_implementation_interfaces(tree, file_name)
-            if interfaces:
-                yagni_issues["issues"].extend(interfaces)
-            
-            # Check for unnecessary abstractions
-            abstractions = self.detect_unnecessary_abstractions(tree, file_name)
-            if abstractions:
-                yagni_issues["issues"].extend(abstractions)
-            
-            # Check for premature optimization
-            optimizations = self.detect_premature_optimization(tree, file_name)
-            if optimizations:
-                yagni_issues["issues"].extend(optimizations)
-            
             return yagni_issues
         
         except Exception as e:
             return {
-                "file": str(file_path.relative_to(self.repo_path)),
+                "file": source.rel_path,
                 "error": str(e)
             }
     
-    def detect_single_implementation_interfaces(self, tree: ast.AST, file_name: str) -> List[Dict[str, Any]]:
-        """Detect interfaces/abstract classes with only one implementation"""
-        issues = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                # Check if it's an abstract class or interface-like
-                is_abstract = any(
-                    isinstance(base, ast.Name) and 'ABC' in base.id
-                    for base in node.bases if isinstance(base, ast.Name)
-                )
-                
-                if is_abstract:
-                    # Check for abstract methods
-                    abstract_methods = []
-                    for item in node.body:
-                        if isinstance(item, ast.FunctionDef):
-                            for decorator in item.decorator_list:
-                                if isinstance(decorator, ast.Name) and 'abstract' in decorator.id:
-                                    abstract_methods.append(item.name)
-                    
-                    if abstract_methods:
-                        issues.append({
-                            "type": "single_implementation_interface",
-                            "class": node.name,
-                            "line": node.lineno,
-                            "severity": "medium",
-                            "message": f"Abstract class '{node.name}' might be over-engineering if it has only one implementation"
-                        })
+    @staticmethod
+    def file_summary(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Compact per-file figures for progress updates"""
+        if "error" in record:
+            return {"error": record["error"]}
+        return {"issues": len(record["issues"])}
+    
+    def record_symbols(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add (or replace) a file's symbol table in the symbol index and return
+        the result without it (the input is left intact)
+        """
+        symbols = result.get("symbols")
+        if not symbols:
+            return result
+        result = {key: value for key, value in result.items() if key != "symbols"}
         
-        return issues
+        self.symbols.update(result["file"], symbols)
+        return result
+    
+    @staticmethod
+    def detect_single_implementation_interfaces(tree: ast.AST, file_name: str) -> List[Dict[str, Any]]:
+        """Detect interfaces/abstract classes with only one implementation"""
+        return run_rule(tree, file_name, SingleImplementationInterfaceRule)
     
-    def detect_unnecessary_abstractions(self, tree: ast.AST, file_name: str) -> List[Dict[str, Any]]:
+    @staticmethod
+    def detect_unnecessary_abstractions(tree: ast.AST, file_name: str) -> List[Dict[str, Any]]:
         """Detect unnecessary abstraction layers"""
-        issues = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                # Check for wrapper classes that just delegate
-                delegation_count = 0
-                total_methods = 0
-                
-                for item in node.body:
-                    if isinstance(item, ast.FunctionDef) and not item.name.startswith('__'):
-                        total_methods += 1
-                        
-                        # Check if method just delegates to another object
-                        if len(item.body) == 1:
-                            stmt = item.body[0]
-                            if isinstance(stmt, ast.Return) and isinstance(stmt.value, ast.Call):
-                                if isinstance(stmt.value.func, ast.Attribute):
-                                    delegation_count += 1
-                
-                if total_methods > 0 and delegation_count / total_methods > 0.8:
-                    issues.append({
-                        "type": "unnecessary_wrapper",
-                        "class": node.name,
-                        "line": node.lineno,
-                        "severity": "low",
-                        "message": f"Class '{node.name}' appears to be mostly delegating calls, consider if this abstraction is necessary"
-                    })
-        
-        return issues
+        return run_rule(tree, file_name, UnnecessaryWrapperRule)
     
-    def detect_premature_optimization(self, tree: ast.AST, file_name: str) -> List[Dict[str, Any]]:
+    @staticmethod
+    def detect_premature_optimization(tree: ast.AST, file_name: str) -> List[Dict[str, Any]]:
         """Detect potential premature optimizations"""
-        issues = []
-        
-        for node in ast.walk(tree):
-            # Check for caching without clear need
-            if isinstance(node, ast.FunctionDef):
-                for decorator in node.decorator_list:
-                    if isinstance(decorator, ast.Name) and 'cache' in decorator.id.lower():
-                        # Check if function is simple (low complexity)
-                        if len(node.body) < 5:  # Simple heuristic
-                            issues.append({
-                                "type": "premature_caching",
-                                "function": node.name,
-                                "line": node.lineno,
-                                "severity": "low",
-                                "message": f"Function '{node.name}' uses caching but appears simple - might be premature optimization"
-                            })
-            
-            # Check for complex data structures for simple use cases
-            if isinstance(node, ast.Assign):
-                if isinstance(node.value, ast.Call):
-                    if isinstance(node.value.func, ast.Name):
-                        if node.value.func.id in ['OrderedDict', 'deque', 'ChainMap']:
-                            issues.append({
-                                "type": "complex_data_structure",
-                                "line": node.lineno,
-                                "severity": "low",
-                                "message": f"Using {node.value.func.id} - ensure this complexity is needed"
-                            })
-        
-        return issues
+        return run_rule(tree, file_name, PrematureOptimizationRule)
     
     def detect_dead_code(self) -> List[Dict[str, Any]]:
-        """Identify potentially dead code"""
+        """Identify potentially dead code (definitions nothing in the repository refers to)"""
         dead_code = []
         
-        # Find unused functions
-        for func in self.defined_functions:
-            func_name = func.split(':')[1]
-            if func_name not in ['__init__', '__str__', '__repr__', 'main']:
-                if self.function_calls[func_name] == 0:
-                    dead_code.append({
-                        "type": "unused_function",
-                        "identifier": func,
-                        "severity": "medium"
-                    })
-        
-        # Find unused classes
-        for cls in self.defined_classes:
-            cls_name = cls.split(':')[1]
-            if self.variable_usage[cls_name] == 0:
-                dead_code.append({
-                    "type": "unused_class",
-                    "identifier": cls,
-                    "severity": "medium"
-                })
+        for file_name, (qualname, kind, line, _registered) in self.symbols.unused():
+            dead_code.append({
+                "type": "unused_class" if kind == "class" else "unused_function",
+                "identifier": f"{file_name}:{qualname}",
+                "line": line,
+                "severity": "medium"
+            })
         
         return dead_code
     
-    async def calculate_yagni_score(self, all_issues: List[Dict[str, Any]]) -> float:
+    async def calculate_yagni_score(self, all_issues: Iterable[Dict[str, Any]]) -> float:
         """Calculate overall YAGNI score (0-100, higher is better)"""
-        total_issues = sum(len(file_result.get("issues", [])) for file_result in all_issues)
-        
-        # Weight by severity
-        severity_weights = {"high": 3, "medium": 2, "low": 1}
-        weighted_issues = 0
-        
+        # Issues are weighted by severity
+        tally = IssueTally()
         for file_result in all_issues:
-            for issue in file_result.get("issues", []):
-                weighted_issues += severity_weights.get(issue.get("severity", "low"), 1)
-        
-        # Calculate score (inverse of issues, normalized to 0-100)
-        # Assume 50 weighted issues = 0 score, 0 issues = 100 score
-        score = max(0, 100 - (weighted_issues * 2))
-        
-        return score
+            tally.add(file_result)
+        return tally.score()
     
-    async def run(self) -> Dict[str, Any]:
-        """Run the complete YAGNI detection"""
+    async def summarize(self, results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build the analysis result from per-file results (in a single pass).
+        Files the symbol index holds but results do not are withdrawn from it.
+        """
         file_results = []
+        tally = IssueTally()
+        indexed = set()
         
-        # Analyze all Python files
-        for py_file in self.repo_path.rglob("*.py"):
-            if "__pycache__" in str(py_file) or "test_" in py_file.name:
-                continue
-            
-            result = await self.analyze_file(py_file)
+        for result in results:
+            if result.get("symbols"):
+                indexed.add(result["file"])
+            result = self.record_symbols(result)
             if result.get("issues"):
                 file_results.append(result)
+                tally.add(result)
+        
+        for path in set(self.symbols.files) - indexed:
+            self.symbols.remove(path)
         
         # Detect dead code across all files
         dead_code = self.detect_dead_code()
         
-        # Calculate overall score
-        yagni_score = await self.calculate_yagni_score(file_results)
-        
         return {
-            "score": round(yagni_score, 2),
-            "total_issues": sum(len(f.get("issues", [])) for f in file_results),
+            "score": round(tally.score(), 2),
+            "total_issues": tally.total,
             "dead_code": dead_code,
             "files_with_issues": file_results,
             "summary": {
                 "unused_functions": len([d for d in dead_code if d["type"] == "unused_function"]),
                 "unused_classes": len([d for d in dead_code if d["type"] == "unused_class"]),
-                "single_implementations": sum(
-                    1 for f in file_results 
-                    for i in f.get("issues", []) 
-                    if i["type"] == "single_implementation_interface"
-                ),
-                "unnecessary_wrappers": sum(
-                    1 for f in file_results 
-                    for i in f.get("issues", []) 
-                    if i["type"] == "unnecessary_wrapper"
-                )
+                "single_implementations": tally.by_type.get("single_implementation_interface", 0),
+                "unnecessary_wrappers": tally.by_type.get("unnecessary_wrapper", 0)
             }
         }
+    
+    async def run(self) -> Dict[str, Any]:
+        """Run the complete YAGNI detection"""
+        # Analyze all Python files
+        results = await self.collect(self.select(self.corpus))
+        return await self.summarize(results)
 
-async def detect_yagni(repo_path: str) -> Dict[str, Any]:
+async def detect_yagni(repo_path: str, corpus: Optional[RepoCorpus] = None) -> Dict[str, Any]:
     """Main entry point for YAGNI detection"""
-    detector = YAGNIDetector(repo_path)
+    detector = YAGNIDetector(repo_path, corpus)
     return await detector.run()
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Analysis service shared by the HTTP routes and the WebSocket endpoint
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+from analyzers import AnalysisProgress, analyze_history, analyze_snapshot
+from analyzers.clones import is_remote_url
+from config import settings
+from storage import get_result_store, repo_id_for
+
+LOCAL_REPOSITORY_REFUSED = "Local repositories outside LOCAL_REPO_ROOTS cannot be analyzed"
+
+def repository_allowed(repo_url: str) -> bool:
+    """
+    Whether clients may have repo_url analyzed: a remote repository, or a
+    local path (or file:// URL) inside one of the LOCAL_REPO_ROOTS directories
+    """
+    repo_url = repo_url.strip()
+    if is_remote_url(repo_url) and not repo_url.startswith("file://"):
+        return True
+    path = os.path.realpath(repo_url[len("file://"):] if repo_url.startswith("file://") else repo_url)
+    for root in settings.local_repo_roots:
+        root = os.path.realpath(root)
+        if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+async def analyze_and_store(repo_url: str, target_ref: Optional[str] = None,
+                            progress: Optional[AnalysisProgress] = None,
+                            branch: Optional[str] = None, depth: int = 0) -> Dict[str, Any]:
+    """
+    Analyze a repository incrementally against its latest stored snapshot
+    and persist the result so it can be read back by repo_id
+    (branch and depth select what is fetched of a remote repository)
+    """
+    store = get_result_store()
+    repo_id = repo_id_for(repo_url)
+
+    base = await asyncio.to_thread(store.latest_snapshot, repo_id)
+    snapshot = await analyze_snapshot(repo_url, target_ref=target_ref, base_snapshot=base,
+                                      progress=progress, branch=branch, depth=depth)
+    snapshot.result["repo_id"] = repo_id
+
+    try:
+        await asyncio.to_thread(store.save, repo_id, repo_url, snapshot)
+    finally:
+        # Persisted (or failed); spilled records are no longer needed
+        snapshot.close()
+    return snapshot.result
+
+async def history_and_store(repo_url: str, target_ref: Optional[str] = None,
+                            progress: Optional[AnalysisProgress] = None,
+                            branch: Optional[str] = None, depth: int = 0,
+                            step: int = 1, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compute the metrics series of a branch's history (see analyze_history),
+    reusing points stored for commits analyzed before, and persist it so it
+    can be read back by repo_id and branch
+    """
+    store = get_result_store()
+    repo_id = repo_id_for(repo_url)
+
+    known = await asyncio.to_thread(store.history_points, repo_id)
+    points = await analyze_history(repo_url, branch=branch, target_ref=target_ref, step=step,
+                                   limit=limit, depth=depth, known=known, progress=progress)
+
+    series = await asyncio.to_thread(store.save_history, repo_id, repo_url, target_ref or branch or "", points)
+    return {**series, "step": step}
@@ -0,0 +1,98 @@
+"""
+Delta encoding for WebSocket updates
+Sends JSON-patch-style changes against the last update of each repository topic
+"""
+
+import copy
+from typing import Any, Dict, List, Optional, Tuple
+
+def _escape(key: Any) -> str:
+    """Escape a key for use in a JSON pointer"""
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+def diff(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """
+    Patch operations turning old into new. Dicts are compared key by key;
+    anything else (including lists) is replaced whole when it differs.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key, value in new.items():
+            key_path = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": key_path, "value": value})
+            else:
+                ops.extend(diff(old[key], value, key_path))
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        return ops
+    if old != new or type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": new}]
+    return []
+
+class _Stream:
+    """Last state sent on one (kind, topic) stream"""
+
+    def __init__(self):
+        self.seq = 0
+        self.state: Any = None
+        self.since_keyframe = 0
+
+class DeltaEncoder:
+    """
+    Remembers the last metrics and structure sent for each repository topic
+    and turns each new update into either a keyframe (the full data) or a
+    delta (patch operations against the previous update).
+
+    Every message carries a per-stream sequence number. Clients apply a delta
+    only when its seq is exactly one more than the last one they applied,
+    ignore anything older, and ask for a keyframe when they see a gap. A
+    keyframe is also sent every keyframe_interval updates.
+
+    Structures are diffed as {module id: module}, so delta paths look like
+    "/api/health"; metrics paths look like "/vulnerabilities/high".
+    """
+
+    def __init__(self, keyframe_interval: int = 20):
+        self.keyframe_interval = keyframe_interval
+        self._streams: Dict[Tuple[str, str], _Stream] = {}
+
+    @staticmethod
+    def _comparable(kind: str, data: Any) -> Any:
+        if kind == "structure":
+            return {module["id"]: module for module in data}
+        return data
+
+    def encode(self, kind: str, topic: str, data: Any) -> Optional[Dict[str, Any]]:
+        """Message for a new update, or None when nothing changed"""
+        stream = self._streams.setdefault((kind, topic), _Stream())
+        state = self._comparable(kind, data)
+
+        if stream.state is not None and stream.since_keyframe < self.keyframe_interval:
+            ops = diff(stream.state, state)
+            if not ops:
+                return None
+            stream.seq += 1
+            stream.since_keyframe += 1
+            stream.state = copy.deepcopy(state)
+            return {"type": f"{kind}_delta", "topic": topic, "seq": stream.seq, "ops": ops}
+
+        if stream.state is not None and not diff(stream.state, state):
+            return None
+        stream.seq += 1
+        stream.since_keyframe = 0
+        stream.state = copy.deepcopy(state)
+        return self._keyframe(kind, topic, stream, data)
+
+    def keyframe(self, kind: str, topic: str) -> Optional[Dict[str, Any]]:
+        """The latest full update of a stream (for clients resynchronizing)"""
+        stream = self._streams.get((kind, topic))
+        if stream is None or stream.state is None:
+            return None
+        data = list(stream.state.values()) if kind == "structure" else stream.state
+        return self._keyframe(kind, topic, stream, data)
+
+    @staticmethod
+    def _keyframe(kind: str, topic: str, stream: _Stream, data: Any) -> Dict[str, Any]:
+        return {"type": f"{kind}_update", "topic": topic, "seq": stream.seq, "keyframe": True, "data": data}
@@ -0,0 +1,121 @@
+"""
+Response encoding for analysis results
+Content negotiation between JSON, MessagePack and a columnar layout of either
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional, speeds up the JSON path
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional, required for the MessagePack formats
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+COLUMNAR_JSON = "application/vnd.starship.columnar+json"
+COLUMNAR_MSGPACK = "application/vnd.starship.columnar+msgpack"
+
+# Accept values understood for each format (the first is what we reply with)
+FORMATS = {
+    JSON: (JSON,),
+    MSGPACK: (MSGPACK, "application/x-msgpack", "application/vnd.msgpack"),
+    COLUMNAR_JSON: (COLUMNAR_JSON,),
+    COLUMNAR_MSGPACK: (COLUMNAR_MSGPACK,),
+}
+
+def to_columnar(value: Any) -> Any:
+    """
+    Rewrite every list of objects as parallel arrays, one per field:
+    [{"name": "a", "size": 1}, {"name": "b", "size": 2}] becomes
+    {"columns": {"name": ["a", "b"], "size": [1, 2]}, "length": 2}.
+    Fields missing from some objects are null in their column.
+    """
+    if isinstance(value, dict):
+        return {key: to_columnar(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            fields: Dict[str, None] = {}
+            for item in value:
+                fields.update(dict.fromkeys(item))
+            return {
+                "columns": {
+                    field: [to_columnar(item.get(field)) for item in value]
+                    for field in fields
+                },
+                "length": len(value)
+            }
+        return [to_columnar(item) for item in value]
+    return value
+
+def dumps_json(content: Any) -> bytes:
+    """Encode JSON-native content directly, without FastAPI's jsonable_encoder"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def dumps_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, use_bin_type=True)
+
+def _accepted(accept: str) -> List[Tuple[str, float]]:
+    """Media types from an Accept header, highest preference first"""
+    accepted = []
+    for part in accept.split(","):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted.append((media_type.lower(), quality))
+    return sorted(accepted, key=lambda item: -item[1])
+
+def negotiate(request: Request) -> str:
+    """Pick the response format for a request (JSON unless asked otherwise)"""
+    accept = request.headers.get("accept")
+    if not accept:
+        return JSON
+
+    for media_type, quality in _accepted(accept):
+        if quality <= 0:
+            continue
+        if media_type in ("*/*", "application/*"):
+            return JSON
+        for name, aliases in FORMATS.items():
+            if media_type in aliases:
+                if name in (MSGPACK, COLUMNAR_MSGPACK) and msgpack is None:
+                    break
+                return name
+
+    raise HTTPException(
+        status_code=406,
+        detail=f"Supported formats: {', '.join(available_formats())}"
+    )
+
+def available_formats() -> List[str]:
+    return [name for name in FORMATS if msgpack is not None or name not in (MSGPACK, COLUMNAR_MSGPACK)]
+
+def encode_response(content: Any, request: Request, status_code: int = 200,
+                    media_type: Optional[str] = None) -> Response:
+    """Serialize content in the format the client asked for"""
+    media_type = media_type or negotiate(request)
+    if media_type in (COLUMNAR_JSON, COLUMNAR_MSGPACK):
+        content = to_columnar(content)
+    if media_type in (MSGPACK, COLUMNAR_MSGPACK):
+        body = dumps_msgpack(content)
+    else:
+        body = dumps_json(content)
+    return Response(content=body, status_code=status_code, media_type=media_type,
+                    headers={"Vary": "Accept"})
@@ -0,0 +1,223 @@
+"""
+Analysis job manager
+Runs analyses in the background with bounded concurrency and request coalescing
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+import time
+import uuid
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from analyzers import AnalysisProgress
+from config import settings
+from storage import repo_id_for
+from .analysis import analyze_and_store, history_and_store
+
+class JobStatus(str, Enum):
+    """Job status enumeration"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class AnalysisJob:
+    """
+    A single background analysis of one repository at one ref (of one
+    remote branch). kind "history" computes a metrics series over the
+    branch's history instead, with options such as step and limit.
+    """
+
+    def __init__(self, repo_url: str, ref: Optional[str] = None,
+                 branch: Optional[str] = None, depth: int = 0,
+                 kind: str = "analysis", options: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.repo_url = repo_url
+        self.repo_id = repo_id_for(repo_url)
+        self.ref = ref
+        self.branch = branch
+        self.depth = depth
+        self.kind = kind
+        self.options = options or {}
+        self.status = JobStatus.QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.requests = 1
+        self.task: Optional[asyncio.Task] = None
+        self.events: List[Dict[str, Any]] = []
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        """Identical (repository, ref, branch, kind, options) requests share one job"""
+        return (self.repo_id, self.ref or "", self.branch or "", self.kind,
+                tuple(sorted(self.options.items())))
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Queue of the job's progress events, starting with the discovery and
+        module events already sent; None marks the end of the stream
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        if self.done:
+            queue.put_nowait(None)
+        else:
+            self._subscribers.append(queue)
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+    
+    def publish(self, event: Optional[Dict[str, Any]]):
+        """Send a progress event (or the None end marker) to every subscriber"""
+        if event is not None:
+            event = {**event, "job_id": self.id}
+            # Late subscribers get the structure and rollups, not every file batch
+            if event["type"] != "file_results":
+                self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+        if event is None:
+            self._subscribers.clear()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Job status without the (potentially large) result"""
+        return {
+            "job_id": self.id,
+            "repo_id": self.repo_id,
+            "repo_url": self.repo_url,
+            "ref": self.ref,
+            "branch": self.branch,
+            "kind": self.kind,
+            "options": self.options,
+            "status": self.status.value,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "coalesced_requests": self.requests,
+            "error": self.error
+        }
+
+class JobManager:
+    """
+    Background analysis jobs. At most max_concurrent analyses run at once;
+    a request for a repository and ref that already has a queued or running
+    job attaches to it instead of starting another analysis.
+    """
+
+    def __init__(self, max_concurrent: int, history: int = 1000,
+                 runner: Callable[..., Awaitable[Dict[str, Any]]] = analyze_and_store,
+                 history_runner: Callable[..., Awaitable[Dict[str, Any]]] = history_and_store):
+        self.history = history
+        # Coroutine running each kind of job
+        self.runners = {"analysis": runner, "history": history_runner}
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._jobs: "OrderedDict[str, AnalysisJob]" = OrderedDict()
+        self._active: Dict[Tuple[Any, ...], AnalysisJob] = {}
+        self._listeners: List[Callable[[AnalysisJob], Awaitable[None]]] = []
+    
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold one of the max_concurrent analysis slots for the duration of
+        the block, for work that runs outside a job (e.g. streamed analyses)
+        """
+        async with self._semaphore:
+            yield
+
+    def add_listener(self, listener: Callable[[AnalysisJob], Awaitable[None]]):
+        """Call listener with every analysis job (not history) that completes successfully"""
+        self._listeners.append(listener)
+
+    def submit(self, repo_url: str, ref: Optional[str] = None,
+               branch: Optional[str] = None, depth: int = 0,
+               kind: str = "analysis", **options: Any) -> AnalysisJob:
+        """Start (or join) an analysis and return its job immediately"""
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = AnalysisJob(repo_url, ref, branch, depth, kind, options)
+        active = self._active.get(job.key)
+        if active is not None:
+            active.requests += 1
+            return active
+
+        self._jobs[job.id] = job
+        self._active[job.key] = job
+        job.task = asyncio.create_task(self._run(job))
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: AnalysisJob) -> AnalysisJob:
+        """Wait for a job to finish (shielded, so one waiter leaving does not cancel it)"""
+        if job.task is not None and not job.done:
+            await asyncio.shield(job.task)
+        return job
+
+    async def run(self, repo_url: str, ref: Optional[str] = None) -> Dict[str, Any]:
+        """Submit (or join) an analysis and wait for its result"""
+        job = await self.wait(self.submit(repo_url, ref))
+        if job.status == JobStatus.FAILED:
+            raise RuntimeError(job.error)
+        return job.result
+
+    async def _run(self, job: AnalysisJob):
+        try:
+            async with self._semaphore:
+                job.status = JobStatus.RUNNING
+                job.started_at = time.time()
+                job.result = await self.runners[job.kind](
+                    job.repo_url, job.ref, progress=AnalysisProgress(job.publish),
+                    branch=job.branch, depth=job.depth, **job.options
+                )
+                job.status = JobStatus.COMPLETED
+        except Exception as e:
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            if self._active.get(job.key) is job:
+                del self._active[job.key]
+            # Progress history is only useful while the job runs
+            job.publish(None)
+            job.events = []
+        
+        if job.status == JobStatus.COMPLETED and job.kind == "analysis":
+            for listener in self._listeners:
+                try:
+                    await listener(job)
+                except Exception as e:
+                    print(f"Job listener error: {e}")
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        excess = len(self._jobs) - self.history
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
+                excess -= 1
+
+_manager: Optional[JobManager] = None
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager"""
+    global _manager
+    if _manager is None:
+        _manager = JobManager(settings.max_concurrent_analyses, history=settings.job_history)
+    return _manager
@@ -2,7 +2,8 @@
 API Routes for Repository Starship
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl
 from typing import Dict, Any, List, Optional
 import asyncio
@@ -12,17 +13,44 @@ from analyzers import (
     analyze_dependencies,
     analyze_documentation,
     detect_yagni,
-    analyze_repository
+    analyze_repository,
+    stream_file_records,
+    rule_timings,
+    ANALYZERS
 )
+from analyzers.clones import is_remote_url
+from analyzers.git_corpus import list_commits
+from config import settings
+from storage import get_result_store
+from .analysis import LOCAL_REPOSITORY_REFUSED, repository_allowed
+from .encoding import dumps_json, encode_response, negotiate
+from .jobs import JobStatus, get_job_manager
 
 router = APIRouter()
 
 class RepositoryRequest(BaseModel):
     """Repository analysis request model"""
     repo_url: HttpUrl
-    branch: Optional[str] = "main"
+    # Branch to fetch (default: the remote's HEAD) and commits of history (0 = all)
+    branch: Optional[str] = None
     depth: Optional[int] = 1
     include_tests: Optional[bool] = True
+    # "full", or "sample" for immediate estimates from a sample of files
+    mode: Optional[str] = "full"
+    sample_size: Optional[int] = None
+    # With mode "sample", also start the full analysis in the background
+    refine: Optional[bool] = False
+
+class HistoryRequest(BaseModel):
+    """Metrics trend over a branch's history"""
+    # URL of the repository (or a local path under LOCAL_REPO_ROOTS)
+    repo_url: str
+    branch: Optional[str] = None
+    # Commit to walk back from (default: the tip of branch)
+    ref: Optional[str] = None
+    # Analyze every step-th commit, at most limit of them (capped by HISTORY_MAX_COMMITS)
+    step: Optional[int] = 1
+    limit: Optional[int] = 100
 
 class MetricsResponse(BaseModel):
     """Metrics response model"""
@@ -47,32 +75,121 @@ class ModuleInfo(BaseModel):
     dependencies: List[str]
     issues: List[str]
 
-@router.post("/analyze")
+class ImpactRequest(BaseModel):
+    """Blast-radius query: files about to change"""
+    files: List[str]
+    commit: Optional[str] = None
+    max_depth: Optional[int] = None
+
+def _checked_repo_url(repo_url: str) -> str:
+    """repo_url (stripped) if the API may analyze it (see repository_allowed), else 403"""
+    repo_url = repo_url.strip()
+    if not repository_allowed(repo_url):
+        raise HTTPException(status_code=403, detail=LOCAL_REPOSITORY_REFUSED)
+    return repo_url
+
+def _job_response(job) -> Dict[str, Any]:
+    """Job status with links to poll it"""
+    return {
+        **job.to_dict(),
+        "status_url": f"/api/jobs/{job.id}",
+        "result_url": f"/api/jobs/{job.id}/result"
+    }
+
+@router.post("/analyze", status_code=202)
 async def analyze_repository_endpoint(
     request: RepositoryRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    http_request: Request
 ):
     """
-    Analyze a repository and return metrics
+    Start analyzing a repository and return the job to poll.
+    Concurrent requests for the same repository share one job.
+    With mode "sample", score estimates from a stratified sample of files
+    are returned right away instead, along with the full analysis job
+    refining them when refine is set.
+    The job and its result are encoded as negotiated by the Accept header.
     """
-    try:
-        # Start analysis
-        result = await analyze_repository(
-            str(request.repo_url),
-            branch=request.branch,
-            depth=request.depth
-        )
-        
-        # Return result directly (frontend expects response.data.structure and response.data.metrics)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    media_type = negotiate(http_request)
+    if request.mode not in ("full", "sample"):
+        raise HTTPException(status_code=400, detail=f"Unknown analysis mode: {request.mode}")
+    
+    if request.mode == "sample":
+        try:
+            estimate = await analyze_repository(str(request.repo_url), request.branch, request.depth or 0,
+                                                mode="sample", sample_size=request.sample_size)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        refine_job = None
+        if request.refine:
+            refine_job = _job_response(get_job_manager().submit(
+                str(request.repo_url), branch=request.branch, depth=request.depth or 0
+            ))
+        return encode_response({**estimate, "refine_job": refine_job}, http_request, media_type=media_type)
+    
+    job = get_job_manager().submit(str(request.repo_url), branch=request.branch, depth=request.depth or 0)
+    return encode_response(_job_response(job), http_request, status_code=202, media_type=media_type)
+
+@router.post("/history", status_code=202)
+async def analyze_history_endpoint(request: HistoryRequest, http_request: Request):
+    """
+    Start computing the metrics of every step-th commit of a branch and
+    return the job to poll. Each commit is analyzed incrementally against
+    the previous one, so only changed files are analyzed, and commits with
+    stored metrics are not analyzed again. The series is stored and can be
+    read back from /history/{repo_id}.
+    """
+    step = 1 if request.step is None else request.step
+    limit = settings.history_max_commits if request.limit is None else min(request.limit, settings.history_max_commits)
+    if step < 1 or limit < 1:
+        raise HTTPException(status_code=400, detail="step and limit must be positive")
+    repo_url = _checked_repo_url(request.repo_url)
+    if not is_remote_url(repo_url):
+        # Fail fast on local paths that are not repositories (or lack the ref)
+        try:
+            await asyncio.to_thread(list_commits, repo_url, request.ref or "HEAD", 1, 1)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    job = get_job_manager().submit(repo_url, request.ref, branch=request.branch,
+                                   kind="history", step=step, limit=limit)
+    return encode_response(_job_response(job), http_request, status_code=202)
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    Get the status of an analysis job
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return _job_response(job)
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, request: Request):
+    """
+    Get the result of a finished analysis job (202 while it is still running).
+    The result is sent as JSON, MessagePack or columnar JSON/MessagePack
+    depending on the Accept header.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != JobStatus.COMPLETED:
+        return JSONResponse(status_code=202, content=_job_response(job))
+    
+    # Return result directly (frontend expects response.data.structure and response.data.metrics)
+    return encode_response(job.result, request)
 
 @router.get("/analyze/local")
-async def analyze_local_repository():
+async def analyze_local_repository(request: Request):
     """
-    Analyze the local repository (backend directory)
+    Analyze the local repository (backend directory), in the format named by the Accept header
     """
+    # Refuse unsupported formats before doing any work
+    media_type = negotiate(request)
     try:
         import os
         from pathlib import Path
@@ -80,76 +197,136 @@ async def analyze_local_repository():
         # Get the backend directory path
         backend_path = Path(__file__).parent.parent
         
-        result = await analyze_repository(str(backend_path))
-        return result
+        result = await get_job_manager().run(str(backend_path))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return encode_response(result, request, media_type=media_type)
+
+@router.get("/analyze/stream")
+async def stream_analysis(
+    repo_url: str = Query(..., description="URL of the repository (or a local path under LOCAL_REPO_ROOTS)"),
+    analyzers: Optional[str] = Query(None, description="Comma-separated analyzer names (default: all)")
+):
+    """
+    Stream per-file analyzer records as NDJSON, one line per file as soon as it
+    has been analyzed, then a summary line. Memory use does not grow with the
+    repository size. The stream takes one of the job manager's analysis slots
+    and is subject to the analysis budget.
+    """
+    repo_url = _checked_repo_url(repo_url)
+    names = None
+    if analyzers:
+        names = [name.strip() for name in analyzers.split(",") if name.strip()]
+        unknown = set(names) - {analyzer_class.NAME for analyzer_class in ANALYZERS}
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown analyzers: {', '.join(sorted(unknown))}")
+    
+    async def lines():
+        async with get_job_manager().slot():
+            async for record in stream_file_records(repo_url, names):
+                yield dumps_json(record) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def _stored_result(repo_id: str, commit: Optional[str]) -> Dict[str, Any]:
+    """Stored analysis for a repository (latest, or for a specific commit)"""
+    store = get_result_store()
+    entry = await asyncio.to_thread(store.get, repo_id, commit)
+    if entry is None:
+        detail = f"No analysis stored for repository {repo_id}"
+        if commit:
+            detail += f" at commit {commit}"
+        raise HTTPException(status_code=404, detail=detail)
+    return entry
 
 @router.get("/metrics/{repo_id}")
-async def get_repository_metrics(repo_id: str):
+async def get_repository_metrics(repo_id: str, commit: Optional[str] = Query(None)):
     """
-    Get cached metrics for a repository
+    Get stored metrics for a repository
     """
-    # TODO: Implement cache lookup
+    entry = await _stored_result(repo_id, commit)
     return {
         "repo_id": repo_id,
-        "metrics": {
-            "complexity": 72.5,
-            "coverage": 87.3,
-            "documentation": 65.0,
-            "yagni": 28.4,
-            "dependencies": 143,
-            "tech_debt": 34.2,
-            "vulnerabilities": {
-                "critical": 0,
-                "high": 1,
-                "medium": 3,
-                "low": 7
-            }
-        }
+        "commit": entry["commit"],
+        "analyzed_at": entry["analyzed_at"],
+        "metrics": entry["result"].get("metrics", {})
     }
 
 @router.get("/modules/{repo_id}")
-async def get_repository_modules(repo_id: str):
-    """
-    Get module structure for a repository
-    """
-    # TODO: Implement actual module analysis
-    modules = [
-        {
-            "id": "core",
-            "name": "core",
-            "path": "/src/core",
-            "size": 15000,
-            "health": 0.9,
-            "x": 0, "y": 0, "z": 0,
-            "type": "core"
-        },
-        {
-            "id": "auth",
-            "name": "authentication",
-            "path": "/src/auth",
-            "size": 8000,
-            "health": 0.7,
-            "x": -3, "y": 2, "z": 1,
-            "type": "module"
-        },
-        {
-            "id": "api",
-            "name": "api",
-            "path": "/src/api",
-            "size": 12000,
-            "health": 0.6,
-            "x": 3, "y": 1, "z": -1,
-            "type": "module"
-        }
-    ]
-    
+async def get_repository_modules(repo_id: str, commit: Optional[str] = Query(None)):
+    """
+    Get stored module structure for a repository
+    """
+    entry = await _stored_result(repo_id, commit)
+    return {
+        "repo_id": repo_id,
+        "commit": entry["commit"],
+        "analyzed_at": entry["analyzed_at"],
+        "modules": entry["result"].get("structure", [])
+    }
+
+@router.get("/history/{repo_id}")
+async def get_repository_history(repo_id: str, request: Request,
+                                 branch: Optional[str] = Query(None, description="Branch or ref the series was computed for")):
+    """
+    Get the stored metrics series of a repository's history, oldest commit first
+    """
+    series = await asyncio.to_thread(get_result_store().history, repo_id, branch or "")
+    if series is None:
+        raise HTTPException(status_code=404, detail=f"No history stored for repository {repo_id}")
+    return encode_response(series, request)
+
+async def _stored_index(repo_id: str, commit: Optional[str]):
+    """Stored analysis and its dependency index"""
+    entry = await _stored_result(repo_id, commit)
+    index = await asyncio.to_thread(get_result_store().dependency_index, repo_id, entry["commit"])
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"No dependency index stored for repository {repo_id}")
+    return entry, index
+
+@router.get("/dependencies/{repo_id}/importers")
+async def get_module_importers(
+    repo_id: str,
+    module: str = Query(..., description="File path or dotted module name"),
+    transitive: bool = Query(True),
+    commit: Optional[str] = Query(None)
+):
+    """
+    Files that import a module, directly or transitively, from the stored dependency index
+    """
+    entry, index = await _stored_index(repo_id, commit)
+    matches = index.lookup(module)
+    if not matches:
+        raise HTTPException(status_code=404, detail=f"Unknown module {module}")
+    importers = index.importers(matches, transitive=transitive)
     return {
         "repo_id": repo_id,
-        "modules": modules
+        "commit": entry["commit"],
+        "module": module,
+        "files": matches,
+        "importers": [{"file": path, "distance": distance} for path, distance in importers],
+        "count": len(importers)
     }
 
+@router.post("/dependencies/{repo_id}/impact")
+async def get_change_impact(repo_id: str, request: ImpactRequest):
+    """
+    Blast radius of changing files: every file that (transitively) imports them
+    """
+    entry, index = await _stored_index(repo_id, request.commit)
+    return {
+        "repo_id": repo_id,
+        "commit": entry["commit"],
+        **index.blast_radius(request.files, max_depth=request.max_depth)
+    }
+
+@router.get("/stats/rules")
+async def get_rule_timings():
+    """
+    Files, nodes and time spent per AST rule since the server started
+    """
+    return {"rules": rule_timings()}
+
 @router.get("/health")
 async def health_check():
     """
@@ -171,8 +348,11 @@ async def github_webhook(payload: Dict[str, Any]):
     if event_type == "push":
         # Trigger re-analysis on push
         repo_url = payload.get("repository", {}).get("clone_url")
+        ref = payload.get("ref") or ""
+        branch = ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else None
         if repo_url:
-            # Queue analysis task
-            asyncio.create_task(analyze_repository(repo_url))
+            # Queue analysis job for the pushed branch (a forged payload
+            # cannot point it at the server's own files)
+            get_job_manager().submit(_checked_repo_url(repo_url), branch=branch, depth=1)
     
     return {"status": "received"}
\ No newline at end of file
@@ -2,71 +2,225 @@
 WebSocket manager for real-time updates
 """
 
-from typing import List, Dict, Any
+from collections import deque
+from typing import Deque, List, Dict, Any, Optional
 from fastapi import WebSocket
 import json
 import asyncio
 
+from config import settings
+from .deltas import DeltaEncoder
+
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+class _Connection:
+    """
+    One client: a bounded queue of encoded messages drained by its own writer
+    task, so a slow client only ever delays itself.
+
+    Each queued entry is a [key, text] pair; with the "coalesce" policy a new
+    message with the same key (e.g. "metrics_update") replaces the queued one
+    instead of taking another slot.
+    """
+
+    def __init__(self, websocket: WebSocket, max_queue: int, policy: str, deltas: bool = False):
+        self.websocket = websocket
+        # Whether the client applies metrics/structure deltas (else it gets full updates)
+        self.deltas = deltas
+        self.max_queue = max_queue
+        self.policy = policy
+        self.connected_at = asyncio.get_running_loop().time()
+        self.dropped = 0
+        self.closed = False
+        self.queue: Deque[List[Optional[str]]] = deque()
+        self.keyed: Dict[str, List[Optional[str]]] = {}
+        self.has_messages = asyncio.Event()
+        self.has_space = asyncio.Event()
+        self.has_space.set()
+        self.writer: Optional[asyncio.Task] = None
+
+    def offer(self, text: str, key: Optional[str] = None) -> bool:
+        """Queue a message without waiting; False means the client overflowed and must be dropped"""
+        if self.closed:
+            return True
+
+        if key is not None and self.policy == "coalesce":
+            entry = self.keyed.get(key)
+            if entry is not None:
+                entry[1] = text
+                return True
+
+        if len(self.queue) >= self.max_queue:
+            if self.policy == "disconnect":
+                return False
+            self._forget(self.queue.popleft())
+            self.dropped += 1
+
+        self._append(text, key)
+        return True
+
+    async def put(self, text: str):
+        """Queue a message, waiting for room rather than dropping anything"""
+        while len(self.queue) >= self.max_queue and not self.closed:
+            self.has_space.clear()
+            await self.has_space.wait()
+        if not self.closed:
+            self._append(text, None)
+
+    def _forget(self, entry: List[Optional[str]]):
+        if entry[0] is not None and self.keyed.get(entry[0]) is entry:
+            del self.keyed[entry[0]]
+
+    def _append(self, text: str, key: Optional[str]):
+        entry = [key, text]
+        self.queue.append(entry)
+        if key is not None and self.policy == "coalesce":
+            self.keyed[key] = entry
+        self.has_messages.set()
+
+    async def write_loop(self):
+        """Send queued messages in order until the connection fails or is closed"""
+        while not self.closed:
+            if not self.queue:
+                self.has_messages.clear()
+                await self.has_messages.wait()
+                continue
+
+            entry = self.queue.popleft()
+            self._forget(entry)
+            self.has_space.set()
+            await self.websocket.send_text(entry[1])
+
+    def close(self):
+        self.closed = True
+        self.queue.clear()
+        self.keyed.clear()
+        # Release anyone waiting in put()
+        self.has_space.set()
+        if self.writer is not None and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
 class WebSocketManager:
-    """Manage WebSocket connections"""
-    
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.connection_data: Dict[WebSocket, Dict[str, Any]] = {}
-    
+    """
+    Manage WebSocket connections.
+
+    Messages are encoded once and placed on every client's bounded send queue;
+    each client has a writer task, so broadcasting never waits on the network.
+    When a client's queue is full the overflow policy applies: "drop_oldest"
+    discards its oldest queued message, "coalesce" additionally keeps only the
+    latest metrics/structure update, and "disconnect" closes the client.
+    Connections whose sends fail are removed automatically.
+
+    Metrics and structure updates are delta-encoded per repository topic
+    (see DeltaEncoder) for clients that opt in by connecting with
+    ?deltas=1; they ask for a resync when they miss a sequence number.
+    Every other client gets each update in full.
+    """
+
+    def __init__(self, max_queue: Optional[int] = None, overflow_policy: Optional[str] = None):
+        self.max_queue = max_queue or settings.ws_send_queue_size
+        self.overflow_policy = overflow_policy or settings.ws_overflow_policy
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown WebSocket overflow policy: {self.overflow_policy}")
+        self.connections: Dict[WebSocket, _Connection] = {}
+        self.deltas = DeltaEncoder(settings.ws_keyframe_interval)
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.connections)
+
     async def connect(self, websocket: WebSocket):
         """Accept and store a new WebSocket connection"""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        self.connection_data[websocket] = {
-            "connected_at": asyncio.get_event_loop().time()
-        }
-        print(f"Client connected. Total connections: {len(self.active_connections)}")
-    
+        deltas = websocket.query_params.get("deltas", "").lower() in ("1", "true", "yes")
+        connection = _Connection(websocket, self.max_queue, self.overflow_policy, deltas)
+        connection.writer = asyncio.create_task(self._write(connection))
+        self.connections[websocket] = connection
+        print(f"Client connected. Total connections: {len(self.connections)}")
+
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if websocket in self.connection_data:
-            del self.connection_data[websocket]
-        print(f"Client disconnected. Total connections: {len(self.active_connections)}")
-    
+        connection = self.connections.pop(websocket, None)
+        if connection is None:
+            return
+        connection.close()
+        print(f"Client disconnected. Total connections: {len(self.connections)}")
+
+    async def _write(self, connection: _Connection):
+        try:
+            await connection.write_loop()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Connection is gone; stop queueing for it
+            self.disconnect(connection.websocket)
+
+    def _overflowed(self, connection: _Connection):
+        """Close a client that cannot keep up (the "disconnect" policy)"""
+        self.disconnect(connection.websocket)
+        asyncio.create_task(self._close_quietly(connection.websocket))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            await websocket.close(code=1013)  # try again later
+        except Exception:
+            pass
+
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        """Send a message to a specific client"""
-        await websocket.send_text(message)
-    
+        """Send a message to a specific client, waiting while its queue is full"""
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            await connection.put(message)
+
     async def send_personal_json(self, data: Dict[str, Any], websocket: WebSocket):
         """Send JSON data to a specific client"""
-        await websocket.send_json(data)
-    
-    async def broadcast(self, message: str):
+        await self.send_personal_message(encode_json(data), websocket)
+
+    async def broadcast(self, message: str, key: Optional[str] = None):
         """Broadcast a message to all connected clients"""
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                # Connection might be closed
-                pass
-    
-    async def broadcast_json(self, data: Dict[str, Any]):
-        """Broadcast JSON data to all connected clients"""
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(data)
-            except:
-                # Connection might be closed
-                pass
-    
-    async def broadcast_metrics_update(self, metrics: Dict[str, Any]):
-        """Broadcast metrics update to all clients"""
-        await self.broadcast_json({
-            "type": "metrics_update",
-            "data": metrics
-        })
-    
-    async def broadcast_structure_update(self, structure: List[Dict[str, Any]]):
-        """Broadcast repository structure update to all clients"""
-        await self.broadcast_json({
-            "type": "structure_update",
-            "data": structure
-        })
\ No newline at end of file
+        for connection in list(self.connections.values()):
+            if not connection.offer(message, key):
+                self._overflowed(connection)
+
+    async def broadcast_json(self, data: Dict[str, Any], key: Optional[str] = None):
+        """Broadcast JSON data to all connected clients (encoded once)"""
+        await self.broadcast(encode_json(data), key)
+
+    async def _broadcast_update(self, kind: str, topic: str, data: Any):
+        message = self.deltas.encode(kind, topic, data)
+        if message is None:
+            return
+        # A newer full update may replace a queued one; deltas must never be merged
+        key = f"{kind}_update:{topic}"
+        delta_text = encode_json(message)
+        full_text = delta_text if message.get("keyframe") else None
+        for connection in list(self.connections.values()):
+            if connection.deltas:
+                text, text_key = delta_text, key if message.get("keyframe") else None
+            else:
+                if full_text is None:
+                    full_text = encode_json({"type": f"{kind}_update", "topic": topic, "seq": message["seq"],
+                                             "keyframe": True, "data": data})
+                text, text_key = full_text, key
+            if not connection.offer(text, text_key):
+                self._overflowed(connection)
+
+    async def broadcast_metrics_update(self, metrics: Dict[str, Any], topic: str = "default"):
+        """Broadcast metrics update (or only the changed fields) to all clients"""
+        await self._broadcast_update("metrics", topic, metrics)
+
+    async def broadcast_structure_update(self, structure: List[Dict[str, Any]], topic: str = "default"):
+        """Broadcast repository structure update (or only the changed modules) to all clients"""
+        await self._broadcast_update("structure", topic, structure)
+
+    async def send_keyframes(self, topic: str, websocket: WebSocket):
+        """Send a client the latest full metrics and structure of a topic"""
+        for kind in ("metrics", "structure"):
+            message = self.deltas.keyframe(kind, topic)
+            if message is not None:
+                await self.send_personal_json(message, websocket)
+
+def encode_json(data: Dict[str, Any]) -> str:
+    """Encode a message the same way WebSocket.send_json does"""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,95 @@
+"""
+Application settings
+Values are read from environment variables (and backend/.env when present)
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _get_int(name: str, default: int) -> int:
+    """Read an integer setting, falling back to default when unset or invalid"""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+def _get_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting ("true"/"1"/"yes"/"on" are true)"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def _get_list(name: str, default: str) -> list:
+    """Read a comma-separated setting (empty items dropped)"""
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+class Settings:
+    """Runtime configuration for the backend"""
+
+    def __init__(self):
+        # Analysis execution
+        self.analysis_executor = os.getenv("ANALYSIS_EXECUTOR", "process").lower()
+        self.analysis_workers = _get_int("ANALYSIS_WORKERS", 0) or os.cpu_count() or 1
+        # Repositories with more files than this keep per-file records on disk (0 = never)
+        self.analysis_spill_records = _get_int("ANALYSIS_SPILL_RECORDS", 20000)
+
+        # File discovery: directory name patterns never descended into, and
+        # whether to list files from the git index when the target is a repository
+        self.discovery_excludes = _get_list(
+            "DISCOVERY_EXCLUDES",
+            ".git,.hg,.svn,node_modules,__pycache__,.venv,.tox,.nox,.mypy_cache,.pytest_cache,.eggs,site-packages"
+        )
+        self.discovery_use_git = _get_bool("DISCOVERY_USE_GIT", True)
+        # Count generated, vendored and minified files without analyzing them
+        self.analysis_skip_generated = _get_bool("ANALYSIS_SKIP_GENERATED", True)
+        self.vendor_directories = _get_list(
+            "VENDOR_DIRECTORIES", "vendor,vendored,_vendor,third_party,thirdparty,3rdparty"
+        )
+
+        # Directories under which the API may analyze local paths (and file://
+        # URLs); none by default, so only remote repositories are accepted
+        self.local_repo_roots = _get_list("LOCAL_REPO_ROOTS", "")
+
+        # Analysis limits (0 = unlimited)
+        self.max_file_size_mb = _get_int("MAX_FILE_SIZE_MB", 10)
+        # A file cap makes every larger repository partial, and partial
+        # snapshots cannot be incremental bases; the size cutoff and the
+        # deadline are the usual safety valves
+        self.max_files_to_analyze = _get_int("MAX_FILES_TO_ANALYZE", 0)
+        self.analysis_timeout_seconds = _get_int("ANALYSIS_TIMEOUT_SECONDS", 300)
+        # Per-file limit enforced in worker processes (the thread executor has none)
+        self.analysis_file_timeout_seconds = _get_int("ANALYSIS_FILE_TIMEOUT_SECONDS", 30)
+        # Files analyzed for a mode=sample estimate
+        self.analysis_sample_size = _get_int("ANALYSIS_SAMPLE_SIZE", 200)
+        # Most commits one history request analyzes
+        self.history_max_commits = _get_int("HISTORY_MAX_COMMITS", 1000)
+
+        # Persistent caches
+        self.enable_cache = _get_bool("ENABLE_CACHE", True)
+        self.cache_ttl_seconds = _get_int("CACHE_TTL_SECONDS", 3600)
+        self.cache_dir = os.getenv("CACHE_DIR", ".starship")
+        self.cache_max_size_mb = _get_int("CACHE_MAX_SIZE_MB", 512)
+
+        # Remote repositories: bare mirrors and worktrees kept in CACHE_DIR/repos,
+        # fetched with a partial clone filter ("" fetches every blob up front)
+        self.clone_cache_max_size_mb = _get_int("CLONE_CACHE_MAX_SIZE_MB", 2048)
+        self.clone_filter = os.getenv("CLONE_FILTER", "blob:none")
+        self.clone_timeout_seconds = _get_int("CLONE_TIMEOUT_SECONDS", 600)
+
+        # Stored analysis results (kept in CACHE_DIR)
+        self.result_store_memory_entries = _get_int("RESULT_STORE_MEMORY_ENTRIES", 64)
+        self.result_store_snapshots = _get_int("RESULT_STORE_SNAPSHOTS", 5)
+
+        # Background analysis jobs
+        self.max_concurrent_analyses = _get_int("MAX_CONCURRENT_ANALYSES", 2)
+        self.job_history = _get_int("JOB_HISTORY", 1000)
+
+        # WebSocket fan-out
+        self.ws_send_queue_size = _get_int("WS_SEND_QUEUE_SIZE", 256)
+        self.ws_overflow_policy = os.getenv("WS_OVERFLOW_POLICY", "coalesce").lower()
+        self.ws_keyframe_interval = _get_int("WS_KEYFRAME_INTERVAL", 20)
+
+settings = Settings()
@@ -12,7 +12,9 @@ from typing import Dict, Any
 
 from api.routes import router as api_router
 from api.websocket import WebSocketManager
-from analyzers import analyze_repository
+from api.analysis import LOCAL_REPOSITORY_REFUSED, repository_allowed
+from api.jobs import JobStatus, get_job_manager
+from analyzers.executor import get_executor, shutdown_executor
 
 # WebSocket manager instance
 manager = WebSocketManager()
@@ -21,8 +23,13 @@ manager = WebSocketManager()
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
     print("🚀 Starship Repository Backend Starting...")
+    # Warm up analysis workers so the first request does not pay for them
+    get_executor().start()
+    # Every finished analysis updates the dashboards watching that repository
+    get_job_manager().add_listener(publish_result)
     yield
     print("👋 Starship Repository Backend Shutting Down...")
+    shutdown_executor()
 
 # Create FastAPI app
 app = FastAPI(
@@ -55,7 +62,7 @@ async def root():
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time updates"""
+    """WebSocket endpoint for real-time updates (connect with ?deltas=1 to receive metrics/structure deltas)"""
     await manager.connect(websocket)
     try:
         while True:
@@ -72,37 +79,68 @@ async def websocket_endpoint(websocket: WebSocket):
                         analyze_and_broadcast(repo_url, websocket)
                     )
             
+            elif message.get("type") == "resync":
+                # Client missed a delta; send the full state of the repository
+                topic = message.get("topic")
+                if topic:
+                    await manager.send_keyframes(topic, websocket)
+            
             elif message.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
+                await manager.send_personal_json({"type": "pong"}, websocket)
                 
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
         manager.disconnect(websocket)
 
+async def publish_result(job):
+    """Broadcast a finished analysis as metrics and structure updates on its repository topic"""
+    await manager.broadcast_metrics_update(job.result["metrics"], topic=job.repo_id)
+    await manager.broadcast_structure_update(job.result["structure"], topic=job.repo_id)
+
 async def analyze_and_broadcast(repo_url: str, websocket: WebSocket):
-    """Analyze repository and broadcast updates"""
+    """Analyze repository and stream progress, then the result, to the client"""
     try:
+        if not repository_allowed(repo_url):
+            raise PermissionError(LOCAL_REPOSITORY_REFUSED)
+        
+        # Tabs asking for the same repository share one analysis job
+        jobs = get_job_manager()
+        job = jobs.submit(repo_url)
+        
         # Send initial status
-        await websocket.send_json({
+        await manager.send_personal_json({
             "type": "status",
-            "message": "Starting analysis..."
-        })
+            "message": "Starting analysis...",
+            "job_id": job.id
+        }, websocket)
+        
+        # Forward discovery, per-file and per-module events as they happen
+        events = job.subscribe()
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                await manager.send_personal_json(event, websocket)
+        finally:
+            job.unsubscribe(events)
         
-        # Perform analysis (this would be your actual analysis logic)
-        result = await analyze_repository(repo_url)
+        await jobs.wait(job)
+        if job.status == JobStatus.FAILED:
+            raise RuntimeError(job.error)
         
         # Send results
-        await websocket.send_json({
+        await manager.send_personal_json({
             "type": "analysis_complete",
-            "data": result
-        })
+            "data": job.result
+        }, websocket)
         
     except Exception as e:
-        await websocket.send_json({
+        await manager.send_personal_json({
             "type": "error",
             "message": str(e)
-        })
+        }, websocket)
 
 if __name__ == "__main__":
     import uvicorn
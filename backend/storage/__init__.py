@@ -0,0 +1,5 @@
+"""Persistence for Repository Starship analysis results"""
+
+from .results import ResultStore, get_result_store, repo_id_for
+
+__all__ = ["ResultStore", "get_result_store", "repo_id_for"]
@@ -0,0 +1,459 @@
+"""
+Result Store
+Analysis results per repository and commit: an in-memory LRU in front of SQLite
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import ItemsView, Mapping
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from config import settings
+from analyzers.clones import REMOTE_PREFIXES
+from analyzers.dependency_index import DependencyIndex
+from analyzers.snapshot import AnalysisSnapshot
+from analyzers.symbols import SymbolIndex
+
+# Repositories whose latest symbol index is kept in memory for the next incremental run
+SYMBOL_INDEX_ENTRIES = 8
+
+# Per-file records written per database transaction; readers get the lock in between
+RECORD_BATCH_SIZE = 500
+
+def repo_id_for(repo_url: str) -> str:
+    """Stable identifier for a repository location (local path or remote URL)"""
+    location = repo_url.strip()
+    if location.startswith(REMOTE_PREFIXES):
+        location = location.rstrip("/")
+        if location.endswith(".git"):
+            location = location[:-4]
+        if location.startswith("git@"):
+            # git@host:owner/name -> host/owner/name
+            location = location[4:].replace(":", "/", 1)
+        else:
+            location = location.split("://", 1)[1]
+            location = location.split("@", 1)[-1]  # drop credentials
+        location = location.lower()
+    else:
+        location = os.path.realpath(location)
+    return hashlib.sha1(location.encode("utf-8")).hexdigest()[:16]
+
+class _StoredRecordItems(ItemsView):
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return self._mapping.rows()
+
+class StoredRecords(Mapping):
+    """
+    One analyzer's per-file records of a stored snapshot, read from SQLite
+    on access instead of loaded up front. Iteration is in path order, a
+    page of rows at a time.
+    """
+
+    PAGE_SIZE = 500
+
+    def __init__(self, store: "ResultStore", repo_id: str, commit: str, analyzer: str):
+        self._store = store
+        self._key = (repo_id, commit, analyzer)
+
+    def __getitem__(self, path: str) -> Dict[str, Any]:
+        with self._store._lock:
+            row = self._store._conn.execute(
+                "SELECT record FROM snapshot_records "
+                "WHERE repo_id = ? AND commit_sha = ? AND analyzer = ? AND path = ?",
+                (*self._key, path)
+            ).fetchone()
+        if row is None:
+            raise KeyError(path)
+        return json.loads(zlib.decompress(row[0]))
+
+    def rows(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(path, record) pairs in path order"""
+        last = ""
+        while True:
+            with self._store._lock:
+                page = self._store._conn.execute(
+                    "SELECT path, record FROM snapshot_records "
+                    "WHERE repo_id = ? AND commit_sha = ? AND analyzer = ? AND path > ? "
+                    "ORDER BY path LIMIT ?",
+                    (*self._key, last, self.PAGE_SIZE)
+                ).fetchall()
+            for path, record in page:
+                yield path, json.loads(zlib.decompress(record))
+            if len(page) < self.PAGE_SIZE:
+                return
+            last = page[-1][0]
+
+    def items(self) -> ItemsView:
+        return _StoredRecordItems(self)
+
+    def __iter__(self) -> Iterator[str]:
+        return (path for path, _record in self.rows())
+
+    def __len__(self) -> int:
+        with self._store._lock:
+            return self._store._conn.execute(
+                "SELECT COUNT(*) FROM snapshot_records WHERE repo_id = ? AND commit_sha = ? AND analyzer = ?",
+                self._key
+            ).fetchone()[0]
+
+class ResultStore:
+    """
+    Stores the aggregated result of every analysis keyed by (repo_id, commit),
+    plus the full per-file snapshot of the most recent analyses so later runs
+    can be incremental (per-file records are stored one row each and read
+    back lazily, and written in batches). Reads of the latest result are
+    served from memory, without waiting for the database.
+    Every analysis also keeps its dependency index for impact queries.
+    The symbol index of each repository's latest analysis is kept in memory,
+    so the next incremental run only updates it.
+    Metrics series over a repository's history are kept per commit.
+    """
+
+    def __init__(self, path: str, memory_entries: int = 64, snapshots_per_repo: int = 5):
+        self.path = Path(path)
+        self.memory_entries = memory_entries
+        self.snapshots_per_repo = snapshots_per_repo
+        self._memory: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._indexes: "OrderedDict[tuple, DependencyIndex]" = OrderedDict()
+        self._symbols: "OrderedDict[str, Tuple[str, SymbolIndex]]" = OrderedDict()
+        # The memory tier and the database are locked separately, so memory
+        # hits never wait behind a large save
+        self._memory_lock = threading.Lock()
+        self._lock = threading.Lock()
+        # (repo_id, commit) of snapshots whose records are being written
+        self._writing: Set[Tuple[str, str]] = set()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                repo_id TEXT NOT NULL,
+                commit_sha TEXT NOT NULL,
+                repo_url TEXT NOT NULL,
+                analyzed_at REAL NOT NULL,
+                result BLOB NOT NULL,
+                snapshot BLOB,
+                PRIMARY KEY (repo_id, commit_sha)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS analyses_latest ON analyses (repo_id, analyzed_at)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshot_records (
+                repo_id TEXT NOT NULL,
+                commit_sha TEXT NOT NULL,
+                analyzer TEXT NOT NULL,
+                path TEXT NOT NULL,
+                record BLOB NOT NULL,
+                PRIMARY KEY (repo_id, commit_sha, analyzer, path)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS dependency_indexes (
+                repo_id TEXT NOT NULL,
+                commit_sha TEXT NOT NULL,
+                dependency_index BLOB NOT NULL,
+                PRIMARY KEY (repo_id, commit_sha)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS history_points (
+                repo_id TEXT NOT NULL,
+                commit_sha TEXT NOT NULL,
+                point BLOB NOT NULL,
+                PRIMARY KEY (repo_id, commit_sha)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS history_series (
+                repo_id TEXT NOT NULL,
+                series TEXT NOT NULL,
+                repo_url TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                commits BLOB NOT NULL,
+                PRIMARY KEY (repo_id, series)
+            )
+        """)
+        self._conn.commit()
+
+    # Memory tier
+
+    def _remember(self, key: tuple, entry: Dict[str, Any]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _recall(self, key: tuple) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+        return entry
+
+    def _remember_index(self, key: tuple, index: DependencyIndex):
+        self._indexes[key] = index
+        self._indexes.move_to_end(key)
+        while len(self._indexes) > self.memory_entries:
+            self._indexes.popitem(last=False)
+
+    def _remember_symbols(self, repo_id: str, commit: str, symbols: SymbolIndex):
+        self._symbols[repo_id] = (commit, symbols)
+        self._symbols.move_to_end(repo_id)
+        while len(self._symbols) > SYMBOL_INDEX_ENTRIES:
+            self._symbols.popitem(last=False)
+
+    @staticmethod
+    def _record_rows(repo_id: str, commit: str, snapshot: AnalysisSnapshot) -> Iterator[tuple]:
+        """Rows of snapshot_records, one compressed record at a time (records may live on disk)"""
+        for analyzer, records in snapshot.records.items():
+            for path, record in records.items():
+                payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+                yield repo_id, commit, analyzer, path, zlib.compress(payload)
+
+    # Public API
+
+    def save(self, repo_id: str, repo_url: str, snapshot: AnalysisSnapshot) -> Dict[str, Any]:
+        """Persist an analysis and make it the latest result for the repository"""
+        commit = snapshot.commit or ""
+        entry = {
+            "repo_id": repo_id,
+            "repo_url": repo_url,
+            "commit": snapshot.commit,
+            "analyzed_at": time.time(),
+            "result": snapshot.result
+        }
+        result_blob = json.dumps(snapshot.result, separators=(",", ":")).encode("utf-8")
+        snapshot_blob = zlib.compress(json.dumps(snapshot.header(), separators=(",", ":")).encode("utf-8"))
+        index_blob = None
+        if snapshot.index is not None:
+            index_blob = zlib.compress(
+                json.dumps(snapshot.index.to_dict(), separators=(",", ":")).encode("utf-8")
+            )
+
+        key = (repo_id, commit)
+        with self._lock:
+            # A snapshot of the same commit stops being a base until this one is complete
+            self._writing.add(key)
+            self._conn.execute(
+                "UPDATE analyses SET snapshot = NULL WHERE repo_id = ? AND commit_sha = ?", key
+            )
+            self._conn.execute(
+                "DELETE FROM snapshot_records WHERE repo_id = ? AND commit_sha = ?", key
+            )
+            self._conn.commit()
+        try:
+            # Records are compressed outside the lock and written a batch at a time
+            rows = self._record_rows(repo_id, commit, snapshot)
+            while True:
+                batch = list(islice(rows, RECORD_BATCH_SIZE))
+                if not batch:
+                    break
+                with self._lock:
+                    self._conn.executemany(
+                        "INSERT INTO snapshot_records (repo_id, commit_sha, analyzer, path, record) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        batch
+                    )
+                    self._conn.commit()
+
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO analyses "
+                    "(repo_id, commit_sha, repo_url, analyzed_at, result, snapshot) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (repo_id, commit, repo_url, entry["analyzed_at"], result_blob, snapshot_blob)
+                )
+                # Keep full snapshots only for the most recent analyses of the repo
+                self._conn.execute(
+                    "UPDATE analyses SET snapshot = NULL WHERE repo_id = ? AND snapshot IS NOT NULL "
+                    "AND commit_sha NOT IN (SELECT commit_sha FROM analyses WHERE repo_id = ? "
+                    "ORDER BY analyzed_at DESC LIMIT ?)",
+                    (repo_id, repo_id, self.snapshots_per_repo)
+                )
+                # Records of other snapshots still being written are left alone
+                writing = [other for other_repo, other in self._writing if other_repo == repo_id and other != commit]
+                self._conn.execute(
+                    f"DELETE FROM snapshot_records WHERE repo_id = ? AND commit_sha NOT IN "
+                    f"(SELECT commit_sha FROM analyses WHERE repo_id = ? AND snapshot IS NOT NULL) "
+                    f"AND commit_sha NOT IN ({','.join('?' * len(writing))})",
+                    (repo_id, repo_id, *writing)
+                )
+                if index_blob is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO dependency_indexes (repo_id, commit_sha, dependency_index) "
+                        "VALUES (?, ?, ?)",
+                        (repo_id, commit, index_blob)
+                    )
+                self._conn.commit()
+        finally:
+            with self._lock:
+                self._writing.discard(key)
+
+        with self._memory_lock:
+            if snapshot.index is not None:
+                self._remember_index(key, snapshot.index)
+            if snapshot.symbols is not None and snapshot.commit:
+                self._remember_symbols(repo_id, commit, snapshot.symbols)
+            self._remember(key, entry)
+            self._remember((repo_id, None), entry)
+
+        return entry
+
+    def get(self, repo_id: str, commit: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Stored result for a commit, or the latest one when commit is None"""
+        key = (repo_id, commit)
+        with self._memory_lock:
+            entry = self._recall(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            if commit is None:
+                row = self._conn.execute(
+                    "SELECT repo_url, commit_sha, analyzed_at, result FROM analyses "
+                    "WHERE repo_id = ? ORDER BY analyzed_at DESC LIMIT 1",
+                    (repo_id,)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT repo_url, commit_sha, analyzed_at, result FROM analyses "
+                    "WHERE repo_id = ? AND commit_sha = ?",
+                    (repo_id, commit)
+                ).fetchone()
+        if row is None:
+            return None
+
+        repo_url, commit_sha, analyzed_at, result_blob = row
+        entry = {
+            "repo_id": repo_id,
+            "repo_url": repo_url,
+            "commit": commit_sha or None,
+            "analyzed_at": analyzed_at,
+            "result": json.loads(result_blob)
+        }
+        with self._memory_lock:
+            self._remember(key, entry)
+        return entry
+
+    def dependency_index(self, repo_id: str, commit: Optional[str]) -> Optional[DependencyIndex]:
+        """Dependency index of the analysis of a commit (None for an uncommitted working tree)"""
+        key = (repo_id, commit or "")
+        with self._memory_lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT dependency_index FROM dependency_indexes WHERE repo_id = ? AND commit_sha = ?",
+                key
+            ).fetchone()
+        if row is None:
+            return None
+        index = DependencyIndex.from_dict(json.loads(zlib.decompress(row[0])))
+        with self._memory_lock:
+            self._remember_index(key, index)
+        return index
+
+    def latest_snapshot(self, repo_id: str) -> Optional[AnalysisSnapshot]:
+        """
+        Most recent full snapshot of a repository, used as an incremental
+        base; its per-file records are read from the database as they are used
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT commit_sha, snapshot FROM analyses WHERE repo_id = ? AND snapshot IS NOT NULL "
+                "ORDER BY analyzed_at DESC LIMIT 1",
+                (repo_id,)
+            ).fetchone()
+        with self._memory_lock:
+            remembered = self._symbols.get(repo_id)
+        if row is None:
+            return None
+        data = json.loads(zlib.decompress(row[1]))
+        snapshot = AnalysisSnapshot.from_dict(data)
+        if "records" not in data:
+            snapshot.records = {name: StoredRecords(self, repo_id, row[0], name) for name in snapshot.versions}
+        if remembered is not None and remembered[0] == row[0]:
+            snapshot.symbols = remembered[1]
+        return snapshot
+
+    def history_points(self, repo_id: str) -> Dict[str, Dict[str, Any]]:
+        """Every stored per-commit history point of a repository, by commit"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT commit_sha, point FROM history_points WHERE repo_id = ?", (repo_id,)
+            ).fetchall()
+        return {commit: json.loads(point) for commit, point in rows}
+
+    def save_history(self, repo_id: str, repo_url: str, series: str,
+                     points: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Persist a metrics series (e.g. one per branch) and its points, shared between series by commit"""
+        entry = {
+            "repo_id": repo_id,
+            "repo_url": repo_url,
+            "series": series,
+            "updated_at": time.time(),
+            "points": points
+        }
+        commits = json.dumps([point["commit"] for point in points]).encode("utf-8")
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO history_points (repo_id, commit_sha, point) VALUES (?, ?, ?)",
+                [(repo_id, point["commit"], json.dumps(point, separators=(",", ":")).encode("utf-8"))
+                 for point in points]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO history_series (repo_id, series, repo_url, updated_at, commits) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (repo_id, series, repo_url, entry["updated_at"], commits)
+            )
+            self._conn.commit()
+        return entry
+
+    def history(self, repo_id: str, series: str = "") -> Optional[Dict[str, Any]]:
+        """A stored metrics series with its points, oldest first"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT repo_url, updated_at, commits FROM history_series WHERE repo_id = ? AND series = ?",
+                (repo_id, series)
+            ).fetchone()
+        if row is None:
+            return None
+        repo_url, updated_at, commits = row
+        stored = self.history_points(repo_id)
+        return {
+            "repo_id": repo_id,
+            "repo_url": repo_url,
+            "series": series,
+            "updated_at": updated_at,
+            "points": [stored[commit] for commit in json.loads(commits) if commit in stored]
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_store: Optional[ResultStore] = None
+
+def get_result_store() -> ResultStore:
+    """Return the process-wide result store"""
+    global _store
+    if _store is None:
+        _store = ResultStore(
+            str(Path(settings.cache_dir) / "analyses.sqlite3"),
+            memory_entries=settings.result_store_memory_entries,
+            snapshots_per_repo=settings.result_store_snapshots
+        )
+    return _store
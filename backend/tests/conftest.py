@@ -0,0 +1,117 @@
+"""
+Shared fixtures: the backend directory on sys.path (imports are absolute,
+as when running from backend/), analyses kept in-process (unless marked
+process_pool) without the persistent result cache, and throwaway git
+repositories
+"""
+
+import asyncio
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import settings  # noqa: E402
+from analyzers.executor import ProcessPoolAnalysisExecutor, ThreadAnalysisExecutor, set_executor  # noqa: E402
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "process_pool: run the test's analyses on the process pool executor")
+
+@pytest.fixture(autouse=True)
+def isolated_analysis(request, monkeypatch, tmp_path):
+    """
+    Run analyses on a background thread (on worker processes for tests
+    marked process_pool), uncached, with scratch files under tmp_path
+    """
+    monkeypatch.setattr(settings, "enable_cache", False)
+    monkeypatch.setattr(settings, "cache_dir", str(tmp_path / "cache"))
+    if request.node.get_closest_marker("process_pool") is not None:
+        set_executor(ProcessPoolAnalysisExecutor(workers=2))
+    else:
+        set_executor(ThreadAnalysisExecutor())
+    yield
+    set_executor(None)
+
+class GitRepo:
+    """A scratch repository committed to file set by file set"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._git("init", "--quiet")
+        self._git("config", "user.email", "tests@example.com")
+        self._git("config", "user.name", "Tests")
+
+    def _git(self, *args: str) -> str:
+        return subprocess.run(
+            ["git", "-C", str(self.path), *args], check=True, capture_output=True, text=True
+        ).stdout.strip()
+
+    def commit(self, files: Dict[str, Optional[str]], message: str = "change") -> str:
+        """Write (or, for None, delete) files and commit them; returns the commit SHA"""
+        for rel_path, content in files.items():
+            target = self.path / rel_path
+            if content is None:
+                target.unlink()
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(content, encoding="utf-8")
+        self._git("add", "--all")
+        self._git("commit", "--quiet", "--allow-empty", "-m", message)
+        return self._git("rev-parse", "HEAD")
+
+    def log(self) -> List[str]:
+        """Commit SHAs, newest first"""
+        return self._git("rev-list", "HEAD").split()
+
+@pytest.fixture
+def git_repo(tmp_path) -> GitRepo:
+    path = tmp_path / "repo"
+    path.mkdir()
+    return GitRepo(path)
+
+@pytest.fixture
+def api_client():
+    """The API routes (under /api, as main mounts them) without the app's startup work"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.routes import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def job_manager(monkeypatch):
+    """
+    A fresh process-wide job manager whose jobs record their arguments
+    (in manager.calls) and return them instead of analyzing anything.
+    Jobs wait while manager.gate is clear, and fail for URLs containing
+    "broken".
+    """
+    from api import jobs
+
+    calls = []
+    gate = threading.Event()
+    gate.set()
+
+    async def runner(repo_url, ref=None, progress=None, **options):
+        calls.append({"repo_url": repo_url, "ref": ref, **options})
+        if not gate.is_set():
+            await asyncio.to_thread(gate.wait)
+        if "broken" in repo_url:
+            raise RuntimeError("analysis failed")
+        return {"repo_url": repo_url, "metrics": {"complexity": 1.5}, "structure": []}
+
+    manager = jobs.JobManager(2, runner=runner, history_runner=runner)
+    manager.calls = calls
+    manager.gate = gate
+    monkeypatch.setattr(jobs, "_manager", manager)
+    yield manager
+    # Never leave a job (and its thread) waiting
+    gate.set()
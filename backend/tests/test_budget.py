@@ -0,0 +1,110 @@
+"""Analysis budget: size and file cutoffs, the deadline, the per-file watchdog and partial results"""
+
+import asyncio
+import time
+from pathlib import Path
+
+from config import Settings, settings
+from analyzers import analyze_snapshot, stream_file_records
+from analyzers import budget as budget_module
+from analyzers.budget import AnalysisBudget
+from analyzers.corpus import RepoCorpus, SourceFile
+from analyzers.executor import _run_chunk
+
+def _corpus(sizes):
+    sources = [SourceFile(Path(f"/repo/f{i}.py"), f"f{i}.py", data=b"x" * size) for i, size in enumerate(sizes)]
+    return RepoCorpus("/repo", sources)
+
+def test_unlimited_budget_admits_everything():
+    corpus = _corpus([10, 20, 30])
+    budget = AnalysisBudget()
+
+    assert budget.admit(corpus) is corpus
+    assert not budget.partial and budget.skipped == []
+
+def test_oversized_files_are_skipped_without_making_the_result_partial():
+    budget = AnalysisBudget(max_file_bytes=15)
+    admitted = budget.admit(_corpus([10, 20, 5]))
+
+    assert [source.rel_path for source in admitted] == ["f0.py", "f2.py"]
+    assert budget.skipped == [{"file": "f1.py", "reason": "file_too_large", "size": 20}]
+    assert not budget.partial
+
+def test_files_beyond_the_file_limit_make_the_result_partial():
+    budget = AnalysisBudget(max_files=2)
+    admitted = budget.admit(_corpus([1, 1, 1, 1]))
+
+    assert len(admitted) == 2
+    assert budget.skipped_paths == {"f2.py", "f3.py"}
+    assert budget.partial
+
+def test_deadline_counts_down_from_start(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(budget_module.time, "monotonic", lambda: now[0])
+    budget = AnalysisBudget(timeout_seconds=10)
+    assert budget.remaining() is None
+
+    budget.start()
+    now[0] += 4
+    assert budget.remaining() == 6 and not budget.expired
+    now[0] += 7
+    assert budget.remaining() == 0 and budget.expired
+
+def test_incomplete_analyzers_make_the_result_partial():
+    budget = AnalysisBudget()
+    budget.mark_incomplete("complexity", 3, 10)
+
+    assert budget.partial
+    assert budget.report()["incomplete"] == {"complexity": {"analyzed": 3, "total": 10}}
+
+def _slow_on_second(source):
+    if source.rel_path == "f1.py":
+        time.sleep(5)
+    return {"file": source.rel_path}
+
+def test_watchdog_interrupts_a_file_that_runs_too_long():
+    sources = list(_corpus([1, 1, 1]))
+    started = time.monotonic()
+    results, _timings = _run_chunk(_slow_on_second, sources, file_timeout=0.2)
+
+    assert time.monotonic() - started < 2
+    assert results[0] == {"file": "f0.py"} and results[2] == {"file": "f2.py"}
+    assert results[1]["timed_out"] and results[1]["file"] == "f1.py"
+
+    budget = AnalysisBudget()
+    budget.record_timeouts("complexity", results)
+    assert budget.timed_out == [{"file": "f1.py", "analyzer": "complexity"}]
+
+def test_there_is_no_file_limit_by_default(monkeypatch):
+    monkeypatch.delenv("MAX_FILES_TO_ANALYZE", raising=False)
+
+    assert Settings().max_files_to_analyze == 0
+
+def test_partial_snapshots_are_not_used_as_incremental_bases(git_repo, monkeypatch):
+    base_sha = git_repo.commit({f"m{i}.py": f"def f{i}():\n    return {i}\n" for i in range(3)})
+    target_sha = git_repo.commit({"m0.py": "def f0():\n    return 10\n"})
+
+    async def run():
+        monkeypatch.setattr(settings, "max_files_to_analyze", 2)
+        base = await analyze_snapshot(str(git_repo.path), target_ref=base_sha)
+        monkeypatch.setattr(settings, "max_files_to_analyze", 0)
+        return base, await analyze_snapshot(str(git_repo.path), target_ref=target_sha, base_snapshot=base)
+
+    base, snapshot = asyncio.run(run())
+
+    assert base.partial and not base.can_base(base.versions)
+    assert snapshot.result["analysis"]["mode"] == "full"
+    assert sorted(snapshot.files) == ["m0.py", "m1.py", "m2.py"]
+
+def test_streamed_records_respect_the_budget(git_repo):
+    git_repo.commit({"a.py": "x = 1\n", "b.py": "y = 2\n", "c.py": "z = 3\n"})
+
+    async def collect():
+        budget = AnalysisBudget(max_files=2)
+        return [record async for record in stream_file_records(str(git_repo.path), ["complexity"], budget=budget)]
+
+    records = asyncio.run(collect())
+
+    assert [record["file"] for record in records[:-1]] == ["a.py", "b.py"]
+    assert records[-1]["summary"]["partial"]
+    assert records[-1]["summary"]["budget"]["skipped"] == [{"file": "c.py", "reason": "file_limit"}]
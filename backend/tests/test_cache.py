@@ -0,0 +1,147 @@
+"""Result cache: content-addressed entries, TTL expiry and LRU eviction"""
+
+import asyncio
+from pathlib import Path
+
+from analyzers import cache as cache_module
+from analyzers.cache import FileTask, ResultCache, cached_map, cached_map_tasks, memoized_results
+from analyzers.corpus import SourceFile
+from analyzers.executor import ThreadAnalysisExecutor
+
+def _cache(tmp_path, max_bytes=1 << 20, ttl_seconds=0) -> ResultCache:
+    return ResultCache(str(tmp_path / "results.sqlite3"), max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+
+def test_entries_are_keyed_by_content_analyzer_and_version(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put_many("complexity", "1", {"abc": {"score": 1}})
+
+    assert cache.get_many("complexity", "1", ["abc", "missing"]) == {"abc": {"score": 1}}
+    assert cache.get_many("complexity", "2", ["abc"]) == {}
+    assert cache.get_many("documentation", "1", ["abc"]) == {}
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = _cache(tmp_path, ttl_seconds=60)
+    cache.put_many("complexity", "1", {"abc": {"score": 1}})
+
+    now[0] += 59
+    assert "abc" in cache.get_many("complexity", "1", ["abc"])
+    now[0] += 2
+    assert cache.get_many("complexity", "1", ["abc"]) == {}
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    payload = {"data": "x" * 100}
+    # Room for about three entries
+    cache = _cache(tmp_path, max_bytes=350)
+    for digest in ("a", "b", "c"):
+        now[0] += 1
+        cache.put_many("complexity", "1", {digest: payload})
+
+    now[0] += 1
+    cache.get_many("complexity", "1", ["a"])
+    now[0] += 1
+    cache.put_many("complexity", "1", {"d": payload})
+
+    kept = cache.get_many("complexity", "1", ["a", "b", "c", "d"])
+    assert "a" in kept and "d" in kept
+    assert "b" not in kept
+
+def test_replacing_an_entry_does_not_count_it_twice(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put_many("complexity", "1", {"abc": {"score": 1}})
+    size = cache._total_bytes
+    cache.put_many("complexity", "1", {"abc": {"score": 2}})
+
+    assert cache._total_bytes == size
+    assert cache.get_many("complexity", "1", ["abc"]) == {"abc": {"score": 2}}
+
+def _sources(tmp_path, contents):
+    return [SourceFile(tmp_path / f"f{i}.py", f"f{i}.py", data=data) for i, data in enumerate(contents)]
+
+def test_cached_map_analyzes_each_content_once(tmp_path):
+    calls = []
+
+    def analyze(source):
+        calls.append(source.rel_path)
+        return {"file": source.rel_path, "size": len(source.data)}
+
+    cache = _cache(tmp_path)
+    executor = ThreadAnalysisExecutor()
+    first = asyncio.run(cached_map(executor, "test", "1", analyze, _sources(tmp_path, [b"a", b"bb"]), cache=cache))
+    # Same contents under other paths are served from the cache, with their own paths
+    second = asyncio.run(cached_map(executor, "test", "1", analyze, _sources(Path("/elsewhere"), [b"bb", b"a"]), cache=cache))
+
+    assert calls == ["f0.py", "f1.py"]
+    assert first == [{"file": "f0.py", "size": 1}, {"file": "f1.py", "size": 2}]
+    assert second == [{"file": "f0.py", "size": 2}, {"file": "f1.py", "size": 1}]
+
+def test_memoized_results_work_without_the_persistent_cache(tmp_path):
+    calls = []
+
+    def analyze(source):
+        calls.append(source.rel_path)
+        return {"file": source.rel_path}
+
+    async def twice():
+        executor = ThreadAnalysisExecutor()
+        with memoized_results():
+            await cached_map(executor, "test", "1", analyze, _sources(tmp_path, [b"a"]))
+            await cached_map(executor, "test", "1", analyze, _sources(tmp_path, [b"a"]))
+
+    asyncio.run(twice())
+    assert calls == ["f0.py"]
+
+def test_timed_out_results_are_not_cached(tmp_path):
+    cache = _cache(tmp_path)
+    sources = _sources(tmp_path, [b"a"])
+
+    def analyze(source):
+        return {"file": source.rel_path, "error": "timed out", "timed_out": True}
+
+    asyncio.run(cached_map(ThreadAnalysisExecutor(), "test", "1", analyze, sources, cache=cache))
+    assert cache.get_many("test", "1", [sources[0].digest]) == {}
+
+class _CountingExecutor(ThreadAnalysisExecutor):
+    """Records every file handed to a worker"""
+
+    def __init__(self):
+        self.dispatched = []
+
+    async def map(self, func, sources, on_result=None):
+        self.dispatched.extend(source.rel_path for source in sources)
+        return await super().map(func, sources, on_result)
+
+def _size(source):
+    return {"file": source.rel_path, "size": len(source.data)}
+
+def _upper(source):
+    return {"file": source.rel_path, "upper": source.data.upper().decode()}
+
+def test_files_shared_by_several_analyzers_are_dispatched_once(tmp_path):
+    cache = _cache(tmp_path)
+    sources = _sources(tmp_path, [b"a", b"bb", b"ccc"])
+    # One analyzer's result for f1.py is cached already
+    cache.put_many("upper", "1", {sources[1].digest: {"upper": "BB"}})
+    executor = _CountingExecutor()
+    delivered = []
+
+    results = asyncio.run(cached_map_tasks(
+        executor,
+        [FileTask("size", "1", _size), FileTask("upper", "1", _upper)],
+        [sources, sources[:2]],
+        cache=cache,
+        on_result=lambda task, index, result: delivered.append((task, index))
+    ))
+
+    assert sorted(executor.dispatched) == ["f0.py", "f1.py", "f2.py"]
+    assert results == [
+        [{"file": "f0.py", "size": 1}, {"file": "f1.py", "size": 2}, {"file": "f2.py", "size": 3}],
+        [{"file": "f0.py", "upper": "A"}, {"file": "f1.py", "upper": "BB"}]
+    ]
+    assert sorted(delivered) == [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1)]
+    # Each result is stored under its own analyzer's key
+    assert cache.get_many("size", "1", [sources[2].digest]) == {sources[2].digest: {"size": 3}}
+    assert cache.get_many("upper", "1", [sources[0].digest]) == {sources[0].digest: {"upper": "A"}}
@@ -0,0 +1,78 @@
+"""Generated, vendored, migration and minified files are recognized, and skipped by the analyzers that ask"""
+
+import asyncio
+
+import pytest
+
+from analyzers import analyze_snapshot
+from analyzers.classifier import HEADER_LINES, MINIFIED_MAX_LINE, classify
+
+VENDOR_DIRECTORIES = ["vendor", "third_party"]
+
+HAND_WRITTEN = '''"""
+Helpers for the settings page. Values shown here are generated by the
+user's choices; do not edit them by hand in the database.
+"""
+
+import re
+
+# The protobuf stubs (*_pb2.py) live in proto/, see the build notes
+def revision_id(text):
+    """Revision ID: the part before the first dash"""
+    return re.split("-", text)[0]
+'''
+
+# (path, content, expected category or None)
+CASES = [
+    ("pkg/vendor/six.py", "x = 1\n", "vendored"),
+    ("third_party/lib/core.py", "x = 1\n", "vendored"),
+    ("api/service_pb2.py", "x = 1\n", "generated"),
+    ("api/service_pb2_grpc.py", "x = 1\n", "generated"),
+    ("api/service_pb2.pyi", "x: int\n", "generated"),
+    ("models.py", "# Code generated by sqlc. DO NOT EDIT.\nx = 1\n", "generated"),
+    ("parser.py", "#!/usr/bin/env python\n# @generated by tools/gen.py\nx = 1\n", "generated"),
+    ("config_gen.py", "# This file is automatically generated\nx = 1\n", "generated"),
+    ("lexer.py", "# Generated by ANTLR 4.9\nx = 1\n", "generated"),
+    ("ext.py", "# Auto-generated code, see build.py\nx = 1\n", "generated"),
+    ("app/migrations/0001_initial.py", "from django.db import migrations\n", "migration"),
+    ("alembic/versions/abc_add_users.py",
+     '"""add users\n\nRevision ID: abc\nRevises: def\n"""\n', "migration"),
+    ("bundle.py", "x = [" + "1, " * (MINIFIED_MAX_LINE // 3) + "]\n", "minified"),
+    ("dense.py", ("y = '" + "a" * 300 + "'\n") * 8, "minified"),
+    # Ordinary source, including near misses of every heuristic
+    ("settings_page.py", HAND_WRITTEN, None),
+    ("vendor.py", "x = 1\n", None),
+    ("lib/vendors/core.py", "x = 1\n", None),
+    ("pb2.py", "x = 1\n", None),
+    ("app/migrations/helpers.py", "x = 1\n", None),
+    ("app/0001_initial.py", "x = 1\n", None),
+    ("notes.py", "# Please do not edit this list without review\nx = 1\n", None),
+    ("late_marker.py", "x = 1\n" * HEADER_LINES + "# DO NOT EDIT\n", None),
+    ("long_lines.py", ("z = '" + "b" * 150 + "'\n") * 8, None),
+    ("short_but_wide.py", "w = '" + "c" * 900 + "'\n", None),
+    ("empty.py", "", None)
+]
+
+@pytest.mark.parametrize("rel_path, content, category", CASES, ids=[case[0] for case in CASES])
+def test_classify(rel_path, content, category):
+    info = classify(rel_path, content.encode("utf-8"), VENDOR_DIRECTORIES)
+
+    if category is None:
+        assert info is None
+    else:
+        assert info["category"] == category and info["reason"]
+
+def test_generated_files_are_left_out_of_analyzers_that_skip_them(git_repo):
+    git_repo.commit({
+        "app.py": "import service_pb2\n\ndef handle(x):\n    if x:\n        return 1\n",
+        "service_pb2.py": "# Generated by the protocol buffer compiler.  DO NOT EDIT!\n"
+                          "import os\n\ndef build(x):\n    if x:\n        return 2\n"
+    })
+    snapshot = asyncio.run(analyze_snapshot(str(git_repo.path)))
+
+    assert snapshot.result["analysis"]["skipped_files"] == [
+        {"file": "service_pb2.py", "category": "generated", "reason": "protobuf stub"}
+    ]
+    # Complexity skips generated files; dependencies still sees their imports
+    assert set(snapshot.records["complexity"]) == {"app.py"}
+    assert set(snapshot.records["dependencies"]) == {"app.py", "service_pb2.py"}
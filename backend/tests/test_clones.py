@@ -0,0 +1,118 @@
+"""Clone cache: mirrors of file:// bare repositories, fetched incrementally and evicted by size"""
+
+import subprocess
+
+import pytest
+
+from analyzers import clones
+from analyzers.clones import CloneCache
+
+def _git(*args: str) -> str:
+    return subprocess.run(["git", *args], check=True, capture_output=True, text=True).stdout.strip()
+
+@pytest.fixture
+def origin(git_repo, tmp_path):
+    """A bare repository with three commits on main and one on feature; (file:// URL, work repo)"""
+    for i in range(3):
+        git_repo.commit({"a.py": f"x = {i}\n"}, message=f"commit {i}")
+    git_repo._git("branch", "-M", "main")
+    git_repo._git("checkout", "--quiet", "-b", "feature")
+    git_repo.commit({"b.py": "y = 1\n"})
+    git_repo._git("checkout", "--quiet", "main")
+    bare = tmp_path / "origin.git"
+    _git("clone", "--quiet", "--bare", str(git_repo.path), str(bare))
+    return f"file://{bare}", git_repo
+
+def _cache(tmp_path, max_bytes=0) -> CloneCache:
+    return CloneCache(str(tmp_path / "repos"), max_bytes=max_bytes)
+
+def _count(mirror) -> int:
+    return int(_git("--git-dir", str(mirror), "rev-list", "--count", "FETCH_HEAD"))
+
+def test_a_second_fetch_reuses_the_mirror(origin, tmp_path, monkeypatch):
+    url, work = origin
+    cache = _cache(tmp_path)
+    first, first_commit = cache.fetch(url, "main")
+    work.commit({"a.py": "x = 9\n"})
+    _git("-C", str(work.path), "push", "--quiet", url[len("file://"):], "main")
+
+    commands = []
+    run = cache._git
+
+    def recording(*args):
+        commands.append(args)
+        return run(*args)
+
+    monkeypatch.setattr(cache, "_git", recording)
+    second, second_commit = cache.fetch(url, "main")
+
+    assert second == first
+    assert not any("init" in args for args in commands)
+    assert any("fetch" in args for args in commands)
+    assert second_commit == work.log()[0] != first_commit
+
+def test_depth_and_branch_follow_each_request(origin, tmp_path):
+    url, work = origin
+    cache = _cache(tmp_path)
+
+    mirror, commit = cache.fetch(url, "main", depth=1)
+    assert (mirror / "shallow").exists()
+    assert _count(mirror) == 1
+
+    mirror, feature = cache.fetch(url, "feature", depth=1)
+    assert feature == _git("-C", str(work.path), "rev-parse", "feature")
+
+    # depth 0 deepens the shallow mirror to the full history
+    mirror, commit = cache.fetch(url, "main")
+    assert not (mirror / "shallow").exists()
+    assert _count(mirror) == 3
+
+def test_checkouts_move_the_same_worktree(origin, tmp_path):
+    url, _work = origin
+    cache = _cache(tmp_path)
+
+    worktree, _commit = cache.sync(url, "main")
+    assert (worktree / "a.py").read_text() == "x = 2\n"
+    again, _commit = cache.sync(url, "feature")
+
+    assert again == worktree
+    assert (worktree / "b.py").exists()
+
+def test_eviction_keeps_entries_in_use(origin, tmp_path):
+    url, work = origin
+    other = tmp_path / "other.git"
+    _git("clone", "--quiet", "--bare", str(work.path), str(other))
+    cache = _cache(tmp_path, max_bytes=1)
+
+    cache.fetch(url, "main")
+    # Over budget, but the first entry is in use by another analysis
+    cache.fetch(f"file://{other}", "main", in_use={cache.key_for(url)})
+    assert {item["key"] for item in cache.entries()} == {cache.key_for(url), cache.key_for(f"file://{other}")}
+
+    # Once it is not, it goes as the least recently used entry
+    cache.fetch(f"file://{other}", "main")
+    assert [item["key"] for item in cache.entries()] == [cache.key_for(f"file://{other}")]
+
+def test_eviction_only_measures_the_fetched_entry(origin, tmp_path, monkeypatch):
+    url, work = origin
+    other = tmp_path / "other.git"
+    _git("clone", "--quiet", "--bare", str(work.path), str(other))
+    cache = _cache(tmp_path, max_bytes=1 << 30)
+    cache.fetch(url, "main")
+
+    measured = []
+    walk = clones._directory_size
+
+    def measuring(path):
+        measured.append(path.name)
+        return walk(path)
+
+    monkeypatch.setattr(clones, "_directory_size", measuring)
+    cache.fetch(f"file://{other}", "main")
+    cache.fetch(url, "main")
+
+    assert measured == [cache.key_for(f"file://{other}"), cache.key_for(url)]
+    # Sizes survive a restart through each entry's size file
+    restarted = _cache(tmp_path, max_bytes=1 << 30)
+    assert [item["size"] for item in restarted.entries()] == [item["size"] for item in cache.entries()]
+    assert len(measured) == 2
@@ -0,0 +1,117 @@
+"""Delta encoding of metrics and structure updates: sequencing, keyframes and patches"""
+
+import asyncio
+import copy
+import json
+
+from api.deltas import DeltaEncoder, diff
+from api.websocket import WebSocketManager
+
+def _unescape(part):
+    return part.replace("~1", "/").replace("~0", "~")
+
+def apply(state, ops):
+    """Apply patch operations the way a client would"""
+    state = copy.deepcopy(state)
+    for op in ops:
+        parts = [_unescape(part) for part in op["path"].split("/")[1:]]
+        if not parts:
+            state = copy.deepcopy(op["value"])
+            continue
+        target = state
+        for part in parts[:-1]:
+            target = target[part]
+        if op["op"] == "remove":
+            del target[parts[-1]]
+        else:
+            target[parts[-1]] = copy.deepcopy(op["value"])
+    return state
+
+def test_diff_produces_patches_that_rebuild_the_new_value():
+    old = {"a": 1, "b": {"c": 2, "d": [1, 2]}, "gone": True, "x/y": 0}
+    new = {"a": 1, "b": {"c": 3, "d": [1, 2, 3]}, "added": {"e": 1}, "x/y": 1}
+
+    ops = diff(old, new)
+
+    assert apply(old, ops) == new
+    assert {"op": "remove", "path": "/gone"} in ops
+    assert {"op": "replace", "path": "/x~1y", "value": 1} in ops
+    assert diff(new, new) == []
+
+def test_updates_are_sequenced_per_stream():
+    encoder = DeltaEncoder(keyframe_interval=20)
+
+    first = encoder.encode("metrics", "repo", {"complexity": 70, "yagni": 20})
+    second = encoder.encode("metrics", "repo", {"complexity": 72, "yagni": 20})
+    other = encoder.encode("metrics", "other", {"complexity": 1})
+
+    assert first == {"type": "metrics_update", "topic": "repo", "seq": 1, "keyframe": True,
+                     "data": {"complexity": 70, "yagni": 20}}
+    assert second == {"type": "metrics_delta", "topic": "repo", "seq": 2,
+                      "ops": [{"op": "replace", "path": "/complexity", "value": 72}]}
+    assert other["seq"] == 1 and other["keyframe"]
+
+def test_unchanged_updates_are_not_sent():
+    encoder = DeltaEncoder()
+    encoder.encode("metrics", "repo", {"complexity": 70})
+
+    assert encoder.encode("metrics", "repo", {"complexity": 70}) is None
+    assert encoder.encode("metrics", "repo", {"complexity": 71})["seq"] == 2
+
+def test_keyframes_are_sent_every_interval():
+    encoder = DeltaEncoder(keyframe_interval=2)
+    kinds = [encoder.encode("metrics", "repo", {"value": value}) for value in range(5)]
+
+    assert [message["type"] for message in kinds] == [
+        "metrics_update", "metrics_delta", "metrics_delta", "metrics_update", "metrics_delta"
+    ]
+    assert [message["seq"] for message in kinds] == [1, 2, 3, 4, 5]
+
+def test_structure_deltas_apply_to_modules_by_id():
+    encoder = DeltaEncoder()
+    modules = [{"id": "api", "health": 0.5}, {"id": "core", "health": 0.9}]
+    keyframe = encoder.encode("structure", "repo", modules)
+    delta = encoder.encode("structure", "repo", [{"id": "api", "health": 0.6}, {"id": "db", "health": 1.0}])
+
+    state = {module["id"]: module for module in keyframe["data"]}
+    state = apply(state, delta["ops"])
+    assert state == {"api": {"id": "api", "health": 0.6}, "db": {"id": "db", "health": 1.0}}
+
+def test_resync_keyframe_reflects_the_latest_state():
+    encoder = DeltaEncoder()
+    assert encoder.keyframe("metrics", "repo") is None
+    encoder.encode("metrics", "repo", {"value": 1})
+    encoder.encode("metrics", "repo", {"value": 2})
+
+    assert encoder.keyframe("metrics", "repo") == {
+        "type": "metrics_update", "topic": "repo", "seq": 2, "keyframe": True, "data": {"value": 2}
+    }
+
+class _Client:
+    def __init__(self, query_params):
+        self.query_params = query_params
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+def test_only_clients_that_opt_in_receive_deltas():
+    async def run():
+        manager = WebSocketManager(overflow_policy="drop_oldest")
+        plain, delta = _Client({}), _Client({"deltas": "1"})
+        await manager.connect(plain)
+        await manager.connect(delta)
+        for value in (1, 2):
+            await manager.broadcast_metrics_update({"value": value}, topic="repo")
+        await asyncio.sleep(0.01)
+        return plain.sent, delta.sent
+
+    plain, delta = asyncio.run(run())
+
+    assert [(message["type"], message["seq"], message["data"]) for message in plain] == [
+        ("metrics_update", 1, {"value": 1}), ("metrics_update", 2, {"value": 2})
+    ]
+    assert [message["type"] for message in delta] == ["metrics_update", "metrics_delta"]
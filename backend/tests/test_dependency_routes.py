@@ -0,0 +1,79 @@
+"""Importer and change-impact queries answered from a stored dependency index"""
+
+import asyncio
+
+import pytest
+
+from analyzers import analyze_snapshot
+from api import routes
+from storage.results import ResultStore
+
+# pkg.a -> pkg.b -> pkg.c -> pkg.a is a cycle; pkg.d and app import into it
+FILES = {
+    "pkg/__init__.py": "",
+    "pkg/a.py": "from pkg import b\n",
+    "pkg/b.py": "from pkg import c\n",
+    "pkg/c.py": "import pkg.a\n",
+    "pkg/d.py": "from pkg.a import *\n",
+    "app.py": "import pkg.d\n",
+    "lone.py": "import os\n"
+}
+
+@pytest.fixture
+def stored(git_repo, tmp_path, monkeypatch):
+    """The commit of FILES, analyzed and stored as repository "repo" """
+    sha = git_repo.commit(FILES)
+    store = ResultStore(str(tmp_path / "store.sqlite3"))
+
+    async def run():
+        store.save("repo", str(git_repo.path), await analyze_snapshot(str(git_repo.path), target_ref=sha))
+
+    asyncio.run(run())
+    monkeypatch.setattr(routes, "get_result_store", lambda: store)
+    return sha
+
+def _importers(api_client, module, **params):
+    return api_client.get("/api/dependencies/repo/importers", params={"module": module, **params})
+
+def test_transitive_importers_go_around_the_cycle(api_client, stored):
+    body = _importers(api_client, "pkg.c").json()
+
+    assert body["commit"] == stored and body["files"] == ["pkg/c.py"]
+    distances = {item["file"]: item["distance"] for item in body["importers"]}
+    # The cycle leads back to pkg/a.py, which is reached once, and never to pkg/c.py itself
+    assert distances == {"pkg/b.py": 1, "pkg/a.py": 2, "pkg/d.py": 3, "app.py": 4}
+    assert body["count"] == 4
+
+def test_direct_importers_only(api_client, stored):
+    body = _importers(api_client, "pkg/a.py", transitive=False).json()
+
+    assert sorted(item["file"] for item in body["importers"]) == ["pkg/c.py", "pkg/d.py"]
+
+def test_impact_of_a_change_inside_the_cycle(api_client, stored):
+    response = api_client.post("/api/dependencies/repo/impact",
+                               json={"files": ["pkg/a.py", "pkg/a.py", "missing.py"]})
+    body = response.json()
+
+    assert response.status_code == 200 and body["commit"] == stored
+    assert body["changed"] == ["pkg/a.py"] and body["unknown"] == ["missing.py"]
+    assert {item["file"]: item["distance"] for item in body["affected"]} == {
+        "pkg/c.py": 1, "pkg/d.py": 1, "pkg/b.py": 2, "app.py": 2
+    }
+    assert body["total_files"] == len(FILES)
+
+    limited = api_client.post("/api/dependencies/repo/impact", json={"files": ["pkg/a.py"], "max_depth": 1}).json()
+    assert sorted(item["file"] for item in limited["affected"]) == ["pkg/c.py", "pkg/d.py"]
+
+def test_files_nothing_imports(api_client, stored):
+    body = _importers(api_client, "lone").json()
+
+    assert body["files"] == ["lone.py"] and body["importers"] == [] and body["count"] == 0
+
+def test_unknown_modules_and_repositories(api_client, stored):
+    unknown_module = _importers(api_client, "pkg.missing")
+    assert unknown_module.status_code == 404
+    assert unknown_module.json()["detail"] == "Unknown module pkg.missing"
+
+    assert api_client.get("/api/dependencies/other/importers", params={"module": "pkg.a"}).status_code == 404
+    assert api_client.post("/api/dependencies/other/impact", json={"files": ["pkg/a.py"]}).status_code == 404
+    assert _importers(api_client, "pkg.a", commit="0" * 40).status_code == 404
@@ -0,0 +1,61 @@
+"""File discovery: the .gitignore matcher agrees with git on which files are ignored"""
+
+import pytest
+
+from analyzers.discovery import discover_python_files, walk_python_files
+
+# Each case: .gitignore files and Python files, as {path: content}
+CASES = {
+    "negation": {
+        ".gitignore": "*.py\n!keep.py\n# a comment\n!sub/other.py\n",
+        "sub/.gitignore": "!b.py\n",
+        "a.py": "", "keep.py": "", "sub/keep.py": "", "sub/b.py": "", "sub/c.py": "", "sub/other.py": ""
+    },
+    "negation inside an ignored directory": {
+        ".gitignore": "logs/\n!logs/keep.py\ndist/*\n!dist/keep.py\n",
+        "logs/keep.py": "", "logs/a.py": "", "dist/keep.py": "", "dist/a.py": "", "dist/sub/b.py": ""
+    },
+    "anchored": {
+        ".gitignore": "/top.py\nsub/x.py\n",
+        "d/.gitignore": "/y.py\nz/w.py\n",
+        "top.py": "", "sub/top.py": "", "sub/x.py": "", "other/sub/x.py": "",
+        "d/y.py": "", "d/e/y.py": "", "d/z/w.py": "", "d/e/z/w.py": "", "y.py": ""
+    },
+    "double star": {
+        ".gitignore": "**/gen/*.py\nlib/**/cache.py\nout/**\n**/vendor\n",
+        "gen/a.py": "", "x/gen/a.py": "", "x/gen/deep/a.py": "",
+        "lib/cache.py": "", "lib/a/b/cache.py": "", "lib/a/other.py": "", "src/lib/cache.py": "",
+        "out/a.py": "", "out/d/b.py": "", "vendor/a.py": "", "x/y/vendor/b.py": "", "vendored.py": ""
+    },
+    "directory only": {
+        ".gitignore": "build/\nmod.py/\n",
+        "build/a.py": "", "src/build/b.py": "", "building.py": "",
+        "mod.py": "", "pkg/mod.py/inner.py": ""
+    },
+    "wildcards": {
+        ".gitignore": "test_?.py\n[ab]*.py\n[!c]x.py\n\\#hash.py\n",
+        "test_1.py": "", "test_12.py": "", "a1.py": "", "b/c.py": "", "c1.py": "",
+        "cx.py": "", "dx.py": "", "#hash.py": ""
+    }
+}
+
+def _git_untracked(git_repo):
+    """Python files git lists as neither tracked nor ignored"""
+    listed = git_repo._git("ls-files", "-z", "--others", "--exclude-standard").split("\0")
+    return sorted(path for path in listed if path.endswith(".py"))
+
+@pytest.mark.parametrize("files", CASES.values(), ids=list(CASES))
+def test_discovery_matches_git(git_repo, files):
+    for rel_path, content in files.items():
+        target = git_repo.path / rel_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content, encoding="utf-8")
+    expected = _git_untracked(git_repo)
+
+    walked = [rel for rel, _size in walk_python_files(str(git_repo.path))]
+    listed = [rel for rel, _size in discover_python_files(str(git_repo.path), use_git=True)]
+
+    # Something is ignored and something is kept in every case
+    assert expected and len(expected) < sum(path.endswith(".py") for path in files)
+    assert walked == expected
+    assert listed == expected
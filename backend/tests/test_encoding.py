@@ -0,0 +1,115 @@
+"""Job results in each negotiated format: JSON, MessagePack and their columnar layouts"""
+
+import json
+import time
+
+import msgpack
+import pytest
+
+from api import encoding
+from api.encoding import COLUMNAR_JSON, COLUMNAR_MSGPACK, JSON, MSGPACK
+
+RESULT = {
+    "repo_url": "https://github.com/example/project",
+    "metrics": {"complexity": 1.5, "lines": 120},
+    "structure": [
+        {"name": "a.py", "size": 10, "complexity": 2},
+        {"name": "pkg/b.py", "size": 20},
+        {"name": "pkg/c.py", "size": 5, "complexity": None, "tags": ["test"]}
+    ],
+    "history": [[1, 2], [3, 4]]
+}
+
+@pytest.fixture
+def result_url(api_client, job_manager):
+    """The result URL of a finished job whose result is RESULT"""
+    job = api_client.post("/api/analyze", json={"repo_url": RESULT["repo_url"]}).json()
+    for _ in range(100):
+        if api_client.get(job["status_url"]).json()["status"] == "completed":
+            break
+        time.sleep(0.02)
+    job_manager.get(job["job_id"]).result = RESULT
+    return job["result_url"]
+
+def _get(api_client, url, accept=None):
+    headers = {"Accept": accept} if accept is not None else {}
+    return api_client.get(url, headers=headers)
+
+def _rows(table):
+    """Objects back from a columnar table"""
+    columns = table["columns"]
+    return [{field: values[i] for field, values in columns.items()} for i in range(table["length"])]
+
+@pytest.mark.parametrize("accept", [None, "application/json", "*/*", "application/*", "text/html, */*;q=0.1"])
+def test_json_by_default(api_client, result_url, accept):
+    response = _get(api_client, result_url, accept)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == JSON
+    assert response.headers["vary"] == "Accept"
+    assert response.json() == RESULT
+
+def test_json_without_orjson_is_the_same(api_client, result_url, monkeypatch):
+    with_orjson = _get(api_client, result_url).content
+    monkeypatch.setattr(encoding, "orjson", None)
+    without = _get(api_client, result_url).content
+
+    assert json.loads(with_orjson) == json.loads(without) == RESULT
+
+def test_non_string_keys_encode_alike(monkeypatch):
+    content = {1: "one", "nested": {2: [3]}}
+    with_orjson = encoding.dumps_json(content)
+    monkeypatch.setattr(encoding, "orjson", None)
+
+    assert json.loads(with_orjson) == json.loads(encoding.dumps_json(content)) == {"1": "one", "nested": {"2": [3]}}
+
+@pytest.mark.parametrize("accept", ["application/msgpack", "application/x-msgpack", "application/vnd.msgpack"])
+def test_msgpack(api_client, result_url, accept):
+    response = _get(api_client, result_url, accept)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == MSGPACK
+    assert msgpack.unpackb(response.content) == RESULT
+
+@pytest.mark.parametrize("accept, decode", [
+    (COLUMNAR_JSON, json.loads),
+    (COLUMNAR_MSGPACK, msgpack.unpackb)
+])
+def test_columnar_round_trip(api_client, result_url, accept, decode):
+    response = _get(api_client, result_url, accept)
+    body = decode(response.content)
+
+    assert response.headers["content-type"] == accept
+    assert body["metrics"] == RESULT["metrics"]
+    # Lists of scalars and of lists keep their layout
+    assert body["history"] == RESULT["history"]
+    structure = body["structure"]
+    assert structure["length"] == 3
+    assert list(structure["columns"]) == ["name", "size", "complexity", "tags"]
+    # Fields missing from some objects come back as null
+    fields = structure["columns"]
+    assert _rows(structure) == [{field: row.get(field) for field in fields} for row in RESULT["structure"]]
+
+@pytest.mark.parametrize("accept, media_type", [
+    ("application/json;q=0.5, application/msgpack", MSGPACK),
+    ("application/msgpack;q=0.2, application/json;q=0.9", JSON),
+    ("application/msgpack;q=0, application/json;q=0.1", JSON),
+    (f"text/html, {COLUMNAR_JSON};q=0.3, {COLUMNAR_MSGPACK};q=0.4", COLUMNAR_MSGPACK),
+    ("application/msgpack;q=oops, application/json", JSON)
+])
+def test_quality_values_pick_the_format(api_client, result_url, accept, media_type):
+    assert _get(api_client, result_url, accept).headers["content-type"] == media_type
+
+def test_msgpack_falls_back_to_json_without_the_package(api_client, result_url, monkeypatch):
+    monkeypatch.setattr(encoding, "msgpack", None)
+
+    response = _get(api_client, result_url, "application/msgpack, application/json;q=0.5")
+    assert response.headers["content-type"] == JSON and response.json() == RESULT
+
+    refused = _get(api_client, result_url, COLUMNAR_MSGPACK)
+    assert refused.status_code == 406
+    assert refused.json()["detail"] == f"Supported formats: {JSON}, {COLUMNAR_JSON}"
+
+@pytest.mark.parametrize("accept", ["text/html", "application/json;q=0"])
+def test_unsupported_formats_are_not_acceptable(api_client, result_url, accept):
+    assert _get(api_client, result_url, accept).status_code == 406
@@ -0,0 +1,95 @@
+"""The process pool executor: pickled sources, the per-file watchdog, warm-up and shutdown"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from analyzers import analyze_snapshot
+from analyzers.cache import FileTask, cached_map_tasks
+from analyzers.corpus import SourceFile
+from analyzers.executor import ProcessPoolAnalysisExecutor, ThreadAnalysisExecutor, get_executor, set_executor
+
+# Functions shipped to workers must be importable there, so they live at module level
+
+def _size(source):
+    return {"file": source.rel_path, "size": len(source.data)}
+
+def _hang_on_slow(source):
+    if source.rel_path == "slow.py":
+        time.sleep(30)
+    return {"file": source.rel_path, "lines": source.line_count}
+
+def _sources(contents):
+    return [SourceFile(Path(f"/repo/{name}"), name, data=data) for name, data in contents.items()]
+
+FILES = {
+    "pkg/__init__.py": "",
+    "pkg/core.py": '"""Core"""\n\nclass Base:\n    def run(self):\n        raise NotImplementedError\n',
+    "pkg/impl.py": "from .core import Base\n\nclass Impl(Base):\n    def run(self):\n        for i in range(3):\n            if i:\n                return i\n",
+    "pkg/test_impl.py": "from .impl import Impl\n\ndef test_run():\n    assert Impl().run() == 1\n",
+    "gen_pb2.py": "# Generated by the protocol buffer compiler.  DO NOT EDIT!\nX = 1\n"
+}
+
+def _comparable(snapshot):
+    result = {key: value for key, value in snapshot.result.items() if key != "analysis"}
+    records = {name: dict(records) for name, records in snapshot.records.items()}
+    return json.dumps([result, records, snapshot.files], sort_keys=True)
+
+def _in_both_modes(run):
+    """Results of run() on the process pool and on a thread"""
+    on_processes = asyncio.run(run())
+    set_executor(ThreadAnalysisExecutor())
+    on_thread = asyncio.run(run())
+    return on_processes, on_thread
+
+@pytest.mark.process_pool
+def test_working_tree_results_match_thread_mode(git_repo):
+    git_repo.commit(FILES)
+    on_processes, on_thread = _in_both_modes(lambda: analyze_snapshot(str(git_repo.path)))
+
+    assert on_processes.result["analysis"]["errors"] == {}
+    assert _comparable(on_processes) == _comparable(on_thread)
+
+@pytest.mark.process_pool
+def test_commit_results_match_thread_mode(git_repo):
+    # Blobs read from the object store travel with their content
+    sha = git_repo.commit(FILES)
+    on_processes, on_thread = _in_both_modes(lambda: analyze_snapshot(str(git_repo.path), target_ref=sha))
+
+    assert on_processes.result["analysis"]["errors"] == {}
+    assert _comparable(on_processes) == _comparable(on_thread)
+
+@pytest.mark.process_pool
+def test_the_watchdog_interrupts_a_file_in_a_worker():
+    executor = ProcessPoolAnalysisExecutor(workers=1, file_timeout=0.5)
+    sources = _sources({"fast.py": b"x = 1\n", "slow.py": b"y = 2\n", "other.py": b"z = 3\n"})
+    started = time.monotonic()
+    try:
+        results = asyncio.run(cached_map_tasks(
+            executor, [FileTask("a", "1", _hang_on_slow), FileTask("b", "1", _size)], [sources, sources]
+        ))
+    finally:
+        executor.shutdown()
+
+    assert time.monotonic() - started < 20
+    lines, sizes = results
+    assert lines[0] == {"file": "fast.py", "lines": 1} and sizes[2] == {"file": "other.py", "size": 6}
+    # Both analyzers of the interrupted file get the timeout record
+    for record in (lines[1], sizes[1]):
+        assert record["timed_out"] and record["file"] == "slow.py"
+
+@pytest.mark.process_pool
+def test_workers_start_warm_and_restart_after_shutdown():
+    executor = get_executor()
+    executor.start()
+    assert len(executor._pool._processes) == executor.workers
+
+    sources = _sources({"a.py": b"x = 1\n"})
+    assert asyncio.run(executor.map(_size, sources)) == [{"file": "a.py", "size": 6}]
+
+    executor.shutdown()
+    assert executor._pool is None
+    assert asyncio.run(executor.map(_size, sources)) == [{"file": "a.py", "size": 6}]
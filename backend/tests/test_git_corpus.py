@@ -0,0 +1,54 @@
+"""Corpora read from git objects: blobs stay unread until needed, and missing ones fail per file"""
+
+import asyncio
+import pickle
+
+import pytest
+
+from analyzers import analyze_snapshot
+from analyzers.git_corpus import corpus_from_commit
+from config import settings
+
+def _delete_blob(repo, sha: str):
+    (repo.path / ".git" / "objects" / sha[:2] / sha[2:]).unlink()
+
+def test_classifying_a_commit_keeps_no_blob_in_memory(git_repo):
+    sha = git_repo.commit({f"m{i}.py": f"x = {i}\n" for i in range(5)})
+
+    corpus = corpus_from_commit(str(git_repo.path), sha)
+
+    assert len(corpus) == 5
+    assert not any("data" in source.__dict__ for source in corpus)
+
+def test_blobs_over_the_size_cutoff_are_never_read(git_repo, monkeypatch):
+    sha = git_repo.commit({"small.py": "x = 1\n", "large.py": "y = 2\n" * 400_000})
+    large = corpus_from_commit(str(git_repo.path), sha).get("large.py")
+    # Reading it would now fail the whole corpus step
+    _delete_blob(git_repo, large.sha)
+    monkeypatch.setattr(settings, "max_file_size_mb", 1)
+
+    snapshot = asyncio.run(analyze_snapshot(str(git_repo.path), target_ref=sha))
+
+    assert sorted(snapshot.files) == ["small.py"]
+    assert [entry["file"] for entry in snapshot.result["analysis"]["budget"]["skipped"]] == ["large.py"]
+
+def test_a_missing_blob_is_a_per_file_error(git_repo):
+    sha = git_repo.commit({"ok.py": "x = 1\n", "gone.py": "y = 2\n"})
+    gone = corpus_from_commit(str(git_repo.path), sha).get("gone.py")
+    _delete_blob(git_repo, gone.sha)
+
+    snapshot = asyncio.run(analyze_snapshot(str(git_repo.path), target_ref=sha))
+
+    assert snapshot.result["analysis"]["errors"] == {}
+    assert "error" not in snapshot.records["complexity"]["ok.py"]
+    assert "is not in the repository" in snapshot.records["complexity"]["gone.py"]["error"]
+
+def test_a_missing_blob_still_pickles_for_worker_processes(git_repo):
+    sha = git_repo.commit({"gone.py": "y = 2\n"})
+    source = corpus_from_commit(str(git_repo.path), sha).get("gone.py")
+    _delete_blob(git_repo, source.sha)
+
+    shipped = pickle.loads(pickle.dumps(source))
+
+    with pytest.raises(FileNotFoundError):
+        shipped.data
@@ -0,0 +1,75 @@
+"""History trends: commit listing, per-commit metrics and request validation"""
+
+import asyncio
+
+import pytest
+
+from config import settings
+from analyzers import analyze_history, analyze_snapshot
+from analyzers.git_corpus import list_commits
+
+def _three_commits(git_repo):
+    return [
+        git_repo.commit({"a.py": "def f():\n    return 1\n"}),
+        git_repo.commit({"b.py": "def g(x):\n    if x:\n        return 1\n    return 2\n"}),
+        git_repo.commit({"a.py": "def f():\n    '''Documented.'''\n    return 1\n"})
+    ]
+
+def test_list_commits_rejects_paths_that_are_not_repositories(tmp_path):
+    with pytest.raises(ValueError, match="is not a git repository"):
+        list_commits(str(tmp_path), "HEAD", 1, 1)
+
+def test_list_commits_rejects_unknown_refs(git_repo):
+    git_repo.commit({"a.py": "x = 1\n"})
+
+    with pytest.raises(ValueError, match="Unknown git ref"):
+        list_commits(str(git_repo.path), "no-such-branch")
+
+def test_list_commits_steps_back_from_the_ref(git_repo):
+    shas = _three_commits(git_repo)
+
+    assert [sha for sha, _time in list_commits(str(git_repo.path), "HEAD")] == shas[::-1]
+    assert [sha for sha, _time in list_commits(str(git_repo.path), "HEAD", step=2)] == [shas[2], shas[0]]
+    assert [sha for sha, _time in list_commits(str(git_repo.path), "HEAD", limit=2)] == [shas[2], shas[1]]
+
+def test_history_points_match_full_analyses(git_repo):
+    shas = _three_commits(git_repo)
+
+    async def run():
+        points = await analyze_history(str(git_repo.path))
+        full = [await analyze_snapshot(str(git_repo.path), target_ref=sha) for sha in shas]
+        return points, full
+
+    points, full = asyncio.run(run())
+
+    assert [point["commit"] for point in points] == shas
+    assert [point["mode"] for point in points] == ["full", "incremental", "incremental"]
+    assert [point["metrics"] for point in points] == [snapshot.result["metrics"] for snapshot in full]
+
+def test_known_points_are_reused(git_repo):
+    shas = _three_commits(git_repo)
+    first = asyncio.run(analyze_history(str(git_repo.path), limit=2))
+    known = {point["commit"]: point for point in first}
+
+    points = asyncio.run(analyze_history(str(git_repo.path), known=known))
+
+    assert points[1] is known[shas[1]] and points[2] is known[shas[2]]
+    assert points[0]["commit"] == shas[0]
+
+def test_history_requests_for_non_repositories_are_rejected(api_client, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "local_repo_roots", [str(tmp_path)])
+    plain = tmp_path / "plain"
+    plain.mkdir()
+
+    response = api_client.post("/api/history", json={"repo_url": str(plain)})
+    assert response.status_code == 400
+    assert "not a git repository" in response.json()["detail"]
+
+    response = api_client.post("/api/history", json={"repo_url": "/etc"})
+    assert response.status_code == 403
+
+def test_history_requests_need_a_positive_step(api_client, monkeypatch, git_repo):
+    monkeypatch.setattr(settings, "local_repo_roots", [str(git_repo.path.parent)])
+
+    response = api_client.post("/api/history", json={"repo_url": str(git_repo.path), "step": 0})
+    assert response.status_code == 400
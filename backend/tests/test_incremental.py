@@ -0,0 +1,61 @@
+"""Incremental analysis against a base snapshot matches a full analysis of the same commit"""
+
+import asyncio
+import json
+
+from analyzers import analyze_snapshot
+from analyzers.git_corpus import diff_python_files
+
+def _comparable(snapshot):
+    result = {key: value for key, value in snapshot.result.items() if key != "analysis"}
+    records = {name: dict(records) for name, records in snapshot.records.items()}
+    return json.dumps([result, records, snapshot.files], sort_keys=True)
+
+def _incremental_and_full(repo, base_sha, target_sha):
+    async def run():
+        base = await analyze_snapshot(str(repo.path), target_ref=base_sha)
+        incremental = await analyze_snapshot(str(repo.path), target_ref=target_sha, base_snapshot=base)
+        full = await analyze_snapshot(str(repo.path), target_ref=target_sha)
+        return incremental, full
+    return asyncio.run(run())
+
+def test_changed_files_are_reanalyzed(git_repo):
+    base = git_repo.commit({
+        "pkg/__init__.py": "",
+        "pkg/a.py": "def f(x):\n    return x + 1\n",
+        "pkg/b.py": "from .a import f\n\ndef g():\n    return f(1)\n"
+    })
+    target = git_repo.commit({
+        "pkg/a.py": "def f(x):\n    if x:\n        return x + 2\n    return 0\n",
+        "pkg/b.py": None,
+        "pkg/c.py": "class C:\n    pass\n"
+    })
+
+    incremental, full = _incremental_and_full(git_repo, base, target)
+
+    assert incremental.result["analysis"]["mode"] == "incremental"
+    assert incremental.result["analysis"]["changed_files"] == 2
+    assert _comparable(incremental) == _comparable(full)
+
+def test_committed_virtualenvs_stay_out_of_incremental_runs(git_repo):
+    base = git_repo.commit({
+        "app/main.py": "def main():\n    return 1\n",
+        "env/lib/site.py": "import os\n\nclass Site:\n    pass\n",
+        "old/pyvenv.cfg": "home = /usr\n",
+        "old/lib/mod.py": "def helper():\n    return 2\n"
+    })
+    # env/ becomes a virtualenv and gains a file; old/ stops being one
+    target = git_repo.commit({
+        "env/pyvenv.cfg": "home = /usr\n",
+        "env/lib/new.py": "def added():\n    return 3\n",
+        "old/pyvenv.cfg": None,
+        "app/main.py": "def main():\n    return 2\n"
+    })
+
+    changed, removed = diff_python_files(str(git_repo.path), base, target)
+    assert changed == ["app/main.py", "old/lib/mod.py"]
+    assert "env/lib/site.py" in removed
+
+    incremental, full = _incremental_and_full(git_repo, base, target)
+    assert sorted(incremental.files) == ["app/main.py", "old/lib/mod.py"]
+    assert _comparable(incremental) == _comparable(full)
@@ -0,0 +1,118 @@
+"""Analysis jobs: request coalescing, the concurrency limit and the polling routes"""
+
+import asyncio
+import time
+
+from api.jobs import JobManager, JobStatus
+
+class _Analyses:
+    """Stand-in analysis coroutine whose runs finish when released, noting how many overlap"""
+
+    def __init__(self):
+        self.calls = []
+        self.running = 0
+        self.most_running = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, repo_url, ref=None, progress=None, **options):
+        self.calls.append(repo_url)
+        self.running += 1
+        self.most_running = max(self.most_running, self.running)
+        try:
+            await self.release.wait()
+        finally:
+            self.running -= 1
+        return {"repo_url": repo_url}
+
+def test_identical_requests_share_one_job():
+    async def run():
+        analyses = _Analyses()
+        jobs = JobManager(4, runner=analyses, history_runner=analyses)
+        first = jobs.submit("https://github.com/example/project")
+        # The same repository spelled differently still has the same repo_id
+        second = jobs.submit("https://github.com/example/project.git/")
+        other_branch = jobs.submit("https://github.com/example/project", branch="dev")
+        other_kind = jobs.submit("https://github.com/example/project", kind="history", step=2)
+        analyses.release.set()
+        await asyncio.gather(*(jobs.wait(job) for job in (first, other_branch, other_kind)))
+        # Finished jobs are not joined; a new request starts a new analysis
+        later = await jobs.wait(jobs.submit("https://github.com/example/project"))
+        return analyses, first, second, other_branch, other_kind, later
+
+    analyses, first, second, other_branch, other_kind, later = asyncio.run(run())
+
+    assert second is first and first.requests == 2
+    assert len({first.id, other_branch.id, other_kind.id, later.id}) == 4
+    assert len(analyses.calls) == 4
+    assert first.status == later.status == JobStatus.COMPLETED
+
+def test_at_most_max_concurrent_analyses_run_at_once():
+    async def run():
+        analyses = _Analyses()
+        jobs = JobManager(2, runner=analyses)
+        submitted = [jobs.submit(f"https://github.com/example/project{i}") for i in range(5)]
+        for _ in range(20):
+            await asyncio.sleep(0)
+        statuses = [job.status for job in submitted]
+        analyses.release.set()
+        await asyncio.gather(*(jobs.wait(job) for job in submitted))
+        return analyses, statuses, submitted
+
+    analyses, statuses, submitted = asyncio.run(run())
+
+    assert statuses.count(JobStatus.RUNNING) == 2
+    assert statuses.count(JobStatus.QUEUED) == 3
+    assert analyses.most_running == 2
+    assert all(job.status == JobStatus.COMPLETED for job in submitted)
+
+def test_failed_analyses_fail_their_job_and_free_the_slot():
+    async def broken(repo_url, ref=None, progress=None, **options):
+        raise RuntimeError("clone failed")
+
+    async def run():
+        jobs = JobManager(1, runner=broken)
+        failed = await jobs.wait(jobs.submit("https://github.com/example/a"))
+        next_job = await jobs.wait(jobs.submit("https://github.com/example/b"))
+        return failed, next_job
+
+    failed, next_job = asyncio.run(run())
+
+    assert failed.status == JobStatus.FAILED and failed.error == "clone failed"
+    assert next_job.status == JobStatus.FAILED
+
+def _poll(api_client, path, status_code, attempts=100):
+    for _ in range(attempts):
+        response = api_client.get(path)
+        if response.status_code == status_code:
+            return response
+        time.sleep(0.02)
+    return response
+
+def test_analyses_are_accepted_then_polled_to_their_result(api_client, job_manager):
+    job_manager.gate.clear()
+    response = api_client.post("/api/analyze", json={"repo_url": "https://github.com/example/project"})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] in ("queued", "running")
+
+    # A second request joins the running job
+    again = api_client.post("/api/analyze", json={"repo_url": "https://github.com/example/project"}).json()
+    assert again["job_id"] == job["job_id"] and again["coalesced_requests"] == 2
+
+    pending = api_client.get(job["result_url"])
+    assert pending.status_code == 202 and pending.json()["job_id"] == job["job_id"]
+
+    job_manager.gate.set()
+    result = _poll(api_client, job["result_url"], 200)
+    assert result.json()["metrics"] == {"complexity": 1.5}
+    assert api_client.get(job["status_url"]).json()["status"] == "completed"
+    assert len(job_manager.calls) == 1
+
+def test_failed_and_unknown_jobs(api_client, job_manager):
+    job = api_client.post("/api/analyze", json={"repo_url": "https://github.com/example/broken"}).json()
+
+    response = _poll(api_client, job["result_url"], 500)
+    assert response.json()["detail"] == "analysis failed"
+    assert api_client.get(job["status_url"]).json()["error"] == "analysis failed"
+    assert api_client.get("/api/jobs/unknown").status_code == 404
+    assert api_client.get("/api/jobs/unknown/result").status_code == 404
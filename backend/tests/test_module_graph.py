@@ -0,0 +1,65 @@
+"""Import resolution and Tarjan's strongly connected components"""
+
+from analyzers.module_graph import ModuleResolver, cycle_through, strongly_connected_components
+
+def _sorted_components(graph):
+    return sorted(sorted(component) for component in strongly_connected_components(graph))
+
+def test_components_of_a_graph_with_cycles():
+    graph = {
+        "a": ["b"], "b": ["c"], "c": ["a", "d"],
+        "d": ["e"], "e": ["d"],
+        "f": ["f"],
+        "g": ["a"]
+    }
+
+    assert _sorted_components(graph) == [["a", "b", "c"], ["d", "e"], ["f"], ["g"]]
+
+def test_components_come_out_in_reverse_topological_order():
+    graph = {"app": ["lib"], "lib": ["util", "core"], "core": ["util"], "util": []}
+    order = [component[0] for component in strongly_connected_components(graph)]
+
+    # Every node appears after everything it depends on
+    for node, targets in graph.items():
+        for target in targets:
+            assert order.index(target) < order.index(node)
+
+def test_edges_to_nodes_without_entries_are_followed():
+    assert _sorted_components({"a": ["b"]}) == [["a"], ["b"]]
+
+def test_deep_graphs_do_not_overflow_the_stack():
+    size = 50000
+    chain = {str(i): [str(i + 1)] for i in range(size)}
+    chain[str(size)] = ["0"]
+
+    components = strongly_connected_components(chain)
+
+    assert len(components) == 1
+    assert len(components[0]) == size + 1
+
+def test_cycle_through_returns_a_shortest_cycle_from_the_smallest_node():
+    graph = {"a": ["b", "x"], "b": ["c"], "c": ["a"], "x": ["y"], "y": ["z"], "z": ["a"]}
+
+    assert cycle_through(graph, ["a", "b", "c", "x", "y", "z"]) == ["a", "b", "c", "a"]
+    assert cycle_through({"s": ["s"]}, ["s"]) == ["s", "s"]
+
+def test_absolute_imports_resolve_from_the_import_root():
+    resolver = ModuleResolver([
+        "src/pkg/__init__.py", "src/pkg/core.py", "src/pkg/sub/__init__.py", "src/pkg/sub/mod.py", "tools/run.py"
+    ])
+
+    assert resolver.resolve("src/pkg/sub/mod.py", "pkg.core") == ["src/pkg/core.py"]
+    assert resolver.resolve("src/pkg/core.py", "pkg", names=["sub"]) == ["src/pkg/sub/__init__.py"]
+    assert resolver.resolve("tools/run.py", "requests") == []
+
+def test_relative_imports_resolve_from_the_importing_package():
+    resolver = ModuleResolver(["pkg/__init__.py", "pkg/a.py", "pkg/sub/__init__.py", "pkg/sub/b.py"])
+
+    assert resolver.resolve("pkg/sub/b.py", "a", level=2) == ["pkg/a.py"]
+    assert resolver.resolve("pkg/sub/b.py", None, level=1, names=["b"]) == ["pkg/sub/b.py"]
+    assert resolver.resolve("pkg/a.py", "x", level=3) == []
+
+def test_a_top_level_init_does_not_hang_resolution():
+    resolver = ModuleResolver(["__init__.py", "a.py", "b.py"])
+
+    assert resolver.resolve("a.py", "b") == ["b.py"]
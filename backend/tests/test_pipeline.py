@@ -0,0 +1,46 @@
+"""The analysis pipeline keeps CPU-bound steps off the event loop"""
+
+import asyncio
+import time
+
+import analyzers
+from analyzers import analyze_snapshot
+from analyzers.dependencies import DependencyAnalyzer
+from analyzers.dependency_index import DependencyIndex
+
+def _slowed(func, seconds=0.3):
+    def slow(*args, **kwargs):
+        time.sleep(seconds)
+        return func(*args, **kwargs)
+    return slow
+
+def test_summaries_do_not_block_the_event_loop(git_repo, monkeypatch):
+    sha = git_repo.commit({"pkg/__init__.py": "", "pkg/a.py": "from . import b\n", "pkg/b.py": "x = 1\n"})
+    # Stand-ins for the time resolution and reduction take on a large repository
+    monkeypatch.setattr(DependencyAnalyzer, "resolve_imports", _slowed(DependencyAnalyzer.resolve_imports))
+    monkeypatch.setattr(DependencyIndex, "from_adjacency", classmethod(_slowed(DependencyIndex.from_adjacency.__func__)))
+    monkeypatch.setattr(analyzers, "_summarize_repository", _slowed(analyzers._summarize_repository))
+
+    async def run():
+        gaps = []
+        finished = asyncio.Event()
+
+        async def ticker():
+            last = time.perf_counter()
+            while not finished.is_set():
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticking = asyncio.create_task(ticker())
+        snapshot = await analyze_snapshot(str(git_repo.path), target_ref=sha)
+        finished.set()
+        await ticking
+        return snapshot, max(gaps)
+
+    snapshot, longest_gap = asyncio.run(run())
+
+    assert snapshot.index is not None
+    assert snapshot.result["structure"]
+    assert longest_gap < 0.2
@@ -0,0 +1,48 @@
+"""Raw line metrics from the shared token pass, compared with radon"""
+
+import io
+import tokenize
+
+import pytest
+from radon.raw import analyze
+
+from analyzers.raw_metrics import compute_raw_metrics
+
+SAMPLES = {
+    "plain": "import os\n\n\ndef f(x):\n    return x + 1\n",
+    "comments": "# header\nx = 1  # trailing\n\n# alone\ny = 2\n",
+    "docstrings": '"""Module."""\n\nclass A:\n    """Class\n    docstring."""\n\n    def m(self):\n        \'\'\'One line.\'\'\'\n        return 1\n',
+    "strings": 'x = """\nnot a docstring\n"""\n\n"""a bare\nmulti-line string"""\n',
+    "inline_bodies": "if x: y = 1\nfor i in range(3): pass\na = 1; b = 2\n",
+    "continuations": "total = (1 +\n         2)\nvalue = [\n    1,\n    2,\n]\n",
+    "colons": "d = {'a': 1}\ns = x[1:2]\nf = lambda a: a\ndef g(a: int) -> int:\n    return a\n"
+}
+
+def _metrics(source: str):
+    tokens = list(tokenize.generate_tokens(io.StringIO(source).readline))
+    return compute_raw_metrics(tokens, io.StringIO(source).readlines())
+
+@pytest.mark.parametrize("name", sorted(SAMPLES))
+def test_line_counts_match_radon(name):
+    source = SAMPLES[name]
+    ours, radon = _metrics(source), analyze(source)
+
+    for field in ("loc", "sloc", "comments", "multi", "single_comments", "blank"):
+        assert ours[field] == getattr(radon, field), field
+    assert ours["sloc"] + ours["blank"] + ours["multi"] + ours["single_comments"] == ours["loc"]
+
+@pytest.mark.parametrize("name", sorted(SAMPLES))
+def test_lloc_never_exceeds_radon(name):
+    source = SAMPLES[name]
+
+    assert _metrics(source)["lloc"] <= analyze(source).lloc
+
+def test_lloc_counts_statements_not_colons():
+    # One logical line each; radon counts two for every line but the last
+    assert _metrics("d = {'a': 1}\ns = x[1:2]\nf = lambda a: a\ny = 1\n")["lloc"] == 4
+    # Inline compound bodies and ';'-separated statements count separately
+    assert _metrics("if x: y = 1\na = 1; b = 2\n")["lloc"] == 4
+
+def test_docstring_lines_are_counted_for_modules_classes_and_functions():
+    assert _metrics(SAMPLES["docstrings"])["docstrings"] == 4
+    assert _metrics(SAMPLES["strings"])["docstrings"] == 0
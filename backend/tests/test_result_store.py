@@ -0,0 +1,125 @@
+"""Result store: snapshots persisted for incremental runs, with records read back lazily"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from analyzers import analyze_snapshot
+from analyzers.snapshot import AnalysisSnapshot
+from analyzers.spool import RecordSpool
+from storage import results as results_module
+from storage.results import ResultStore, StoredRecords, repo_id_for
+
+def _snapshot(commit, records):
+    spool = RecordSpool()
+    for path in sorted(records):
+        spool.add(path, records[path])
+    return AnalysisSnapshot("/repo", commit=commit, files={path: {"digest": path} for path in records},
+                            records={"complexity": spool}, versions={"complexity": "1"}, result={"metrics": {}})
+
+def test_latest_snapshot_reads_records_lazily_in_path_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(StoredRecords, "PAGE_SIZE", 2)
+    store = ResultStore(str(tmp_path / "store.sqlite3"))
+    records = {f"f{i}.py": {"file": f"f{i}.py", "value": i} for i in range(5)}
+    store.save("repo", "/repo", _snapshot("c1", records))
+
+    loaded = store.latest_snapshot("repo")
+    stored = loaded.records["complexity"]
+
+    assert isinstance(stored, StoredRecords)
+    assert len(stored) == 5
+    assert stored["f3.py"] == records["f3.py"]
+    assert list(stored.items()) == sorted(records.items())
+    assert "missing.py" not in stored
+    with pytest.raises(KeyError):
+        stored["missing.py"]
+
+def test_records_of_pruned_snapshots_are_deleted(tmp_path):
+    store = ResultStore(str(tmp_path / "store.sqlite3"), snapshots_per_repo=1)
+    store.save("repo", "/repo", _snapshot("c1", {"a.py": {"file": "a.py"}}))
+    store.save("repo", "/repo", _snapshot("c2", {"b.py": {"file": "b.py"}}))
+
+    commits = store._conn.execute("SELECT DISTINCT commit_sha FROM snapshot_records").fetchall()
+    assert commits == [("c2",)]
+    assert dict(store.latest_snapshot("repo").records["complexity"]) == {"b.py": {"file": "b.py"}}
+
+def test_closing_a_snapshot_deletes_its_spill_files():
+    spool = RecordSpool(on_disk=True)
+    spool.add("a.py", {"file": "a.py"})
+    snapshot = AnalysisSnapshot("/repo", records={"complexity": spool})
+    assert spool["a.py"] == {"file": "a.py"}
+
+    snapshot.close()
+    assert spool._file is None
+
+def test_incremental_runs_from_a_stored_base_match_full_runs(git_repo, tmp_path):
+    base_sha = git_repo.commit({"a.py": "def f():\n    return 1\n", "b.py": "from a import f\nf()\n"})
+    target_sha = git_repo.commit({"b.py": None, "c.py": "def g():\n    return 2\n"})
+    store = ResultStore(str(tmp_path / "store.sqlite3"))
+
+    async def run():
+        store.save("repo", str(git_repo.path), await analyze_snapshot(str(git_repo.path), target_ref=base_sha))
+        base = store.latest_snapshot("repo")
+        incremental = await analyze_snapshot(str(git_repo.path), target_ref=target_sha, base_snapshot=base)
+        full = await analyze_snapshot(str(git_repo.path), target_ref=target_sha)
+        return incremental, full
+
+    incremental, full = asyncio.run(run())
+
+    assert incremental.result["analysis"]["mode"] == "incremental"
+    assert json.dumps(incremental.to_dict()["records"], sort_keys=True) == json.dumps(full.to_dict()["records"], sort_keys=True)
+
+class _ObservedLock:
+    """A store's database lock that notes how many records are stored whenever it is taken"""
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        self._store = store
+        self.seen = []
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.seen.append(self._store._conn.execute("SELECT COUNT(*) FROM snapshot_records").fetchone()[0])
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+def test_records_are_written_in_batches_that_release_the_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(results_module, "RECORD_BATCH_SIZE", 2)
+    store = ResultStore(str(tmp_path / "store.sqlite3"))
+    store._lock = _ObservedLock(store)
+
+    store.save("repo", "/repo", _snapshot("c1", {f"f{i}.py": {"file": f"f{i}.py"} for i in range(5)}))
+
+    assert {2, 4, 5} <= set(store._lock.seen)
+    assert len(store.latest_snapshot("repo").records["complexity"]) == 5
+
+def test_results_in_memory_are_served_while_the_database_is_busy(tmp_path):
+    store = ResultStore(str(tmp_path / "store.sqlite3"))
+    store.save("repo", "/repo", _snapshot("c1", {"a.py": {"file": "a.py"}}))
+    found = []
+
+    with store._lock:
+        # As when another save holds the database
+        reader = threading.Thread(target=lambda: found.append(store.get("repo")))
+        reader.start()
+        reader.join(timeout=2)
+        assert not reader.is_alive()
+
+    assert found[0]["commit"] == "c1"
+
+def test_snapshots_being_written_are_not_pruned_by_other_saves(tmp_path):
+    store = ResultStore(str(tmp_path / "store.sqlite3"), snapshots_per_repo=1)
+    # c2's records are half written when c1's save finishes
+    store._writing.add(("repo", "c2"))
+    store._conn.execute("INSERT INTO snapshot_records VALUES ('repo', 'c2', 'complexity', 'b.py', x'00')")
+    store.save("repo", "/repo", _snapshot("c1", {"a.py": {"file": "a.py"}}))
+
+    commits = store._conn.execute("SELECT DISTINCT commit_sha FROM snapshot_records ORDER BY 1").fetchall()
+    assert commits == [("c1",), ("c2",)]
+
+def test_repository_ids_treat_every_remote_scheme_alike():
+    assert repo_id_for("git://github.com/Example/Project.git") == repo_id_for("https://github.com/example/project")
+    assert repo_id_for("git@github.com:example/project.git") == repo_id_for("ssh://git@github.com/example/project/")
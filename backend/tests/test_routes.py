@@ -0,0 +1,63 @@
+"""Which repositories the API agrees to analyze"""
+
+import json
+
+from config import settings
+
+def test_streaming_a_local_path_outside_the_allowed_roots_is_forbidden(api_client, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "local_repo_roots", [str(tmp_path / "allowed")])
+
+    for repo_url in ("/etc", str(tmp_path), f"file://{tmp_path}/allowed/../other", f"{tmp_path}/allowed-not"):
+        response = api_client.get("/api/analyze/stream", params={"repo_url": repo_url})
+        assert response.status_code == 403, repo_url
+
+def test_no_local_paths_are_allowed_by_default(api_client, monkeypatch, git_repo):
+    monkeypatch.setattr(settings, "local_repo_roots", [])
+
+    response = api_client.get("/api/analyze/stream", params={"repo_url": str(git_repo.path)})
+    assert response.status_code == 403
+
+def test_streaming_a_repository_under_an_allowed_root(api_client, monkeypatch, git_repo):
+    git_repo.commit({"a.py": "def f():\n    return 1\n"})
+    monkeypatch.setattr(settings, "local_repo_roots", [str(git_repo.path.parent)])
+
+    response = api_client.get("/api/analyze/stream",
+                              params={"repo_url": str(git_repo.path), "analyzers": "complexity"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert lines[0]["file"] == "a.py" and "complexity" in lines[0]
+    assert lines[-1]["summary"]["partial"] is False
+
+def test_webhooks_refuse_local_clone_urls(api_client, job_manager, monkeypatch):
+    monkeypatch.setattr(settings, "local_repo_roots", [])
+
+    for clone_url in ("/etc", "file:///etc"):
+        response = api_client.post("/api/webhook/github", json={
+            "event_type": "push", "ref": "refs/heads/main", "repository": {"clone_url": clone_url}
+        })
+        assert response.status_code == 403, clone_url
+    assert job_manager.calls == []
+
+def test_webhooks_queue_remote_repositories(api_client, job_manager):
+    response = api_client.post("/api/webhook/github", json={
+        "event_type": "push", "ref": "refs/heads/main",
+        "repository": {"clone_url": "https://github.com/example/project.git"}
+    })
+
+    assert response.json() == {"status": "received"}
+    [job] = job_manager._jobs.values()
+    assert (job.repo_url, job.branch) == ("https://github.com/example/project.git", "main")
+
+def test_websocket_analyses_of_local_paths_are_refused(job_manager, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    monkeypatch.setattr(settings, "local_repo_roots", [])
+    with TestClient(main.app).websocket_connect("/ws") as websocket:
+        websocket.send_text(json.dumps({"type": "analyze", "repo_url": "/etc"}))
+        message = websocket.receive_json()
+
+    assert message["type"] == "error"
+    assert "LOCAL_REPO_ROOTS" in message["message"]
+    assert job_manager.calls == []
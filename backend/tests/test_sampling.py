@@ -0,0 +1,79 @@
+"""Stratified sampling: allocation, estimates and confidence intervals"""
+
+import random
+from pathlib import Path
+
+from analyzers.corpus import SourceFile
+from analyzers.sampling import ESTIMATORS, StratifiedSample
+
+def _population(count, seed=0):
+    """Files in a few directories and sizes, with complexity records growing with size"""
+    rng = random.Random(seed)
+    sources, records = [], {}
+    for i in range(count):
+        directory = rng.choice(["api", "core", "util"])
+        size = rng.randint(50, 5000)
+        rel_path = f"{directory}/f{i}.py"
+        sources.append(SourceFile(Path("/repo") / rel_path, rel_path, data=b"x" * size))
+        complexity = size // 500 + rng.randint(0, 3)
+        records[rel_path] = {"file": rel_path, "cyclomatic_complexity": [{"complexity": complexity}]}
+    return sources, records
+
+def _true_score(records):
+    estimator = ESTIMATORS["complexity"]
+    totals = [0, 0]
+    for record in records.values():
+        for j, value in enumerate(estimator.contribution(record)):
+            totals[j] += value
+    return estimator.score(tuple(totals))
+
+def test_a_census_has_an_exact_estimate():
+    sources, records = _population(40)
+    sample = StratifiedSample.draw(sources, size=100)
+
+    estimate = sample.estimate(ESTIMATORS["complexity"], [records[s.rel_path] for s in sample.files])
+
+    assert len(sample.files) == 40
+    assert estimate["standard_error"] == 0
+    assert estimate["low"] == estimate["score"] == estimate["high"] == round(_true_score(records), 2)
+
+def test_draws_are_reproducible_and_about_the_requested_size():
+    sources, _records = _population(500)
+    first = StratifiedSample.draw(sources, size=60, seed=3)
+    second = StratifiedSample.draw(sources, size=60, seed=3)
+
+    assert [s.rel_path for s in first.files] == [s.rel_path for s in second.files]
+    assert 60 <= len(first.files) <= 60 + 2 * len(first.strata)
+    assert first.population == 500
+    # Every stratum is represented
+    assert all(first.sampled[key] for key in first.strata)
+
+def test_intervals_cover_the_true_score_at_about_the_nominal_rate():
+    sources, records = _population(800)
+    truth = _true_score(records)
+
+    covered = 0
+    widths = []
+    for seed in range(60):
+        sample = StratifiedSample.draw(sources, size=80, seed=seed)
+        estimate = sample.estimate(ESTIMATORS["complexity"], [records[s.rel_path] for s in sample.files])
+        assert estimate["low"] <= estimate["score"] <= estimate["high"]
+        covered += estimate["low"] <= truth <= estimate["high"]
+        widths.append(estimate["high"] - estimate["low"])
+
+    # 95% intervals; allow for sampling noise over 60 draws
+    assert covered >= 51
+    assert all(width > 0 for width in widths)
+
+def test_larger_samples_give_narrower_intervals():
+    sources, records = _population(800)
+
+    def error(size):
+        errors = []
+        for seed in range(10):
+            sample = StratifiedSample.draw(sources, size=size, seed=seed)
+            errors.append(sample.estimate(ESTIMATORS["complexity"],
+                                          [records[s.rel_path] for s in sample.files])["standard_error"])
+        return sum(errors) / len(errors)
+
+    assert error(400) < error(50)
@@ -0,0 +1,102 @@
+"""Symbol index: dead-code detection and incremental updates"""
+
+import ast
+import random
+
+from analyzers.rules import run_rule
+from analyzers.symbols import SymbolIndex, SymbolRule
+
+def _symbols(source: str):
+    return run_rule(ast.parse(source), "", SymbolRule)
+
+def _index(files):
+    index = SymbolIndex()
+    for path, source in files.items():
+        index.update(path, _symbols(source))
+    return index
+
+def _unused(index):
+    return [(path, definition[0]) for path, definition in index.unused()]
+
+def test_definitions_used_across_files_are_not_reported():
+    index = _index({
+        "pkg/__init__.py": "",
+        "pkg/a.py": "def used():\n    pass\n\ndef unused():\n    pass\n\nclass Kept:\n    def method(self):\n        pass\n",
+        "pkg/b.py": "from .a import used\nimport pkg.a\n\nused()\npkg.a.Kept().method()\n"
+    })
+
+    assert _unused(index) == [("pkg/a.py", "unused")]
+
+def test_removing_the_importer_makes_definitions_unused():
+    files = {"a.py": "def f():\n    pass\n", "b.py": "from a import f\nf()\n"}
+    index = _index(files)
+    assert _unused(index) == []
+
+    index.remove("b.py")
+    assert _unused(index) == [("a.py", "f")]
+
+def test_adding_a_shadowing_module_re_resolves_its_importers():
+    index = _index({"util.py": "def helper():\n    pass\n", "app/main.py": "from util import helper\n"})
+    assert _unused(index) == []
+
+    # app/util.py now shadows util.py for app/main.py
+    index.update("app/util.py", _symbols("def helper():\n    pass\n"))
+    assert _unused(index) == [("util.py", "helper")]
+
+def test_unchanged_files_are_not_re_resolved():
+    index = _index({"a.py": "def f():\n    pass\n", "b.py": "from a import f\n", "c.py": "import os\n"})
+    index.unused()
+
+    resolved = []
+    contribute = index._contribute
+    index._contribute = lambda path: (resolved.append(path), contribute(path))
+    index.update("a.py", _symbols("def f():\n    pass\n"))
+    index.update("c.py", _symbols("import sys\n"))
+    index.update("d.py", _symbols("def g():\n    pass\n"))
+    index.unused()
+
+    assert sorted(resolved) == ["c.py", "d.py"]
+
+def _random_table(rng):
+    imports = []
+    for _ in range(rng.randint(0, 3)):
+        imports.append([rng.choice(["", "a", "a.b", "x", "b"]), rng.choice([0, 0, 1, 2]),
+                        rng.choice(["x", "y", "b", "f", "g", "*", None]), None])
+    imports = [entry for entry in imports if entry[2] is not None or (entry[0] and not entry[1])]
+    return {
+        "definitions": [["f", "function", 1, False], ["g", "function", 2, False], ["K", "class", 3, False]],
+        "names": [],
+        "attributes": [],
+        "imports": imports,
+        "module_attributes": [[rng.choice(["a", "x", "a.b"]), rng.choice(["f", "g", "x"])]
+                              for _ in range(rng.randint(0, 2))],
+        "exports": None
+    }
+
+def test_incremental_updates_match_a_rebuilt_index():
+    rng = random.Random(7)
+    paths = [f"{directory}{name}.py" for directory in ("", "a/", "a/b/", "c/")
+             for name in ("x", "y", "b", "a", "__init__")]
+
+    for _ in range(100):
+        files = {path: _random_table(rng) for path in rng.sample(paths, rng.randint(3, 12))}
+        index = SymbolIndex()
+        for path, table in files.items():
+            index.update(path, table)
+        index.unused()
+
+        for _ in range(3):
+            index = index.copy()
+            for path in rng.sample(paths, rng.randint(1, 5)):
+                if path in files and rng.random() < 0.5:
+                    del files[path]
+                    index.remove(path)
+                else:
+                    files[path] = _random_table(rng)
+                    index.update(path, files[path])
+
+            rebuilt = SymbolIndex()
+            for path, table in files.items():
+                rebuilt.update(path, table)
+            assert index.unused() == rebuilt.unused()
+            assert +index.imported == +rebuilt.imported
@@ -0,0 +1,157 @@
+"""WebSocket send queues: overflow policies, coalescing and pruning of failed connections"""
+
+import asyncio
+
+from api.websocket import WebSocketManager, _Connection
+
+class _StuckSocket:
+    """A client whose sends never complete until released"""
+
+    def __init__(self):
+        self.query_params = {}
+        self.sent = []
+        self.closed_with = None
+        self.release = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.release.wait()
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+class _BrokenSocket(_StuckSocket):
+    """A client whose connection is gone"""
+
+    async def send_text(self, text):
+        raise ConnectionResetError("gone")
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+async def _stuck_connection(policy, max_queue=3):
+    """A connection whose writer has taken "m0" and is stuck sending it"""
+    socket = _StuckSocket()
+    connection = _Connection(socket, max_queue, policy)
+    connection.writer = asyncio.create_task(connection.write_loop())
+    connection.offer("m0")
+    await _settle()
+    return socket, connection
+
+def _queued(connection):
+    return [text for _key, text in connection.queue]
+
+def test_drop_oldest_keeps_the_newest_messages():
+    async def run():
+        socket, connection = await _stuck_connection("drop_oldest")
+        accepted = [connection.offer(f"m{i}") for i in range(1, 6)]
+        queued = _queued(connection)
+        socket.release.set()
+        await _settle()
+        connection.close()
+        return accepted, queued, connection.dropped, socket.sent
+
+    accepted, queued, dropped, sent = asyncio.run(run())
+
+    assert all(accepted)
+    assert queued == ["m3", "m4", "m5"] and dropped == 2
+    assert sent == ["m0", "m3", "m4", "m5"]
+
+def test_coalesce_replaces_queued_updates_in_place():
+    async def run():
+        _socket, connection = await _stuck_connection("coalesce")
+        connection.offer("metrics 1", key="metrics_update")
+        connection.offer("event")
+        connection.offer("metrics 2", key="metrics_update")
+        connection.offer("structure 1", key="structure_update")
+        replaced = _queued(connection)
+        # A full queue still drops the oldest entry, and forgets its key
+        connection.offer("event 2")
+        connection.offer("metrics 3", key="metrics_update")
+        overflowed = _queued(connection), connection.dropped
+        connection.close()
+        return replaced, overflowed
+
+    replaced, (overflowed, dropped) = asyncio.run(run())
+
+    assert replaced == ["metrics 2", "event", "structure 1"]
+    assert overflowed == ["structure 1", "event 2", "metrics 3"] and dropped == 2
+
+def test_drop_oldest_never_coalesces():
+    async def run():
+        _socket, connection = await _stuck_connection("drop_oldest")
+        connection.offer("metrics 1", key="metrics_update")
+        connection.offer("metrics 2", key="metrics_update")
+        queued = _queued(connection)
+        connection.close()
+        return queued
+
+    assert asyncio.run(run()) == ["metrics 1", "metrics 2"]
+
+def test_disconnect_closes_a_client_that_cannot_keep_up():
+    async def run():
+        manager = WebSocketManager(max_queue=2, overflow_policy="disconnect")
+        slow, fast = _StuckSocket(), _StuckSocket()
+        fast.release.set()
+        await manager.connect(slow)
+        await manager.connect(fast)
+        for i in range(4):
+            await manager.broadcast(f"m{i}")
+            await _settle()
+        return manager, slow, fast
+
+    manager, slow, fast = asyncio.run(run())
+
+    assert manager.active_connections == [fast]
+    assert slow.closed_with == 1013
+    assert fast.sent == ["m0", "m1", "m2", "m3"]
+
+def test_put_waits_for_room_and_close_releases_it():
+    async def run():
+        socket, connection = await _stuck_connection("drop_oldest", max_queue=1)
+        connection.offer("m1")
+        waiting = asyncio.create_task(connection.put("m2"))
+        await _settle()
+        blocked = not waiting.done()
+        socket.release.set()
+        await _settle()
+        delivered = list(socket.sent)
+
+        socket.release.clear()
+        connection.offer("m3")
+        await _settle()
+        connection.offer("m4")
+        late = asyncio.create_task(connection.put("m5"))
+        await _settle()
+        connection.close()
+        await _settle()
+        return blocked, delivered, late.done(), connection.dropped
+
+    blocked, delivered, released, dropped = asyncio.run(run())
+
+    assert blocked
+    # put never drops anything
+    assert delivered == ["m0", "m1", "m2"] and dropped == 0
+    assert released
+
+def test_connections_whose_sends_fail_are_pruned():
+    async def run():
+        manager = WebSocketManager(overflow_policy="coalesce")
+        broken, working = _BrokenSocket(), _StuckSocket()
+        working.release.set()
+        await manager.connect(broken)
+        await manager.connect(working)
+        await manager.broadcast_json({"type": "ping"})
+        await _settle()
+        await manager.broadcast_json({"type": "ping"})
+        await _settle()
+        return manager, working
+
+    manager, working = asyncio.run(run())
+
+    assert manager.active_connections == [working]
+    assert len(working.sent) == 2
@@ -91,9 +91,15 @@ export default function Home() {
   const analyzeRepository = async () => {
     try {
       setLoading(true);
-      const response = await axios.post('http://localhost:8000/api/analyze', {
+      // Analysis runs as a background job; poll until its result is ready
+      const job = await axios.post('http://localhost:8000/api/analyze', {
         repo_url: repoUrl
       });
+      let response = await axios.get(`http://localhost:8000${job.data.result_url}`);
+      while (response.status === 202) {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        response = await axios.get(`http://localhost:8000${job.data.result_url}`);
+      }
       
       // Transform metrics to match frontend expectations
       const metricsData = response.data.metrics || {};